@@ -0,0 +1,3 @@
+#!/bin/bash
+
+python ./src/run_pipeline.py --lang ja,en
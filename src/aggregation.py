@@ -0,0 +1,278 @@
+"""モデル・文学作品・ペルソナ・temperature別の集計を1回の走査で行う集計エンジン。
+
+入力データを (text, persona, model, temperature) の最も細かいセルごとに1回だけ走査し、
+各列の十分統計量（行数・件数・合計・二乗和・最小値・最大値）を求める。
+model別、text×model別などの各グルーピングは、このセル単位の統計量を集約して求めるため、
+元のデータを再び走査する必要はない。
+
+セル単位の統計量は results/cache に保存する。data_all.csv の末尾に行が追加された場合は
+（保存時の版の内容が先頭にそのまま残っていることを SHA-256 で確認したうえで）追加された行だけを
+集計し、merge_cell_statistics で保存済みの統計量に結合するので、全体を集計し直す必要はない。
+
+results/ 以下の *_emotion.csv / *_reason.csv はすべてこのモジュールから書き出す。
+"""
+
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from config import (
+    OUTPUT_DIR, ANALYSIS_COLUMNS, REASON_LENGTH_COLUMNS,
+    compute_reason_lengths, ensure_output_directories, iter_input_chunks, load_derived_table, load_input_data,
+    load_reason_lengths
+)
+
+# 最も細かい集計キー（すべてのグルーピングはこのキーの部分集合）
+CELL_KEYS = ['text', 'persona', 'model', 'temperature']
+
+# 列ごとに保持する十分統計量
+STATISTICS = ['count', 'sum', 'sumsq', 'min', 'max']
+
+# 理由文の文字数列を出力するときの列名（_lengthを削除）
+REASON_OUTPUT_NAMES = dict(zip(REASON_LENGTH_COLUMNS, ANALYSIS_COLUMNS['reasons']))
+
+# 出力ファイルの定義
+# by: グルーピングに使うキー, columns: 平均を出力する列,
+# rename: 出力時の列名の変更, decimals: 丸める桁数
+GROUP_OUTPUTS = {
+    'model_emotion': {'by': ['model'], 'columns': ANALYSIS_COLUMNS['values']},
+    'text_emotion': {'by': ['text', 'model'], 'columns': ANALYSIS_COLUMNS['values']},
+    'text_emotion_average': {'by': ['text'], 'columns': ANALYSIS_COLUMNS['values']},
+    'persona_emotion': {'by': ['persona', 'model'], 'columns': ANALYSIS_COLUMNS['values']},
+    'persona_emotion_average': {'by': ['persona'], 'columns': ANALYSIS_COLUMNS['values']},
+    'temperature_emotion': {'by': ['model', 'temperature'], 'columns': ANALYSIS_COLUMNS['values']},
+    'model_reason': {'by': ['model'], 'columns': REASON_LENGTH_COLUMNS,
+                     'rename': REASON_OUTPUT_NAMES, 'decimals': 2},
+    'text_reason': {'by': ['text', 'model'], 'columns': REASON_LENGTH_COLUMNS,
+                    'rename': REASON_OUTPUT_NAMES},
+    'text_reason_average': {'by': ['text'], 'columns': REASON_LENGTH_COLUMNS,
+                            'rename': REASON_OUTPUT_NAMES},
+    'persona_reason': {'by': ['persona', 'model'], 'columns': REASON_LENGTH_COLUMNS,
+                       'rename': REASON_OUTPUT_NAMES},
+    'persona_reason_average': {'by': ['persona'], 'columns': REASON_LENGTH_COLUMNS,
+                               'rename': REASON_OUTPUT_NAMES},
+    'temperature_reason': {'by': ['model', 'temperature'], 'columns': ['total_reason_length'],
+                           'series': True},
+    'temperature_reason_detailed': {'by': ['model', 'temperature'], 'columns': REASON_LENGTH_COLUMNS},
+}
+
+def _encode_keys(df, keys, dropna):
+    """キー列を1つの整数コードに変換し、(グループコード, 有効な行, コードの形状, 各キーの値一覧) を返す。
+
+    コードはキーの値の昇順（カテゴリ型の場合はカテゴリ順）に振るので、グループコードの順序は
+    groupby(sort=True) の順序と一致する。dropna=True の場合はキーが欠損した行を無効とし、
+    dropna=False の場合は欠損値を最後のコードとして扱う。
+    """
+    codes, levels = [], []
+    valid = np.ones(len(df), dtype=bool)
+    for key in keys:
+        column = df[key]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            key_codes, key_levels = column.cat.codes.to_numpy(), column.cat.categories
+        else:
+            key_codes, key_levels = pd.factorize(column, sort=True)
+        missing = key_codes < 0
+        if dropna:
+            valid &= ~missing
+            missing_code = 0
+        else:
+            missing_code = len(key_levels)
+            key_levels = key_levels.append(pd.Index([np.nan]))
+        codes.append(np.where(missing, missing_code, key_codes).astype(np.int64))
+        levels.append(key_levels)
+    shape = tuple(max(len(key_levels), 1) for key_levels in levels)
+    group_codes = np.ravel_multi_index(codes, shape) if len(df) else np.zeros(0, dtype=np.int64)
+    return group_codes, valid, shape, levels
+
+def _reduce(group_codes, rows, columns):
+    """グループコードごとに十分統計量を集約する。
+
+    columns は 列名 -> (count, sum, sumsq, min, max) の配列の組を返す関数 の辞書で、
+    列ごとに必要な配列だけを作ってから集約するので、全列分の中間配列を同時に保持しない。
+    """
+    used, inverse = np.unique(group_codes, return_inverse=True)
+    n_groups = len(used)
+    result = {'rows': np.bincount(inverse, weights=rows, minlength=n_groups).astype(np.int64)}
+
+    # 最小値・最大値はグループ順に並べてから区間ごとに求める
+    order = np.argsort(inverse, kind='stable')
+    starts = np.flatnonzero(np.r_[True, np.diff(inverse[order]) != 0]) if n_groups else np.zeros(0, dtype=np.int64)
+
+    for col, arrays in columns.items():
+        count, total, sumsq, minimum, maximum = arrays()
+        result[f"{col}_count"] = np.bincount(inverse, weights=count, minlength=n_groups).astype(np.int64)
+        result[f"{col}_sum"] = np.bincount(inverse, weights=total, minlength=n_groups)
+        result[f"{col}_sumsq"] = np.bincount(inverse, weights=sumsq, minlength=n_groups)
+        if n_groups:
+            # fmin/fmax は NaN を無視する（すべて NaN の区間のみ NaN になる）
+            result[f"{col}_min"] = np.fmin.reduceat(minimum[order], starts)
+            result[f"{col}_max"] = np.fmax.reduceat(maximum[order], starts)
+        else:
+            result[f"{col}_min"] = np.zeros(0)
+            result[f"{col}_max"] = np.zeros(0)
+    return used, result
+
+def _build_index(used, shape, levels, keys):
+    """グループコードからグルーピングキーのインデックスを作成"""
+    key_codes = np.unravel_index(used, shape)
+    arrays = [key_levels.take(codes) for key_levels, codes in zip(levels, key_codes)]
+    if len(keys) == 1:
+        return pd.Index(arrays[0], name=keys[0])
+    return pd.MultiIndex.from_arrays(arrays, names=keys)
+
+def compute_cell_statistics(df, columns, keys=CELL_KEYS):
+    """生データを1回走査して、セル（keysの組み合わせ）ごとの十分統計量を計算する。
+
+    戻り値はキー列・rows（行数）と、列ごとの {col}_count / _sum / _sumsq / _min / _max を持つ
+    DataFrame。キーが欠損している行も欠損値のセルとして保持する。
+    """
+    group_codes, _, shape, levels = _encode_keys(df, keys, dropna=False)
+
+    def raw_arrays(col):
+        def arrays():
+            values = df[col].to_numpy(dtype=np.float64)
+            present = ~np.isnan(values)
+            filled = np.where(present, values, 0.0)
+            return present.astype(np.float64), filled, filled * filled, values, values
+        return arrays
+
+    used, result = _reduce(group_codes, np.ones(len(df)), {col: raw_arrays(col) for col in columns})
+    cells = pd.DataFrame(result, index=_build_index(used, shape, levels, keys))
+    return cells.reset_index()
+
+def _aggregate_cells(cells, keys, dropna, columns=None):
+    """セル単位の十分統計量を keys ごとに集約する"""
+    if columns is None:
+        columns = [name[:-len('_count')] for name in cells.columns if name.endswith('_count')]
+    group_codes, valid, shape, levels = _encode_keys(cells, keys, dropna)
+    subset = cells[valid]
+
+    def cell_arrays(col):
+        def arrays():
+            return tuple(subset[f"{col}_{stat}"].to_numpy(dtype=np.float64) for stat in STATISTICS)
+        return arrays
+
+    used, result = _reduce(group_codes[valid], subset['rows'].to_numpy(dtype=np.float64),
+                           {col: cell_arrays(col) for col in columns})
+    return pd.DataFrame(result, index=_build_index(used, shape, levels, keys))
+
+def rollup(cells, by, columns=None):
+    """セル単位の十分統計量を by のグルーピングに集約する。
+
+    groupby(by, sort=True, dropna=True) と同じく、by のいずれかが欠損しているセルは除外され、
+    グループはキーの昇順に並ぶ。戻り値は by をインデックスとする同じ形式の DataFrame。
+    """
+    return _aggregate_cells(cells, by, dropna=True, columns=columns)
+
+def merge_cell_statistics(frames, keys=CELL_KEYS):
+    """複数のセル単位の十分統計量（例えばデータの分割ごとの結果）を1つにまとめる。
+
+    キーが欠損しているセルも1つのセルとして残す。
+    """
+    combined = pd.concat(frames, ignore_index=True)
+    return _aggregate_cells(combined, keys, dropna=False).reset_index()
+
+def group_means(stats, columns):
+    """集約済みの十分統計量から列ごとの平均値を計算（値がないグループは NaN）"""
+    means = {}
+    for col in columns:
+        count = stats[f"{col}_count"].to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means[col] = np.where(count > 0, stats[f"{col}_sum"].to_numpy() / count, np.nan)
+    return pd.DataFrame(means, index=stats.index)
+
+def _build_cell_statistics(file_path, start=0):
+    """入力データの start 行目以降について、感情値と理由文の文字数のセル単位の十分統計量を計算する"""
+    df, error = load_input_data(file_path, columns=CELL_KEYS + ANALYSIS_COLUMNS['values'])
+    if error:
+        raise RuntimeError(error)
+    lengths, error = load_reason_lengths(file_path)
+    if error:
+        raise RuntimeError(error)
+    # 理由文の文字数テーブルは入力データと同じ行順なので列を横に並べる
+    df = df.join(lengths[REASON_LENGTH_COLUMNS + ['total_reason_length']]).iloc[start:]
+    return compute_cell_statistics(df, ANALYSIS_COLUMNS['values'] + REASON_LENGTH_COLUMNS + ['total_reason_length'])
+
+def _merge_cells(previous, addition):
+    """保存済みのセル単位の統計量に、追加された行から計算した統計量を結合する"""
+    return merge_cell_statistics([previous, addition])
+
+def load_cell_statistics(file_path=None):
+    """入力データと理由文の文字数テーブルから、セル単位の十分統計量を読み込む。
+
+    統計量は results/cache に保存し、入力データが変わらない限り再利用する。入力データの末尾に
+    行が追加された場合は、追加された行だけの統計量を計算して保存済みの統計量に結合する。
+    戻り値は (DataFrame, エラーメッセージ) の組。
+    """
+    return load_derived_table('cell_statistics', _build_cell_statistics, 'セル単位の統計量', file_path,
+                              append=True, merge_func=_merge_cells)
+
+def stream_cell_statistics(chunksize, file_path=None):
+    """入力データを chunksize 行ずつ読み込み、セル単位の十分統計量を畳み込む。
+
+    チャンクごとに理由文の文字数とセル単位の統計量を計算し、merge_cell_statistics で
+    それまでの統計量に結合する。保持するのは1チャンク分の行とセル単位の統計量だけなので、
+    入力データ全体がメモリに収まらなくても集計できる。戻り値は (DataFrame, エラーメッセージ) の組。
+    """
+    columns = CELL_KEYS + ANALYSIS_COLUMNS['values'] + ANALYSIS_COLUMNS['reasons']
+    statistic_columns = ANALYSIS_COLUMNS['values'] + REASON_LENGTH_COLUMNS + ['total_reason_length']
+    cells = None
+    try:
+        for chunk in iter_input_chunks(file_path, columns, chunksize):
+            chunk = chunk[CELL_KEYS + ANALYSIS_COLUMNS['values']].join(compute_reason_lengths(chunk))
+            chunk_cells = compute_cell_statistics(chunk, statistic_columns)
+            cells = chunk_cells if cells is None else merge_cell_statistics([cells, chunk_cells])
+    except Exception as e:
+        return None, f"エラー：入力データの読み込み中にエラーが発生しました：{e}"
+    if cells is None:
+        return None, "エラー：入力データに行がありません。"
+    return cells, None
+
+def build_group_output(cells, name):
+    """出力定義に従って1つの集計結果を作成"""
+    spec = GROUP_OUTPUTS[name]
+    result = group_means(rollup(cells, spec['by'], spec['columns']), spec['columns'])
+    if spec.get('decimals') is not None:
+        result = result.round(spec['decimals'])
+    if spec.get('rename'):
+        result = result.rename(columns=spec['rename'])
+    if spec.get('series'):
+        result = result[spec['columns'][0]]
+    return result
+
+def write_group_outputs(names=None, cells=None, chunksize=None):
+    """集計結果のCSVファイルを書き出す。
+
+    names を省略すると GROUP_OUTPUTS のすべてを書き出す。セル単位の統計量は1回だけ計算し、
+    すべての出力で共有する。chunksize を指定すると入力データを chunksize 行ずつ読み込んで集計する。
+    戻り値は 出力名 -> 集計結果 の辞書（読み込みに失敗した場合は None）。
+    """
+    if names is None:
+        names = list(GROUP_OUTPUTS)
+    ensure_output_directories()
+
+    if cells is None:
+        cells, error = stream_cell_statistics(chunksize) if chunksize else load_cell_statistics()
+        if error:
+            print(error)
+            return None
+
+    results = {}
+    for name in names:
+        result = build_group_output(cells, name)
+        output_file = os.path.join(OUTPUT_DIR, f"{name}.csv")
+        result.to_csv(output_file)
+        results[name] = result
+        print(f"集計結果を保存しました: {output_file}")
+    return results
+
+def main(chunksize=None):
+    """すべての集計結果を1回の走査で作成（chunksize を指定すると入力データを分割して読み込む）"""
+    write_group_outputs(chunksize=chunksize)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Aggregate the model/text/persona/temperature trends in one pass.')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='Read the input data in chunks of this many rows (bounded memory)')
+    args = parser.parse_args()
+    main(args.chunksize)
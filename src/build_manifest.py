@@ -0,0 +1,159 @@
+"""パイプラインの差分実行のためのビルドマニフェスト。
+
+ステージ（言語ごとに描画するステージは ステージ×言語）ごとに、次の3つから作ったキーと、
+そのステージが書き出した results/ 以下のファイルの SHA-256 を results/cache/build_manifest.json に記録する。
+
+- 入力ファイルの SHA-256（data_all.csv は入力データのキャッシュのメタデータを再利用する）
+- コードのバージョン（ステージのモジュールと、そこから import される src/ 内のモジュール、
+  messages.json の SHA-256）
+- 設定（言語、VISUALIZATION_CONFIG、CLUSTERING_CONFIG、TOKENIZER_CONFIG、STATISTICS_CONFIG）
+
+キーが一致し、記録した出力ファイルがすべて記録時の内容のまま残っていれば、そのステージは実行しない。
+上流のステージを実行し直しても出力の内容が変わらなければ、下流のステージは実行されない。
+"""
+
+import ast
+import hashlib
+import json
+import os
+from config import (
+    CLUSTERING_CONFIG, DATA_PATHS, MESSAGES_PATH, OUTPUT_DIR, STATISTICS_CONFIG, TOKENIZER_CONFIG,
+    VISUALIZATION_CONFIG,
+    _dump_json, _file_sha256, _write_atomic, get_input_fingerprint
+)
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_VERSION = 1
+
+def _hash_json(obj):
+    """JSON に変換できるオブジェクトの SHA-256"""
+    text = json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def _local_imports(module_name):
+    """モジュールが（関数内も含めて）import している src/ 内のモジュール名"""
+    with open(os.path.join(SRC_DIR, f"{module_name}.py"), 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            names.add(node.module.split('.')[0])
+    return {name for name in names if os.path.exists(os.path.join(SRC_DIR, f"{name}.py"))}
+
+def code_version(module_name):
+    """ステージのモジュールと、そこから再帰的に import される src/ 内のモジュールのハッシュ"""
+    modules, pending = set(), [module_name]
+    while pending:
+        name = pending.pop()
+        if name not in modules:
+            modules.add(name)
+            pending.extend(_local_imports(name))
+    files = {f"{name}.py": _file_sha256(os.path.join(SRC_DIR, f"{name}.py")) for name in sorted(modules)}
+    files['messages.json'] = _file_sha256(MESSAGES_PATH)
+    return _hash_json(files)
+
+def input_hashes(paths):
+    """入力ファイルのパス -> SHA-256（存在しないファイルは None）"""
+    hashes = {}
+    for path in paths:
+        if not os.path.exists(path):
+            hashes[path] = None
+        elif os.path.normpath(path) == os.path.normpath(DATA_PATHS['input']):
+            hashes[path] = get_input_fingerprint(path)
+        else:
+            hashes[path] = _file_sha256(path)
+    return hashes
+
+def build_params(lang=None):
+    """出力に影響する設定"""
+    return {
+        'lang': lang,
+        'visualization': VISUALIZATION_CONFIG,
+        'clustering': CLUSTERING_CONFIG,
+        'tokenizer': TOKENIZER_CONFIG,
+        'statistics': STATISTICS_CONFIG,
+    }
+
+def snapshot_outputs(output_dir=OUTPUT_DIR):
+    """results/ 以下（キャッシュを除く）の各ファイルの (mtime, サイズ)"""
+    cache_dir = os.path.normpath(DATA_PATHS['cache_dir'])
+    snapshot = {}
+    for root, dirs, files in os.walk(output_dir):
+        dirs[:] = [d for d in dirs if os.path.normpath(os.path.join(root, d)) != cache_dir]
+        for name in files:
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+def changed_outputs(before, after):
+    """2つのスナップショットの間に作成・更新されたファイル"""
+    return sorted(path for path, stat in after.items() if before.get(path) != stat)
+
+def _figure_language(path):
+    """results/figures/<言語>/ 以下のファイルならその言語（それ以外は None）"""
+    parts = os.path.normpath(path).split(os.sep)
+    figures = os.path.normpath(os.path.join(OUTPUT_DIR, 'figures')).split(os.sep)
+    if parts[:len(figures)] == figures and len(parts) > len(figures) + 1:
+        return parts[len(figures)]
+    return None
+
+class BuildManifest:
+    """ステージごとのキーと出力ファイルのハッシュを記録するマニフェスト"""
+
+    def __init__(self, path=None):
+        self.path = path or DATA_PATHS['manifest']
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                if manifest.get('version') == MANIFEST_VERSION:
+                    self.entries = manifest.get('stages', {})
+            except (OSError, ValueError):
+                # 壊れたマニフェストは無視してすべてのステージを実行する
+                self.entries = {}
+
+    @staticmethod
+    def entry_name(stage, lang=None):
+        return stage if lang is None else f"{stage}:{lang}"
+
+    @staticmethod
+    def make_key(code, inputs, params):
+        """コードのバージョン・入力のハッシュ・設定から作るキー"""
+        return _hash_json({'code': code, 'inputs': inputs, 'params': params})
+
+    def stale_reason(self, stage, lang, key):
+        """ステージを実行する必要がある理由（最新なら None）"""
+        entry = self.entries.get(self.entry_name(stage, lang))
+        if entry is None:
+            return "実行履歴がありません"
+        if entry['key'] != key:
+            return "入力・コード・設定のいずれかが変更されました"
+        for path, recorded in entry['outputs'].items():
+            if not os.path.exists(path):
+                return f"出力ファイル {path} がありません"
+            if os.path.getsize(path) != recorded['size'] or _file_sha256(path) != recorded['sha256']:
+                return f"出力ファイル {path} が変更されました"
+        return None
+
+    def record(self, stage, langs, keys, outputs):
+        """実行したステージの出力を記録する（図は言語ごと、それ以外のファイルは全言語に記録）"""
+        hashes = {path: {'sha256': _file_sha256(path), 'size': os.path.getsize(path)}
+                  for path in outputs if os.path.exists(path)}
+        for lang, key in zip(langs, keys):
+            owned = {path: value for path, value in hashes.items()
+                     if _figure_language(path) in (None, lang)}
+            self.entries[self.entry_name(stage, lang)] = {'key': key, 'outputs': owned}
+
+    def forget(self, stage, langs):
+        """失敗したステージの記録を削除する"""
+        for lang in langs:
+            self.entries.pop(self.entry_name(stage, lang), None)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        _write_atomic(lambda p: _dump_json({'version': MANIFEST_VERSION, 'stages': self.entries}, p),
+                      self.path)
@@ -0,0 +1,98 @@
+"""config と各ステージのスクリプトのインポート時間を測り、予算を超えていないか確認するツール。
+
+モジュールごとに新しい Python プロセスでインポートし、次の2点を確認する。
+- インポート時間（Python の起動時間を除く、repeat 回のうち最小値）が IMPORT_TIME_BUDGET 以下であること
+- インポートしただけでは重いライブラリ（FORBIDDEN_MODULES）が読み込まれないこと
+
+予算を超えたモジュールがあれば終了コード1で終了する。
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from run_pipeline import PIPELINE_STAGES
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# インポート時間の予算（秒）。pandas が約0.5秒、matplotlib.pyplot が約0.5秒かかる環境で測定した値に余裕を持たせている
+IMPORT_TIME_BUDGET = {
+    'config': 0.1,      # pandas・matplotlib をインポートしない
+    'analysis': 0.8,    # pandas のみ
+    'plotting': 1.5,    # pandas と matplotlib.pyplot
+}
+
+# インポートしただけでは読み込まれてはいけないモジュール
+FORBIDDEN_MODULES = {
+    'config': ['pandas', 'matplotlib', 'seaborn', 'sklearn', 'scipy', 'japanize_matplotlib', 'adjustText'],
+    'analysis': ['matplotlib', 'seaborn', 'sklearn', 'japanize_matplotlib', 'adjustText'],
+    'plotting': ['seaborn', 'sklearn', 'japanize_matplotlib', 'adjustText'],
+}
+
+_CHILD_CODE = """
+import json, sys, time
+sys.path.insert(0, {src_dir!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'modules': sorted({{name.split('.')[0] for name in sys.modules}})}}))
+"""
+
+def module_category(module_name):
+    """モジュールの予算の区分"""
+    if module_name == 'config':
+        return 'config'
+    if module_name.endswith(('_visualize', '_similarity')) or module_name == 'persona_model_emotion':
+        return 'plotting'
+    return 'analysis'
+
+def measure_import(module_name, repeat=3):
+    """新しいプロセスでモジュールをインポートし、(最小のインポート時間, 読み込まれたモジュール名の集合) を返す"""
+    times, modules = [], set()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', _CHILD_CODE.format(src_dir=SRC_DIR, module=module_name)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result['elapsed'])
+        modules = set(result['modules'])
+    return min(times), modules
+
+def check_modules(module_names, repeat=3):
+    """各モジュールのインポート時間を表示し、予算を超えたモジュールのリストを返す"""
+    name_width = max(len(name) for name in module_names)
+    print(f"  {'module':<{name_width}}  {'import[s]':>9}  {'budget[s]':>9}  status")
+    failed = []
+    for name in module_names:
+        category = module_category(name)
+        elapsed, modules = measure_import(name, repeat)
+        budget = IMPORT_TIME_BUDGET[category]
+        loaded = [forbidden for forbidden in FORBIDDEN_MODULES[category] if forbidden in modules]
+        status = 'ok'
+        if elapsed > budget:
+            status = 'slow'
+        if loaded:
+            status = f"loads {', '.join(loaded)}"
+        if status != 'ok':
+            failed.append(name)
+        print(f"  {name:<{name_width}}  {elapsed:>9.3f}  {budget:>9.2f}  {status}")
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the import time of config and the pipeline scripts.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of measurements per module (the minimum is used)')
+    parser.add_argument('modules', nargs='*', help='Modules to check (default: config and all pipeline stages)')
+    args = parser.parse_args()
+
+    module_names = args.modules or ['config'] + [name for name, _, _ in PIPELINE_STAGES]
+    print("インポート時間:")
+    failed = check_modules(module_names, args.repeat)
+    if failed:
+        print(f"\n予算を超えたモジュール: {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""*_similarity.py で共通に使う、Fuzzy C-Means（FCM）クラスタリングとクラスター数の探索。
+
+FuzzyCMeans は NumPy だけで実装した FCM で、複数の初期値（シード）を (シード, 点, クラスター) の
+3次元配列としてまとめて更新し、目的関数が最小の結果を採用する。
+クラスター数の探索では、k ごとにランダムな初期値から学習した解と、k の解を初期値に加えて
+k+1 を学習した解（ウォームスタート）のうち、シルエットスコアが高い方を採用する。
+k ごとに独立なランダムな初期値からの学習は、プロセスプールで並列に実行する。
+シルエットスコアに使うペアワイズ距離行列は1回だけ計算し、すべての k で
+metric='precomputed' として再利用する。
+標準化と PCA による2次元への射影（Projection）は NumPy で計算し、データごとに1回だけ作って保存する。
+sklearn はインポートに時間がかかるため、使う関数の中でインポートする。
+"""
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from config import CLUSTERING_CONFIG, load_derived_table
+
+def _standardize(values):
+    """列ごとの平均と標準偏差（ddof=0、StandardScaler と同じく 0 の場合は 1）"""
+    std = values.std(axis=0)
+    return values.mean(axis=0), np.where(std > 0, std, 1.0)
+
+def _flip_signs(components):
+    """主成分の符号を、係数の絶対値が最大の成分が正になるようにそろえる（sklearn の PCA と同じ）"""
+    signs = np.sign(components[np.arange(len(components)), np.abs(components).argmax(axis=1)])
+    return components * signs[:, np.newaxis]
+
+def _fit_full(values):
+    """全データの SVD による標準化と PCA。戻り値は (平均, 標準偏差, 主成分)"""
+    mean, scale = _standardize(values)
+    scaled = (values - mean) / scale
+    _, _, vt = np.linalg.svd(scaled - scaled.mean(axis=0), full_matrices=False)
+    return mean, scale, vt
+
+def _fit_incremental(values, chunk_rows):
+    """chunk_rows 行ずつ集計した平均と共分散行列による標準化と PCA。
+
+    標準化したデータの共分散行列（相関行列）の固有ベクトルが主成分になるため、
+    点の数 × 次元の中間配列を作らずに、次元 × 次元の行列の固有値分解だけで計算できる。
+    桁落ちを避けるため、1行目を引いた値で集計する。
+    """
+    shift = values[0]
+    total = np.zeros(values.shape[1])
+    cross = np.zeros((values.shape[1], values.shape[1]))
+    for start in range(0, len(values), chunk_rows):
+        chunk = values[start:start + chunk_rows] - shift
+        total += chunk.sum(axis=0)
+        cross += chunk.T @ chunk
+    shifted_mean = total / len(values)
+    covariance = cross / len(values) - np.outer(shifted_mean, shifted_mean)
+    std = np.sqrt(np.maximum(np.diag(covariance), 0.0))
+    scale = np.where(std > 0, std, 1.0)
+    _, eigenvectors = np.linalg.eigh(covariance / np.outer(scale, scale))
+    return shift + shifted_mean, scale, eigenvectors[:, ::-1].T
+
+class Projection:
+    """データの標準化と、PCA による2次元への射影（FCMの結果の図で共通に使う）。
+
+    scaled（標準化済みのデータ）はクラスター数の探索と FCM に、data_2d・centers_2d は図に使う。
+    データだけから決まる部分（標準化の平均・標準偏差、標準化済みのデータ、主成分）は
+    load_projection() で results/cache に保存し、言語や図をまたいで再利用する。
+    クラスター中心の座標 centers_2d は FCM の後に set_centers() で追加する。
+    """
+
+    def __init__(self, index, columns, mean, scale, components):
+        self.index = list(index)
+        self.columns = list(columns)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.components = np.asarray(components, dtype=np.float64)
+        self.scaled = None
+        self.data_2d = None
+        self.centers_2d = None
+
+    @classmethod
+    def fit(cls, data, solver=None):
+        """DataFrame data（行が点、列が次元）に学習させ、data の射影を持つ Projection を返す。
+
+        solver は CLUSTERING_CONFIG['projection']['solver'] と同じ 'full'（SVD）、
+        'incremental'（行を分けて集計した共分散行列）、'auto'（点の数で選ぶ）のいずれか。
+        """
+        projection_config = CLUSTERING_CONFIG['projection']
+        solver = solver or projection_config['solver']
+        if solver == 'auto':
+            solver = 'full' if len(data) <= projection_config['full_max_rows'] else 'incremental'
+        values = data.to_numpy(dtype=np.float64)
+        if solver == 'full':
+            mean, scale, components = _fit_full(values)
+        elif solver == 'incremental':
+            mean, scale, components = _fit_incremental(values, projection_config['chunk_rows'])
+        else:
+            raise ValueError(f"不明な PCA の計算方法です: {solver}")
+        projection = cls(data.index, data.columns, mean, scale, _flip_signs(components[:2]))
+        projection._set_scaled(projection.transform(values))
+        return projection
+
+    def _set_scaled(self, scaled):
+        self.scaled = scaled
+        self.data_2d = scaled @ self.components.T
+
+    def transform(self, values):
+        """元のスケールの値を標準化する"""
+        return (np.asarray(values, dtype=np.float64) - self.mean) / self.scale
+
+    def inverse_transform(self, scaled):
+        """標準化した値を元のスケールに戻す"""
+        return np.asarray(scaled, dtype=np.float64) * self.scale + self.mean
+
+    def set_centers(self, centers):
+        """元のスケールのクラスター中心を射影して centers_2d に設定し、自身を返す。
+
+        これまでの図と同じく、中心はデータではなく中心どうしの平均・標準偏差で標準化してから射影する。
+        """
+        centers = np.asarray(centers, dtype=np.float64)
+        mean, scale = _standardize(centers)
+        self.centers_2d = ((centers - mean) / scale) @ self.components.T
+        return self
+
+    def to_frame(self):
+        """保存用の DataFrame（kind 列が mean / scale / component / point の行）に変換する"""
+        import pandas as pd
+        frame = pd.DataFrame(np.vstack([self.mean, self.scale, self.components, self.scaled]),
+                             columns=self.columns)
+        frame.insert(0, 'label', ['mean', 'scale'] + [f"pc{i + 1}" for i in range(len(self.components))]
+                     + [str(label) for label in self.index])
+        frame.insert(0, 'kind', ['mean', 'scale'] + ['component'] * len(self.components)
+                     + ['point'] * len(self.index))
+        return frame
+
+    @classmethod
+    def from_frame(cls, frame):
+        """to_frame() で保存した DataFrame から復元する"""
+        columns = [col for col in frame.columns if col not in ('kind', 'label')]
+        rows = {kind: group for kind, group in frame.groupby('kind', sort=False)}
+        points = rows['point']
+        projection = cls(points['label'], columns, rows['mean'][columns].to_numpy()[0],
+                         rows['scale'][columns].to_numpy()[0], rows['component'][columns].to_numpy())
+        projection._set_scaled(points[columns].to_numpy(dtype=np.float64))
+        return projection
+
+def load_projection(file_path, prepare):
+    """file_path から作るデータの Projection を読み込む（キャッシュがなければ作成する）。
+
+    prepare(file_path) は行が点、列が次元の DataFrame を返す関数。file_path は results の集計結果の CSV
+    （入力データではない）なので、射影はファイル内容の SHA-256 と CLUSTERING_CONFIG['projection'] ごとに
+    results/cache に保存する。
+    戻り値は (Projection, エラーメッセージ) の組。
+    """
+    def build(path):
+        return Projection.fit(prepare(path)).to_frame()
+
+    frame, error = load_derived_table('projection', build, 'PCA による射影', file_path,
+                                      CLUSTERING_CONFIG['projection'], input_data=False)
+    if error:
+        return None, error
+    return Projection.from_frame(frame), None
+
+def cluster_colors(n_clusters):
+    """クラスターごとの色のリスト（長さ n_clusters）。
+
+    CLUSTERING_CONFIG['colors']['cluster'] の色を順に使い、足りない分は tab10 の色で補う
+    （それでも足りない場合は繰り返す）。
+    """
+    from matplotlib import colormaps
+    from matplotlib.colors import to_hex
+    palette = list(CLUSTERING_CONFIG['colors']['cluster']) + [to_hex(c) for c in colormaps['tab10'].colors]
+    return [palette[i % len(palette)] for i in range(n_clusters)]
+
+def _squared_distances(X, centers):
+    """各点から各クラスター中心までの距離の二乗（centers は (シード, クラスター, 次元)）"""
+    squared = ((X ** 2).sum(axis=1)[np.newaxis, :, np.newaxis]
+               - 2.0 * np.einsum('nd,skd->snk', X, centers)
+               + (centers ** 2).sum(axis=2)[:, np.newaxis, :])
+    return np.maximum(squared, 0.0)
+
+def _memberships(squared, m):
+    """中心までの距離の二乗から所属度を計算（中心と一致する点はその中心に所属度1）"""
+    inverse = np.maximum(squared, np.finfo(np.float64).tiny) ** (-1.0 / (m - 1.0))
+    return inverse / inverse.sum(axis=-1, keepdims=True)
+
+def _centers(X, u, m):
+    """所属度から各クラスター中心を計算"""
+    weights = u ** m
+    return np.einsum('snk,nd->skd', weights, X) / weights.sum(axis=1)[:, :, np.newaxis]
+
+class FuzzyCMeans:
+    """NumPy による Fuzzy C-Means。
+
+    学習後は fcmeans.FCM と同じく u（点×クラスターの所属度）と centers（クラスター中心）を持つ。
+    n_init 個の初期値を並列に更新し、目的関数 Σ u^m d² が最小のものを採用する。
+    fit に init_centers を渡すと、それを1つ目の初期値として使う（残りはランダムな初期値）。
+    """
+
+    def __init__(self, n_clusters, m=None, max_iter=None, tol=None, n_init=None, random_state=None):
+        fcm_config = CLUSTERING_CONFIG['fcm']
+        self.n_clusters = n_clusters
+        self.m = m or fcm_config['m']
+        self.max_iter = max_iter or fcm_config['max_iter']
+        self.tol = tol or fcm_config['tol']
+        self.n_init = n_init or fcm_config['n_init']
+        self.random_state = CLUSTERING_CONFIG['random_state'] if random_state is None else random_state
+
+    def _initial_centers(self, X, init_centers):
+        """(シード, クラスター, 次元) の初期中心を作成（ランダムな所属度から計算）"""
+        rng = np.random.default_rng(self.random_state)
+        n_random = self.n_init - (init_centers is not None)
+        u = rng.uniform(size=(n_random, len(X), self.n_clusters))
+        centers = _centers(X, u / u.sum(axis=2, keepdims=True), self.m)
+        if init_centers is not None:
+            centers = np.concatenate([np.asarray(init_centers, dtype=np.float64)[np.newaxis], centers])
+        return centers
+
+    def fit(self, X, init_centers=None):
+        """データ X（点×次元）に学習させる"""
+        X = np.asarray(X, dtype=np.float64)
+        centers = self._initial_centers(X, init_centers)
+        u = _memberships(_squared_distances(X, centers), self.m)
+        active = np.ones(len(centers), dtype=bool)
+
+        for iteration in range(1, self.max_iter + 1):
+            # 収束していない初期値だけをまとめて更新する
+            new_centers = _centers(X, u[active], self.m)
+            new_u = _memberships(_squared_distances(X, new_centers), self.m)
+            change = np.sqrt(((new_u - u[active]) ** 2).sum(axis=(1, 2)))
+            centers[active], u[active] = new_centers, new_u
+            active[np.flatnonzero(active)[change < self.tol]] = False
+            if not active.any():
+                break
+        self.n_iter = iteration
+
+        objective = ((u ** self.m) * _squared_distances(X, centers)).sum(axis=(1, 2))
+        best = int(np.nanargmin(objective))
+        self.u, self.centers, self.objective = u[best], centers[best], float(objective[best])
+        return self
+
+    def split_centers(self, X):
+        """k+1 クラスターの初期中心（目的関数への寄与が最も大きい点を中心に加える）"""
+        X = np.asarray(X, dtype=np.float64)
+        contribution = ((self.u ** self.m) * _squared_distances(X, self.centers[np.newaxis])[0]).sum(axis=1)
+        return np.vstack([self.centers, X[np.argmax(contribution)]])
+
+def _fit_cold(args):
+    """プロセスプールで実行する、1つのクラスター数のランダムな初期値だけからの学習"""
+    scaled_data, n_clusters = args
+    return FuzzyCMeans(n_clusters=n_clusters).fit(scaled_data)
+
+def _worker_count(n_tasks):
+    """並列実行するプロセス数（CLUSTERING_CONFIG['n_jobs'] が None ならCPU数）"""
+    n_jobs = CLUSTERING_CONFIG.get('n_jobs') or os.cpu_count() or 1
+    return max(1, min(n_jobs, n_tasks))
+
+def _fit_cold_all(scaled_data, cluster_counts):
+    """各クラスター数のランダムな初期値だけからの学習（互いに独立なのでプロセスプールで並列に実行する）"""
+    tasks = [(scaled_data, n) for n in cluster_counts]
+    workers = _worker_count(len(tasks))
+    if workers == 1:
+        return [_fit_cold(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as executor:
+        return list(executor.map(_fit_cold, tasks))
+
+def silhouette_sweep(scaled_data, max_clusters=None):
+    """クラスター数 2..max_clusters の FCM を学習し、シルエットスコアを計算する。
+
+    各 k についてランダムな初期値だけから学習した解（コールドスタート）と、k-1 の解から作った
+    初期中心を含めて学習した解（ウォームスタート）を作り、シルエットスコアが高い方を採用する
+    （同じ場合はコールドスタート）。目的関数が小さい解のシルエットスコアが高いとは限らないため、
+    ウォームスタートの解だけでは k の選択が変わることがある。コールドスタートの学習は k ごとに
+    独立なのでプロセスプールで並列に行い、k-1 の解に依存するウォームスタートだけを順に行う。
+    戻り値は (クラスター数のリスト, シルエットスコアのリスト, クラスター数 -> 学習済みの FuzzyCMeans の辞書)。
+    """
+    from sklearn.metrics import pairwise_distances, silhouette_score
+    max_clusters = max_clusters or CLUSTERING_CONFIG['max_clusters']
+    cluster_counts = list(range(2, max_clusters + 1))
+    cold_models = _fit_cold_all(scaled_data, cluster_counts)
+
+    # 距離行列は1回だけ計算してすべてのクラスター数で共有する
+    distances = pairwise_distances(scaled_data)
+
+    def score(fcm):
+        labels = fcm.u.argmax(axis=1)
+        # すべての点が1つのクラスターに属する場合はシルエットスコアを定義できないので最小値とする
+        return (silhouette_score(distances, labels, metric='precomputed')
+                if len(np.unique(labels)) > 1 else -1.0)
+
+    scores, models = [], {}
+    init_centers = None
+    for n, fcm in zip(cluster_counts, cold_models):
+        best = score(fcm)
+        if init_centers is not None:
+            warm = FuzzyCMeans(n_clusters=n).fit(scaled_data, init_centers=init_centers)
+            warm_score = score(warm)
+            if warm_score > best:
+                fcm, best = warm, warm_score
+        scores.append(best)
+        models[n] = fcm
+        init_centers = fcm.split_centers(scaled_data)
+    return cluster_counts, scores, models
@@ -1,44 +1,59 @@
-"""Configuration settings for analysis scripts."""
+"""Configuration settings for analysis scripts.
+
+インポートを軽くするため、pandas・matplotlib は使う関数の中でインポートし、
+messages.json から作る定数（ANALYSIS_COLUMNS、EMOTION_DIMENSIONS など）は最初に参照したときに作成する。
+"""
 
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
+import sys
+import argparse
+import hashlib
+import multiprocessing
 import json
 
 # Output directory for analysis results
 OUTPUT_DIR = "results"
 
-# messages.jsonのキャッシュ
-_messages_cache = None
+# 図を作成する言語
+LANGUAGES = ['ja', 'en']
+
+# messages.json と、それを平坦化したメッセージカタログの保存先
+# （カタログは作業ディレクトリによらず、リポジトリ直下の results/cache に保存する）
+MESSAGES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'messages.json')
+MESSAGE_CATALOG_CACHE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     OUTPUT_DIR, 'cache', 'messages.catalog.pkl')
+
+# メッセージカタログ（最初に使うときに読み込む）
+_message_catalog = None
 
-def _load_messages():
-    """messages.jsonを読み込み、キャッシュする内部関数"""
-    global _messages_cache
-    if _messages_cache is None:
-        with open('src/messages.json', 'r', encoding='utf-8') as f:
-            _messages_cache = json.load(f)
-    return _messages_cache
+def get_message_catalog():
+    """messages.json を平坦化したメッセージカタログを返す（message_catalog.py を参照）"""
+    global _message_catalog
+    if _message_catalog is None:
+        from message_catalog import MessageCatalog
+        _message_catalog = MessageCatalog.load(MESSAGES_PATH, LANGUAGES, MESSAGE_CATALOG_CACHE)
+    return _message_catalog
+
+def get_messages():
+    """messages.json 全体（入れ子の辞書）を返す"""
+    return get_message_catalog().messages
 
 def get_message(key_path, lang='ja'):
     """
-    messages.jsonから指定されたキーパスと言語のメッセージを取得する。
+    messages.jsonから指定されたキーパスのメッセージを取得する。
     例: get_message('common.emotion_dimensions.Q1value', 'ja')
     """
-    messages = _load_messages()
-    keys = key_path.split('.')
-
-    current_dict = messages # トップレベルから検索を開始
-
-    for i, key in enumerate(keys):
-        if key in current_dict:
-            current_dict = current_dict[key]
-        elif i == 0 and key == lang: # 最初のキーが言語の場合
-            current_dict = messages.get(lang, {})
-        elif i == 0 and key == 'common': # 最初のキーがcommonの場合
-            current_dict = messages.get('common', {})
-        else:
-            raise KeyError(f"Key path '{key_path}' not found in messages.json for language '{lang}' or common section.")
-    return current_dict
+    return get_message_catalog().get(key_path)
+
+def get_text(section, key, lang='ja'):
+    """(セクション, 言語, キー) のメッセージ文字列を取得する。
+    例: get_text('model_emotion', 'title', 'en')、get_text('common', 'text_mapping.t1', 'ja')
+    """
+    return get_message_catalog().text(section, key, lang)
+
+def lookup_id(mapping, display_name, lang=None):
+    """表示名から ID を逆引きする。例: lookup_id('common.persona_mapping', '大学1年生') -> 'p1'"""
+    return get_message_catalog().lookup_id(mapping, display_name, lang)
 
 # 視覚化の共通設定
 VISUALIZATION_CONFIG = {
@@ -56,45 +71,119 @@ VISUALIZATION_CONFIG = {
     },
     'save': {
         'formats': ['png', 'pdf'],
-        'bbox_inches': 'tight'
-    }
+        'bbox_inches': 'tight',
+        'workers': 0,  # 1以上にするとPNGのエンコードとPDFの書き出しをワーカープロセスで並行して行う
+    },
+    'jobs': {
+        'workers': None,  # 図を描画・保存するワーカープロセスの数（None はCPUコア数、1以下はこのプロセスで順に描画）
+    },
+    'swarm': {
+        'max_points': 1000,   # カテゴリごとの点の数がこれを超えたらドット密度の表示に切り替える
+        'density_bins': 40,   # ドット密度の表示で値を分ける区間の数
+    },
+    'violin': {
+        'gridsize': 100,   # 密度曲線の格子点の数（seaborn の violinplot の既定と同じ）
+        'cut': 2,          # 最小値・最大値からバンド幅の何倍まで曲線を延ばすか
+        'bw_adjust': 1,    # Scott の規則によるバンド幅に掛ける係数
+    },
+    'label_layout': {
+        'rings': 4,        # 点からの距離の段の数（ラベルの候補位置は 段の数 × 8方向）
+        'iterations': 5,   # 貪欲法で配置した後に各ラベルの位置を選び直す回数の上限
+    },
 }
 
-# Analysis target columns
-ANALYSIS_COLUMNS = {
-    'values': list(get_message('common.emotion_dimensions').keys()),
-    'reasons': list(get_message('common.reason_dimensions').keys()),
+# messages.json から作る定数（最初に参照したときに作成する。_LAZY_CONSTANTS を参照）
+def _analysis_columns():
+    """分析対象の列"""
+    columns = {
+        'values': list(get_message('common.emotion_dimensions').keys()),
+        'reasons': list(get_message('common.reason_dimensions').keys()),
+    }
+    columns['all'] = columns['values'] + columns['reasons']
+    # 1回の実行を識別するキー列（列を絞って読み込む場合も常に含める）
+    columns['keys'] = ['text', 'model', 'persona', 'temperature', 'trial']
+    return columns
+
+_LAZY_CONSTANTS = {
+    # Analysis target columns
+    'ANALYSIS_COLUMNS': _analysis_columns,
+    # 理由文の文字数列（load_reason_lengths が返す列）
+    'REASON_LENGTH_COLUMNS': lambda: [f"{col}_length" for col in _lazy_constant('ANALYSIS_COLUMNS')['reasons']],
+    # 感情次元の定義
+    'EMOTION_DIMENSIONS': lambda: get_message('common.emotion_dimensions'),
+    # 理由次元の定義
+    'REASON_DIMENSIONS': lambda: get_message('common.reason_dimensions'),
+    # ペルソナの色定義
+    'PERSONA_COLORS': lambda: get_message('common.persona_colors'),
+    # 文学作品の順序定義
+    'TEXT_ORDER': lambda: list(get_message('common.text_mapping').keys()),
 }
-ANALYSIS_COLUMNS['all'] = ANALYSIS_COLUMNS['values'] + ANALYSIS_COLUMNS['reasons']
 
-# 感情次元の定義
-EMOTION_DIMENSIONS = get_message('common.emotion_dimensions')
+def _lazy_constant(name):
+    """遅延評価する定数の値（最初に参照したときに作成し、モジュールの属性として保持する）"""
+    if name not in globals():
+        globals()[name] = _LAZY_CONSTANTS[name]()
+    return globals()[name]
+
+def __getattr__(name):
+    """from config import EMOTION_DIMENSIONS などで遅延評価する定数を参照したときに呼ばれる"""
+    if name in _LAZY_CONSTANTS:
+        return _lazy_constant(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# 理由文テキストのトークン化の設定（temperature_reason_visualize.py の多様性分析で使用）
+# tokenizer: 'word'（TfidfVectorizerの既定と同じ単語分割）、'char_ngram'（文字n-gram）、
+#            'segment'（辞書を使わない文字種による分割）
+# ngram_range: char_ngram で使う文字数の範囲
+TOKENIZER_CONFIG = {
+    'tokenizer': 'word',
+    'ngram_range': (2, 3),
+}
 
-# 理由次元の定義
-REASON_DIMENSIONS = get_message('common.reason_dimensions')
+# 要約統計量の設定（*_statistics.py で使用）
+# percentiles: 中央値に加えて出力するパーセンタイル（p25 などの名前で出力）
+# sketch_k: temperature_emotion_statistics.py --chunksize のセルごとの分位点スケッチの大きさ
+#           （値が sketch_k 件以下のセルは正確な値、それより多いセルは近似値になる。
+#            --chunksize を指定しない場合は常に正確な値を求める）
+STATISTICS_CONFIG = {
+    'percentiles': [25, 75],
+    'sketch_k': 200,
+}
 
 # クラスタリング分析の設定
 CLUSTERING_CONFIG = {
     'max_clusters': 10,
+    'random_state': 42,
+    'n_jobs': None,  # クラスター数の探索でランダムな初期値からの学習に使うプロセス数（None はCPU数）
+    'fcm': {
+        'm': 2.0,          # ファジィ度
+        'max_iter': 150,   # 最大反復回数
+        'tol': 1e-5,       # 所属度の変化（フロベニウスノルム）がこの値未満で収束とみなす
+        'n_init': 8,       # まとめて学習する初期値の数
+    },
+    'projection': {
+        'solver': 'auto',        # PCA の計算方法（'full': SVD、'incremental': 行を分けて集計、'auto': 点の数で選ぶ）
+        'full_max_rows': 10000,  # 'auto' でこの点の数までは 'full' を使う
+        'chunk_rows': 100000,    # 'incremental' で1回に集計する行数
+    },
     'colors': {
         'cluster': ['#9932CC', '#FFD700']  # パープル、ゴールド
     },
-    'text': {
-        'cluster_description': {
-            1: get_message('model_emotion_similarity.ja.cluster_description').split('\n')[1].strip().replace('　', ''), # 日本語のクラスタ1の説明
-            2: get_message('model_emotion_similarity.ja.cluster_description').split('\n')[2].strip().replace('　', '')  # 日本語のクラスタ2の説明
-        }
-    }
 }
 
 # Common file paths
 DATA_PATHS = {
     'input': './data_all.csv',
+    'cache_dir': f"{OUTPUT_DIR}/cache",
+    'manifest': f"{OUTPUT_DIR}/cache/build_manifest.json",
     'missing_report': f"{OUTPUT_DIR}/missing_values_report.csv",
     'missing_by_model': f"{OUTPUT_DIR}/missing_values_by_model.csv",
     'missing_summary': f"{OUTPUT_DIR}/missing_values_summary.csv"
 }
 
+# 入力データのうちカテゴリ型として保持する列
+CATEGORICAL_COLUMNS = ['text', 'developer', 'model', 'persona']
+
 # ファイル操作の共通関数
 def ensure_output_directories():
     """必要な出力ディレクトリを作成"""
@@ -108,35 +197,432 @@ def ensure_output_directories():
             print(f"ディレクトリを作成しました: {dir_path}")
 
 def save_figure(plt, filename, output_dir=OUTPUT_DIR, lang='ja'):
-    """図を複数フォーマットで保存する共通関数。言語に応じたディレクトリに保存"""
+    """図を複数フォーマットで保存する共通関数。言語に応じたディレクトリに保存
+
+    図の描画は1回だけ行い、その結果を各フォーマットで書き出す（figure_writer.py を参照）。
+    """
+    from figure_writer import write_figure
+
     lang_dir = 'ja' if lang == 'ja' else 'en'
     fig_dir = os.path.join(output_dir, 'figures', lang_dir)
     os.makedirs(fig_dir, exist_ok=True)
     
     base_path = os.path.join(fig_dir, filename)
-    saved_files = []
-    for fmt in VISUALIZATION_CONFIG['save']['formats']:
-        full_path = f"{base_path}.{fmt}"
-        plt.savefig(
-            full_path,
-            dpi=VISUALIZATION_CONFIG['figure']['dpi'],
-            bbox_inches=VISUALIZATION_CONFIG['save']['bbox_inches']
-        )
-        saved_files.append(full_path)
-    return saved_files
-
-def safe_read_csv(file_path):
-    """エラーハンドリング付きでCSVファイルを読み込む"""
+    save_config = VISUALIZATION_CONFIG['save']
+    return write_figure(
+        plt, base_path, save_config['formats'],
+        dpi=VISUALIZATION_CONFIG['figure']['dpi'],
+        bbox_inches=save_config['bbox_inches'],
+        workers=save_config.get('workers', 0)
+    )
+
+def parse_languages(value):
+    """--lang の値を言語のリストに変換する。
+
+    'ja' / 'en' のほか、'ja,en' のようなカンマ区切りと 'all'（すべての言語）を受け付ける。
+    リストが渡された場合は検証してそのまま返す。
+    """
+    if isinstance(value, str):
+        value = LANGUAGES if value == 'all' else [v.strip() for v in value.split(',') if v.strip()]
+    langs = list(dict.fromkeys(value))
+    if not langs or any(lang not in LANGUAGES for lang in langs):
+        raise argparse.ArgumentTypeError(
+            f"不明な言語です: {value}（ja, en, ja,en, all のいずれかを指定してください）")
+    return langs
+
+def _render_language(render, lang):
+    """1つの言語の描画を行う（日本語の場合のみ日本語フォントを有効にする）"""
+    import matplotlib.pyplot as plt
+    with plt.rc_context():
+        if lang == 'ja':
+            import japanize_matplotlib
+            japanize_matplotlib.japanize()
+        render(lang)
+        # submit_figure で登録した図を、この言語の設定のまま描画し終える
+        from figure_jobs import wait_for_figures
+        wait_for_figures()
+        plt.close('all')
+
+def _render_child(render, lang, sender):
+    """fork した子プロセスで1つの言語の描画を行い、図ごとの書き出し時間を親プロセスに送る"""
+    import figure_writer
+    start = len(figure_writer.FIGURE_TIMINGS)
+    _render_language(render, lang)
+    if figure_writer.wait_for_figure_writes():
+        raise RuntimeError(f"言語 {lang} の図の書き出しに失敗しました")
+    sender.send(figure_writer.FIGURE_TIMINGS[start:])
+
+def run_languages(render, langs):
+    """言語ごとに render(lang) を実行する。
+
+    複数の言語を指定した場合は、render を呼ぶ前に済ませた計算結果を共有したまま、
+    fork した子プロセスで言語ごとの描画を並行して行う（fork を使えない環境では順に実行する）。
+    """
+    langs = parse_languages(langs)
+    if len(langs) == 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        for lang in langs:
+            _render_language(render, lang)
+        return
+
+    import figure_jobs
+    import figure_writer
+    context = multiprocessing.get_context('fork')
+    # 出力のバッファが子プロセスに複製されないよう、fork の前に書き出しておく
+    sys.stdout.flush()
+    sys.stderr.flush()
+    children = []
+    # 言語ごとの子プロセスが図を描画するワーカープロセスの数は、CPU コア数を言語の数で分ける
+    figure_jobs.set_process_share(len(langs))
     try:
-        return pd.read_csv(file_path), None
+        for lang in langs:
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_render_child, args=(render, lang, sender))
+            process.start()
+            sender.close()
+            children.append((lang, process, receiver))
+    finally:
+        figure_jobs.set_process_share(1)
+
+    failed = []
+    for lang, process, receiver in children:
+        try:
+            timings = receiver.recv()
+        except EOFError:
+            timings = None
+        process.join()
+        if timings is None or process.exitcode != 0:
+            failed.append(lang)
+        else:
+            figure_writer.FIGURE_TIMINGS.extend(timings)
+    if failed:
+        raise RuntimeError(f"言語 {', '.join(failed)} の描画に失敗しました")
+
+def safe_read_csv(file_path, usecols=None):
+    """エラーハンドリング付きでCSVファイルを読み込む（usecolsで読み込む列を限定できる）"""
+    import pandas as pd
+    try:
+        return pd.read_csv(file_path, usecols=usecols), None
     except FileNotFoundError:
         return None, f"エラー：ファイル '{file_path}' が見つかりません。"
     except Exception as e:
         return None, f"エラー：ファイル '{file_path}' の読み込み中にエラーが発生しました：{e}"
 
+def _file_sha256(file_path, block_size=1 << 20):
+    """ファイル内容のSHA-256ハッシュを計算"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _cache_format():
+    """キャッシュの保存形式を決定（pyarrowがあればParquet、なければpickle）"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return 'pickle'
+    return 'parquet'
+
+def _write_atomic(write_func, path):
+    """一時ファイルに書き出してから置き換え、読み込み途中のキャッシュを見せない"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write_func(tmp_path)
+    os.replace(tmp_path, path)
+
+def _input_cache_paths(file_path, fmt, name=None):
+    """入力ファイルに対応するキャッシュファイルとメタデータのパス（nameは派生テーブル名）"""
+    base = os.path.splitext(os.path.basename(file_path))[0]
+    if name:
+        base = f"{base}.{name}"
+    ext = 'parquet' if fmt == 'parquet' else 'pkl'
+    cache_dir = DATA_PATHS['cache_dir']
+    return os.path.join(cache_dir, f"{base}.{ext}"), os.path.join(cache_dir, f"{base}.meta.json")
+
+def _is_cache_valid(file_path, cache_path, meta_path, fmt):
+    """キャッシュが入力ファイルと一致するか確認する。
+    mtimeとサイズが一致すれば有効とし、mtimeだけが変わった場合はハッシュで確認する。
+    """
+    if not (os.path.exists(cache_path) and os.path.exists(meta_path)):
+        return False, None
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    stat = os.stat(file_path)
+    if meta.get('format') != fmt or meta.get('size') != stat.st_size:
+        return False, meta
+    if meta.get('mtime_ns') == stat.st_mtime_ns:
+        return True, meta
+    if meta.get('sha256') == _file_sha256(file_path):
+        # 内容は同じなのでmtimeだけ更新して次回からハッシュ計算を省略する
+        meta['mtime_ns'] = stat.st_mtime_ns
+        _write_atomic(lambda p: _dump_json(meta, p), meta_path)
+        return True, meta
+    return False, meta
+
+def _dump_json(obj, path):
+    """JSONファイルを書き出す"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+
+def _write_frame(df, path, fmt):
+    """DataFrameをキャッシュ形式で書き出す"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if fmt == 'parquet':
+        _write_atomic(lambda p: df.to_parquet(p, index=False), path)
+    else:
+        _write_atomic(lambda p: df.to_pickle(p), path)
+
+def _read_frame(path, fmt, columns=None):
+    """キャッシュ形式のDataFrameを読み込む"""
+    import pandas as pd
+    if fmt == 'parquet':
+        return pd.read_parquet(path, columns=columns)
+    df = pd.read_pickle(path)
+    return df if columns is None else df[list(columns)]
+
+def _is_appended(file_path, size, sha256):
+    """ファイルが (size, sha256) の版の末尾に行を追加しただけのものか確認する。
+
+    先頭 size バイトの SHA-256 が一致し、追加前の版が改行で終わっている場合だけ True を返す
+    （改行で終わっていなければ、最後の行に追記された可能性がある）。
+    """
+    if not size or not sha256 or os.path.getsize(file_path) <= size:
+        return False
+    digest = hashlib.sha256()
+    remaining = size
+    with open(file_path, 'rb') as f:
+        while remaining:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                return False
+            digest.update(block)
+            remaining -= len(block)
+        f.seek(size - 1)
+        last_byte = f.read(1)
+    return last_byte == b'\n' and digest.hexdigest() == sha256
+
+def _read_appended_rows(file_path, offset):
+    """ファイルの offset バイト目以降（追加された行）だけをヘッダー行と合わせて読み込む"""
+    import io
+    import pandas as pd
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        f.seek(offset)
+        tail = f.read()
+    return pd.read_csv(io.BytesIO(header + tail))
+
+def _timestamp_watermark(df, previous=None):
+    """timestamp 列の最大値と previous（前回の最大値）の大きい方（ISO形式の文字列。列がなければ None）"""
+    import pandas as pd
+    if 'timestamp' not in df.columns:
+        return previous
+    candidates = pd.to_datetime(df['timestamp'], errors='coerce')
+    if previous is not None:
+        candidates = pd.concat([candidates, pd.Series([pd.Timestamp(previous)])])
+    latest = candidates.max()
+    return None if pd.isna(latest) else latest.isoformat()
+
+def _build_input_cache(file_path, cache_path, meta_path, fmt, previous=None):
+    """CSVを読み込み、型付けした列指向キャッシュを作成する。
+
+    previous（前回のキャッシュのメタデータ）の版に行を追加しただけの場合は、追加された行だけを
+    解析して前回のキャッシュに追加する。メタデータには取り込んだ行数・バイト数（ウォーターマーク）と
+    timestamp の最大値を記録する。
+    """
+    import pandas as pd
+    df, appended = None, None
+    if (previous and previous.get('format') == fmt and previous.get('rows') is not None
+            and os.path.exists(cache_path) and _is_appended(file_path, previous['size'], previous['sha256'])):
+        cached = _read_frame(cache_path, fmt)
+        if len(cached) == previous['rows']:
+            appended = _read_appended_rows(file_path, previous['size'])
+            df = pd.concat([cached, appended], ignore_index=True)
+    if df is None:
+        df = pd.read_csv(file_path)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    _write_frame(df, cache_path, fmt)
+
+    stat = os.stat(file_path)
+    meta = {
+        'source': os.path.abspath(file_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': _file_sha256(file_path),
+        'format': fmt,
+        'rows': len(df),
+        'timestamp_watermark': (_timestamp_watermark(df) if appended is None
+                                else _timestamp_watermark(appended, previous.get('timestamp_watermark'))),
+    }
+    _write_atomic(lambda p: _dump_json(meta, p), meta_path)
+    if appended is not None:
+        print(f"入力データに追加された {len(appended)} 行をキャッシュに追加しました: {cache_path}"
+              f"（{previous['rows']} → {meta['rows']} 行、timestamp の最大値: "
+              f"{previous.get('timestamp_watermark')} → {meta['timestamp_watermark']}）")
+    else:
+        print(f"入力データのキャッシュを作成しました: {cache_path}")
+    return df
+
+def load_input_data(file_path=None, columns=None):
+    """入力データ（data_all.csv）をキャッシュ経由で読み込む。
+
+    初回はCSVを解析して model/persona/text などをカテゴリ型にした列指向ファイルを
+    results/cache に保存し、以降は入力ファイルが変わらない限りそのファイルを読み込む。
+    columns を指定するとその列だけを読み込む（Parquetの場合は他の列を読み込まない）。
+    戻り値は safe_read_csv と同じ (DataFrame, エラーメッセージ) の組。
+    """
+    if file_path is None:
+        file_path = DATA_PATHS['input']
+    if not os.path.exists(file_path):
+        return None, f"エラー：ファイル '{file_path}' が見つかりません。"
+
+    fmt = _cache_format()
+    cache_path, meta_path = _input_cache_paths(file_path, fmt)
+    try:
+        valid, meta = _is_cache_valid(file_path, cache_path, meta_path, fmt)
+        if valid:
+            return _read_frame(cache_path, fmt, columns), None
+        df = _build_input_cache(file_path, cache_path, meta_path, fmt, previous=meta)
+        return (df if columns is None else df[list(columns)]), None
+    except Exception as e:
+        return None, f"エラー：ファイル '{file_path}' の読み込み中にエラーが発生しました：{e}"
+
+def iter_input_chunks(file_path=None, columns=None, chunksize=100000):
+    """入力データを chunksize 行ずつの DataFrame として順に返す（全体をメモリに読み込まない）。
+
+    入力データのキャッシュ（Parquet）が最新であれば行グループをまたいでバッチ単位で読み込み、
+    そうでなければ CSV をそのまま chunksize 行ずつ解析する（キャッシュは作成しない）。
+    columns を指定するとその列だけを columns の順に返す。
+    """
+    import pandas as pd
+    if file_path is None:
+        file_path = DATA_PATHS['input']
+    fmt = _cache_format()
+    cache_path, meta_path = _input_cache_paths(file_path, fmt)
+    if fmt == 'parquet' and _is_cache_valid(file_path, cache_path, meta_path, fmt)[0]:
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(cache_path)
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+    with pd.read_csv(file_path, usecols=columns, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield chunk if columns is None else chunk[list(columns)]
+
+def get_input_metadata(file_path=None):
+    """入力データのキャッシュのメタデータ（SHA-256・サイズ・行数など）を返す（必要ならキャッシュを作成する）"""
+    if file_path is None:
+        file_path = DATA_PATHS['input']
+    fmt = _cache_format()
+    cache_path, meta_path = _input_cache_paths(file_path, fmt)
+    valid, meta = _is_cache_valid(file_path, cache_path, meta_path, fmt)
+    if not valid:
+        _build_input_cache(file_path, cache_path, meta_path, fmt, previous=meta)
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    return meta
+
+def get_input_fingerprint(file_path=None):
+    """入力データのSHA-256を返す（キャッシュのメタデータを再利用し、必要ならキャッシュを作成する）"""
+    return get_input_metadata(file_path)['sha256']
+
+def _build_reason_lengths(file_path, start=0):
+    """理由文の文字数テーブル（実行キー + 各理由文の文字数 + 合計）を入力データの start 行目以降について作成"""
+    analysis_columns = _lazy_constant('ANALYSIS_COLUMNS')
+    df, error = load_input_data(file_path, columns=analysis_columns['keys'] + analysis_columns['reasons'])
+    if error:
+        raise RuntimeError(error)
+    df = df.iloc[start:]
+    return df[analysis_columns['keys']].join(compute_reason_lengths(df))
+
+def compute_reason_lengths(df):
+    """理由文の各列の文字数と合計（REASON_LENGTH_COLUMNS と total_reason_length の列）を計算する"""
+    import pandas as pd
+    lengths = pd.DataFrame(index=df.index)
+    for col in _lazy_constant('ANALYSIS_COLUMNS')['reasons']:
+        # 欠損した理由文は0文字として扱う（チャンク内がすべて欠損した列は float 型になるため object 型にしてから数える）
+        lengths[f"{col}_length"] = df[col].astype(object).str.len().fillna(0).astype('int32')
+    lengths['total_reason_length'] = lengths[_lazy_constant('REASON_LENGTH_COLUMNS')].sum(axis=1).astype('int32')
+    return lengths
+
+def _append_rows(previous, addition):
+    """行単位の派生テーブルに追加分の行を連結する（カテゴリ型の列は型を保つ）"""
+    import pandas as pd
+    combined = pd.concat([previous, addition], ignore_index=True)
+    for col in previous.columns:
+        if isinstance(previous[col].dtype, pd.CategoricalDtype):
+            combined[col] = combined[col].astype('category')
+    return combined
+
+def load_derived_table(name, build_func, label, file_path=None, params=None, append=False, merge_func=None,
+                       input_data=True):
+    """入力データから派生したテーブルを、入力データのバージョンごとにキャッシュして読み込む。
+
+    build_func(file_path) が返す DataFrame を入力データのキャッシュと同じ results/cache に保存し、
+    入力データの SHA-256 と params（作成時の設定）が変わらない限りそのファイルを読み込む。
+
+    append=True の場合、build_func(file_path, start) は入力データの start 行目以降から作ったテーブルを返す。
+    入力データが前回の版の末尾に行を追加しただけなら、追加された行だけから作ったテーブルを
+    merge_func(前回のテーブル, 追加分のテーブル)（省略時は行の連結）で前回のテーブルに結合する。
+    file_path が入力データ（data_all.csv の形式）ではないファイル（results の集計結果の CSV など）の場合は
+    input_data=False とする。入力データのキャッシュは作らず、ファイル内容の SHA-256 で区別する。
+    戻り値は (DataFrame, エラーメッセージ) の組。
+    """
+    if file_path is None:
+        file_path = DATA_PATHS['input']
+    if not os.path.exists(file_path):
+        return None, f"エラー：ファイル '{file_path}' が見つかりません。"
+
+    fmt = _cache_format()
+    cache_path, meta_path = _input_cache_paths(file_path, fmt, name=name)
+    try:
+        if input_data:
+            input_meta = get_input_metadata(file_path)
+        else:
+            input_meta = {'sha256': _file_sha256(file_path), 'size': os.path.getsize(file_path), 'rows': None}
+        expected = json.loads(json.dumps({'input_sha256': input_meta['sha256'], 'format': fmt, 'params': params}))
+        meta = None
+        if os.path.exists(cache_path) and os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if all(meta.get(key) == value for key, value in expected.items()):
+                return _read_frame(cache_path, fmt), None
+
+        table = None
+        if (append and meta and meta.get('input_rows') is not None
+                and all(meta.get(key) == expected[key] for key in ('format', 'params'))
+                and _is_appended(file_path, meta.get('input_size'), meta.get('input_sha256'))):
+            # 前回の版以降に追加された行だけを計算して結合する
+            addition = build_func(file_path, meta['input_rows'])
+            table = (merge_func or _append_rows)(_read_frame(cache_path, fmt), addition)
+            print(f"{label}に追加された {input_meta['rows'] - meta['input_rows']} 行を反映しました: {cache_path}")
+        if table is None:
+            table = build_func(file_path, 0) if append else build_func(file_path)
+            print(f"{label}を作成しました: {cache_path}")
+        _write_frame(table, cache_path, fmt)
+        expected.update({'input_size': input_meta['size'], 'input_rows': input_meta.get('rows')})
+        _write_atomic(lambda p: _dump_json(expected, p), meta_path)
+        return table, None
+    except Exception as e:
+        return None, f"エラー：ファイル '{file_path}' の{label}の作成中にエラーが発生しました：{e}"
+
+def load_reason_lengths(file_path=None):
+    """理由文の文字数テーブルを読み込む。
+
+    入力データのバージョン（SHA-256）ごとに1回だけ計算し、入力データのキャッシュと同じ
+    results/cache に保存する。入力データに行が追加された場合は追加された行だけを計算する。
+    理由文を扱うスクリプトは本文の代わりにこのテーブルを使用する。
+    戻り値は (DataFrame, エラーメッセージ) の組で、列は ANALYSIS_COLUMNS['keys'] と
+    REASON_LENGTH_COLUMNS、total_reason_length（いずれもint32）。
+    """
+    return load_derived_table('reason_lengths', _build_reason_lengths, '理由文の文字数テーブル', file_path,
+                              append=True)
+
 # データ読み込みの共通関数
 def load_emotion_data(filename="model_emotion.csv"):
     """感情分析データの読み込み共通関数"""
+    import pandas as pd
     filepath = os.path.join(OUTPUT_DIR, filename)
     try:
         return pd.read_csv(filepath)
@@ -146,6 +632,7 @@ def load_emotion_data(filename="model_emotion.csv"):
 # 視覚化の共通関数
 def create_melted_data(data, id_vars, value_vars, var_name='emotion', value_name='value', value_mapping=None):
     """データを縦持ちに変換する共通関数"""
+    import pandas as pd
     melted_data = pd.melt(data, 
                           id_vars=id_vars,
                           value_vars=value_vars,
@@ -157,6 +644,7 @@ def create_melted_data(data, id_vars, value_vars, var_name='emotion', value_name
 
 def setup_figure(figsize=None, gridspec=None):
     """図とサブプロットの設定を統一する共通関数"""
+    import matplotlib.pyplot as plt
     if figsize is None:
         figsize = VISUALIZATION_CONFIG['figure']['default_size']
     fig = plt.figure(figsize=figsize, dpi=VISUALIZATION_CONFIG['figure']['dpi'])
@@ -175,9 +663,9 @@ def add_header_text(ax, text, position=(0.5, 1.05), alpha=0.8):
             transform=ax.transAxes,
             bbox=dict(facecolor='white', alpha=alpha, edgecolor='none'))
 
-# モデル開発元の定義
+# モデル開発元の定義（モデル名の先頭に一致する正規表現。model_registry.py を参照）
 VENDOR_PATTERNS = {
-    'OpenAI': ['gpt-', 'o'],
+    'OpenAI': ['gpt-', r'o\d'],
     'Anthropic': ['claude-'],
     'Google': ['gemini-'],
     'DeepSeek': ['DeepSeek-'],
@@ -187,9 +675,6 @@ VENDOR_PATTERNS = {
     'Grok': ['grok-']
 }
 
-# ペルソナの色定義
-PERSONA_COLORS = get_message('common.persona_colors')
-
 # モデル開発元の色の定義
 VENDOR_COLORS = {
     'OpenAI': '#4285F4',  # Google Blue
@@ -249,6 +734,3 @@ MODEL_ORDER = [
     "Llama-4-Maverick-17B", "Llama-4-Scout-17B", "Llama-3.3-70B-Instruct-Turbo",
     "Qwen3-235B-A22B-FP8", "Qwen2.5-VL-7B-Instruct"
 ]
-
-# 文学作品の順序定義
-TEXT_ORDER = list(get_message('common.text_mapping').keys())
@@ -0,0 +1,96 @@
+"""図の描画ジョブのキュー。
+
+各 *_visualize.py は、図を1つ描画して save_figure で保存する関数とその引数（データ・ファイル名など）を
+submit_figure() でジョブとして登録し、wait_for_figures() で全ジョブの完了を待つ。
+
+VISUALIZATION_CONFIG['jobs']['workers'] が2以上（None の場合は CPU コア数が2以上）なら、
+fork したワーカープロセスのプールでジョブを並行して描画・保存する。関数はモジュールの
+トップレベルで定義したもの、引数は pickle できるものに限る。ワーカープロセスはジョブの登録時の
+matplotlib の設定（日本語フォントなど）を引き継ぐ。
+ワーカー数が1以下の場合や fork を使えない環境では、submit_figure() がその場で描画する（従来と同じ）。
+
+run_languages で複数の言語を並行して描画する場合は、CPU コア数を言語の数で分け合う。
+"""
+
+import atexit
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from config import VISUALIZATION_CONFIG
+
+_executor = None
+_pending = []
+
+# CPU コアを分け合うプロセスの数（run_languages が言語の数を設定する）
+_process_share = 1
+
+def set_process_share(count):
+    """CPU コアを分け合う、並行して描画するプロセスの数を設定する"""
+    global _process_share
+    _process_share = max(1, count)
+
+def figure_workers():
+    """図を描画するワーカープロセスの数"""
+    workers = VISUALIZATION_CONFIG['jobs']['workers']
+    if workers is None:
+        workers = (os.cpu_count() or 1) // _process_share
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return 1
+    return max(1, workers)
+
+def _run_job(func, args, kwargs):
+    """ワーカープロセスで図を描画・保存し、図ごとの書き出し時間を返す"""
+    import matplotlib.pyplot as plt
+    import figure_writer
+    figure_writer.FIGURE_TIMINGS.clear()
+    try:
+        func(*args, **kwargs)
+    finally:
+        plt.close('all')
+    errors = figure_writer.wait_for_figure_writes()
+    if errors:
+        raise RuntimeError('\n'.join(errors))
+    return list(figure_writer.FIGURE_TIMINGS)
+
+def submit_figure(func, *args, **kwargs):
+    """func(*args, **kwargs)（図を描画して保存する関数）をジョブとして登録する"""
+    global _executor
+    workers = figure_workers()
+    if workers <= 1:
+        func(*args, **kwargs)
+        return
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+    # 出力のバッファがワーカープロセスに複製されないよう、fork の前に書き出しておく
+    sys.stdout.flush()
+    sys.stderr.flush()
+    _pending.append((_executor.submit(_run_job, func, args, kwargs), func.__name__))
+
+def wait_for_figures():
+    """登録したジョブの完了を待つ（失敗したジョブがあれば RuntimeError）"""
+    global _executor
+    import figure_writer
+    errors = []
+    while _pending:
+        future, name = _pending.pop(0)
+        try:
+            figure_writer.FIGURE_TIMINGS.extend(future.result())
+        except Exception as e:
+            errors.append(f"エラー：{name} の描画に失敗しました：{e}")
+    if _executor is not None:
+        # 次のジョブは、そのときの matplotlib の設定を引き継いだ新しいワーカーで描画する
+        _executor.shutdown()
+        _executor = None
+    for error in errors:
+        print(error)
+    if errors:
+        raise RuntimeError(f"{len(errors)} 個の図の描画に失敗しました")
+
+def _reset_after_fork():
+    """fork した子プロセスでは親プロセスのプロセスプールとジョブを引き継がない"""
+    global _executor, _pending
+    _executor, _pending = None, []
+
+atexit.register(wait_for_figures)
+os.register_at_fork(after_in_child=_reset_after_fork)
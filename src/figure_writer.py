@@ -0,0 +1,158 @@
+"""図の書き出し（config.save_figure の実装）。
+
+plt.savefig をフォーマットごとに呼び出すと、bbox_inches='tight' の余白計算のための描画と
+実際の描画がフォーマットごとに行われる（PNG と PDF で計4回）。ここでは次のようにして描画を減らす。
+
+1. Agg で図を1回だけ描画し、その描画結果から tight な範囲（bbox）を求める。
+2. PNG は描画済みのラスタ画像を bbox で切り抜いてエンコードするだけにする（再描画しない）。
+3. PDF などのベクタ形式は、求めた bbox を渡して1回だけ描画する（余白計算の描画は行わない）。
+
+VISUALIZATION_CONFIG['save']['workers'] を1以上にすると、PNG のエンコードと PDF の描画を
+ワーカープロセスで並行して行う（図を pickle できない場合はこのプロセスで書き出す）。
+書き出しの完了は wait_for_figure_writes() で待つ（終了時にも自動で待つ）。
+
+図ごとの描画時間・エンコード時間は FIGURE_TIMINGS に記録する。
+"""
+
+import atexit
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import matplotlib
+import matplotlib.image
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.transforms import Bbox
+
+# 図ごとの書き出し時間 {'figure': 拡張子なしのパス, 'render': 描画時間, 'encode': {フォーマット: 時間}}
+FIGURE_TIMINGS = []
+
+_executor = None
+_pending = []
+
+def _get_executor(workers):
+    """書き出し用のプロセスプール（最初に使うときに作成する）"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=workers)
+    return _executor
+
+def _figure_of(plt_or_fig):
+    """plt モジュールまたは Figure から Figure を取得"""
+    return plt_or_fig.gcf() if hasattr(plt_or_fig, 'gcf') else plt_or_fig
+
+def _render(fig, dpi, bbox_inches):
+    """Agg で図を1回描画し、(RGBA配列, 書き出す範囲のBbox（インチ）) を返す"""
+    original_canvas, original_dpi = fig.canvas, fig.dpi
+    try:
+        fig.dpi = dpi
+        canvas = FigureCanvasAgg(fig)
+        canvas.draw()
+        if bbox_inches == 'tight':
+            bbox = fig.get_tightbbox(canvas.get_renderer()).padded(matplotlib.rcParams['savefig.pad_inches'])
+        else:
+            bbox = bbox_inches or Bbox.from_bounds(0, 0, *fig.get_size_inches())
+        return np.array(canvas.buffer_rgba()), bbox
+    finally:
+        fig.dpi = original_dpi
+        fig.set_canvas(original_canvas)
+
+def _crop(rgba, bbox, dpi):
+    """描画結果を bbox で切り抜く（bbox が図の外にはみ出す場合は None）"""
+    height, width = rgba.shape[:2]
+    # 画像の大きさは savefig と同じく bbox の大きさ（ピクセル）の小数点以下を切り捨てる
+    x0, top = int(round(bbox.x0 * dpi)), height - int(round(bbox.y1 * dpi))
+    x1, bottom = x0 + int(bbox.width * dpi), top + int(bbox.height * dpi)
+    if x0 < 0 or top < 0 or x1 > width or bottom > height or x0 >= x1 or top >= bottom:
+        return None
+    return rgba[top:bottom, x0:x1]
+
+def _encode_png(rgba, path, dpi):
+    """切り抜いたラスタ画像を PNG として書き出し、所要時間を返す"""
+    start = time.perf_counter()
+    matplotlib.image.imsave(path, rgba, dpi=dpi, format='png')
+    return time.perf_counter() - start
+
+def _write_vector(fig, path, dpi, bbox):
+    """範囲を指定して図を書き出し（余白計算の描画は行わない）、所要時間を返す"""
+    start = time.perf_counter()
+    fig.savefig(path, dpi=dpi, bbox_inches=bbox)
+    return time.perf_counter() - start
+
+def _write_pickled(data, path, dpi, bbox):
+    """ワーカープロセスで pickle された図を書き出す"""
+    return _write_vector(pickle.loads(data), path, dpi, bbox)
+
+def write_figure(plt_or_fig, base_path, formats, dpi, bbox_inches='tight', workers=0):
+    """図を1回だけ描画して複数のフォーマットで書き出し、書き出したファイルのリストを返す"""
+    fig = _figure_of(plt_or_fig)
+    start = time.perf_counter()
+    rgba, bbox = _render(fig, dpi, bbox_inches)
+    timing = {'figure': base_path, 'render': time.perf_counter() - start, 'encode': {}}
+    FIGURE_TIMINGS.append(timing)
+
+    pickled = None
+    if workers and any(fmt != 'png' for fmt in formats):
+        try:
+            pickled = pickle.dumps(fig)
+        except Exception:
+            pickled = None
+
+    saved_files = []
+    for fmt in formats:
+        full_path = f"{base_path}.{fmt}"
+        cropped = _crop(rgba, bbox, dpi) if fmt == 'png' else None
+        if cropped is not None:
+            job = (_encode_png, (cropped, full_path, dpi))
+        elif fmt != 'png' and pickled is not None:
+            job = (_write_pickled, (pickled, full_path, dpi, bbox))
+        else:
+            # bbox が図の外にはみ出す PNG、または pickle できない図
+            job = (_write_vector, (fig, full_path, dpi, bbox))
+
+        func, args = job
+        if workers and func is not _write_vector:
+            _pending.append((_get_executor(workers).submit(func, *args), timing, fmt))
+        else:
+            timing['encode'][fmt] = func(*args)
+        saved_files.append(full_path)
+    return saved_files
+
+def wait_for_figure_writes():
+    """ワーカープロセスでの書き出しの完了を待ち、失敗したファイルのエラーメッセージのリストを返す"""
+    errors = []
+    while _pending:
+        future, timing, fmt = _pending.pop(0)
+        try:
+            timing['encode'][fmt] = future.result()
+        except Exception as e:
+            errors.append(f"エラー：{timing['figure']}.{fmt} の書き出しに失敗しました：{e}")
+    for error in errors:
+        print(error)
+    return errors
+
+def print_figure_timings(limit=None):
+    """図ごとの描画時間・エンコード時間を表示（合計時間の長い順）"""
+    if not FIGURE_TIMINGS:
+        return
+    rows = sorted(FIGURE_TIMINGS, key=lambda t: t['render'] + sum(t['encode'].values()), reverse=True)
+    formats = sorted({fmt for t in rows for fmt in t['encode']})
+    names = [os.path.relpath(t['figure']) for t in rows[:limit]]
+    name_width = max(len(name) for name in names)
+    print("\n図ごとの書き出し時間:")
+    print(f"  {'figure':<{name_width}}  {'render[s]':>9}" + ''.join(f"  {fmt + '[s]':>8}" for fmt in formats))
+    for name, t in zip(names, rows):
+        print(f"  {name:<{name_width}}  {t['render']:>9.2f}"
+              + ''.join(f"  {t['encode'].get(fmt, float('nan')):>8.2f}" for fmt in formats))
+    total_render = sum(t['render'] for t in rows)
+    total_encode = sum(sum(t['encode'].values()) for t in rows)
+    print(f"  {len(rows)} figures: render {total_render:.2f}s, encode {total_encode:.2f}s")
+
+def _reset_after_fork():
+    """fork した子プロセスでは親プロセスのプロセスプールと書き出し待ちを引き継がない"""
+    global _executor, _pending
+    _executor, _pending = None, []
+
+atexit.register(wait_for_figure_writes)
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,378 @@
+"""*_statistics.py で共通に使う、グループごとの要約統計量の計算。
+
+すべてのグループ・すべての列の統計量（最大値・最小値・平均・標準偏差・中央値・歪度・尖度）を
+グループ順に並べ替えた1つの配列から区間ごとにまとめて計算する。
+各値は以前の calculate_statistics（np.max / np.std / scipy.stats.skew などを
+グループごとに呼び出す実装）と同じ定義で計算する。
+中央値に加えて STATISTICS_CONFIG['percentiles'] のパーセンタイルも出力する。
+
+データを分割して加える GridAccumulator では、中央値・パーセンタイルをセルごとの分位点スケッチ
+（QuantileSketch）で求めるので、値をすべて保持する必要はない。データがすべてメモリにある
+compute_grid_statistics では、中央値・パーセンタイルは正確な値を求める。
+"""
+
+import numpy as np
+import pandas as pd
+from config import STATISTICS_CONFIG
+
+# 中央値に加えて出力するパーセンタイルの名前（p25 など）と分位（0〜1）
+PERCENTILE_NAMES = [f"p{p:g}" for p in STATISTICS_CONFIG['percentiles']]
+PERCENTILE_QUANTILES = [p / 100 for p in STATISTICS_CONFIG['percentiles']]
+
+# 出力する統計量（この順にグループごとの行を並べる）
+STATISTIC_NAMES = ['maximum', 'minimum', 'mean', 'std_dev', 'median', 'skewness', 'kurtosis'] + PERCENTILE_NAMES
+
+def _segment_starts(codes):
+    """グループ順に並べたコード配列から各グループの先頭位置を求める"""
+    return np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+
+def _grouped_quantiles(values, codes, starts, sizes, quantiles, skipna=False):
+    """列ごとにグループ内の分位点を線形補間で計算（NaN を含むグループは NaN）。
+
+    skipna=True の場合は pandas の median / quantile と同じく NaN を除いて計算する
+    （値がすべて NaN のグループは NaN）。戻り値の形は (分位の数, グループ数, 列数)。
+    """
+    result = np.empty((len(quantiles), len(starts), values.shape[1]))
+    missing = np.add.reduceat(np.isnan(values), starts, axis=0)
+    for j in range(values.shape[1]):
+        # グループ内で値の昇順に並べる（NaN は各グループの末尾に来る）
+        sorted_values = values[np.lexsort((values[:, j], codes)), j]
+        counts = np.maximum(sizes - missing[:, j], 1) if skipna else sizes
+        for i, q in enumerate(quantiles):
+            position = q * (counts - 1)
+            lower = np.floor(position).astype(np.int64)
+            upper = np.ceil(position).astype(np.int64)
+            low, high = sorted_values[starts + lower], sorted_values[starts + upper]
+            result[i, :, j] = np.where(upper > lower, low + (high - low) * (position - lower), low)
+    result[:, (missing == sizes[:, np.newaxis]) if skipna else (missing > 0)] = np.nan
+    return result
+
+def compute_group_statistics(df, key, columns):
+    """key の値ごとに columns の要約統計量を計算する。
+
+    戻り値は `{グループ名}_{統計量}` をインデックス、columns を列とする DataFrame。
+    グループは key の値の出現順、各グループ内の行は STATISTIC_NAMES の順に並ぶ。
+
+    最大値・最小値・平均・標準偏差（母標準偏差）は NaN を除いて計算し、
+    中央値・パーセンタイル・歪度・尖度は NaN を含むグループでは NaN になる。
+    中央値・パーセンタイルは np.percentile の既定（線形補間）と同じ定義の正確な値。
+    歪度・尖度は scipy.stats.skew / kurtosis（bias=True, Fisherの定義）と同じく、
+    分散がほぼ0のグループでは NaN になる。
+    """
+    group_codes, groups = pd.factorize(df[key], sort=False)
+    # key が欠損している行はどのグループにも含めない
+    order = np.argsort(group_codes, kind='stable')
+    order = order[group_codes[order] >= 0]
+    codes = group_codes[order]
+    values = df[columns].to_numpy(dtype=np.float64)[order]
+
+    starts = _segment_starts(codes)
+    sizes = np.diff(np.r_[starts, len(codes)])
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+
+    # NaN を除いた最大値・最小値・平均・標準偏差
+    count = np.add.reduceat(present, starts, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.add.reduceat(filled, starts, axis=0) / count
+        deviation = np.where(present, values - mean[np.repeat(np.arange(len(starts)), sizes)], 0.0)
+        std_dev = np.sqrt(np.add.reduceat(deviation ** 2, starts, axis=0) / count)
+    maximum = np.fmax.reduceat(values, starts, axis=0)
+    minimum = np.fmin.reduceat(values, starts, axis=0)
+
+    # 中心モーメントから歪度・尖度を計算（NaN を含むグループは NaN）
+    has_nan = count < sizes[:, np.newaxis]
+    n = sizes[:, np.newaxis].astype(np.float64)
+    m2 = np.add.reduceat(deviation ** 2, starts, axis=0) / n
+    m3 = np.add.reduceat(deviation ** 3, starts, axis=0) / n
+    m4 = np.add.reduceat(deviation ** 4, starts, axis=0) / n
+    zero = m2 <= (np.finfo(np.float64).resolution * mean) ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        skewness = np.where(zero | has_nan, np.nan, m3 / m2 ** 1.5)
+        kurtosis = np.where(zero | has_nan, np.nan, m4 / m2 ** 2 - 3.0)
+    median, *percentiles = _grouped_quantiles(values, codes, starts, sizes, [0.5] + PERCENTILE_QUANTILES)
+
+    # (グループ, 統計量, 列) の順に並べて2次元に整形
+    stacked = np.stack([maximum, minimum, mean, std_dev, median, skewness, kurtosis, *percentiles], axis=1)
+    index = [f"{group}_{name}" for group in groups for name in STATISTIC_NAMES]
+    return pd.DataFrame(stacked.reshape(-1, len(columns)), index=index, columns=columns)
+
+# モーメントの累積量（件数・平均・平均からの偏差の2〜4乗和）
+MOMENT_FIELDS = ['count', 'mean', 'm2', 'm3', 'm4']
+
+# セル単位の統計量（temperature_emotion_statistics.csv の列の順）
+CELL_STATISTIC_NAMES = ['mean', 'std', 'median', 'max', 'min', 'skew', 'kurtosis'] + PERCENTILE_NAMES
+
+def moment_accumulators(codes, values, n_groups):
+    """グループコードごとにモーメントの累積量を計算する（NaN は除く）。
+
+    戻り値は MOMENT_FIELDS をキーとし、長さ n_groups の配列を値とする辞書。
+    累積量は merge_moments で結合できるので、データを分割して計算した結果をまとめることもできる。
+    """
+    present = ~np.isnan(values)
+    codes, values = codes[present], values[present]
+    count = np.bincount(codes, minlength=n_groups).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(codes, weights=values, minlength=n_groups) / count
+    deviation = values - mean[codes]
+    squared = deviation * deviation
+    return {
+        'count': count,
+        'mean': mean,
+        'm2': np.bincount(codes, weights=squared, minlength=n_groups),
+        'm3': np.bincount(codes, weights=squared * deviation, minlength=n_groups),
+        'm4': np.bincount(codes, weights=squared * squared, minlength=n_groups),
+    }
+
+def merge_moments(a, b):
+    """2つのモーメントの累積量を結合する（Pébay の更新式）"""
+    n_a, n_b = a['count'], b['count']
+    n = n_a + n_b
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = np.where(n > 0, np.nan_to_num(b['mean']) - np.nan_to_num(a['mean']), 0.0)
+        ratio_a = np.where(n > 0, n_a / n, 0.0)
+        ratio_b = np.where(n > 0, n_b / n, 0.0)
+        mean = np.where(n > 0, np.nan_to_num(a['mean']) + delta * ratio_b, np.nan)
+    ma2, mb2 = a['m2'], b['m2']
+    m2 = ma2 + mb2 + delta ** 2 * n_a * ratio_b
+    m3 = (a['m3'] + b['m3'] + delta ** 3 * n_a * ratio_b * (ratio_a - ratio_b)
+          + 3.0 * delta * (ratio_a * mb2 - ratio_b * ma2))
+    m4 = (a['m4'] + b['m4']
+          + delta ** 4 * n_a * ratio_b * (ratio_a ** 2 - ratio_a * ratio_b + ratio_b ** 2)
+          + 6.0 * delta ** 2 * (ratio_a ** 2 * mb2 + ratio_b ** 2 * ma2)
+          + 4.0 * delta * (ratio_a * b['m3'] - ratio_b * a['m3']))
+    return {'count': n, 'mean': mean, 'm2': m2, 'm3': m3, 'm4': m4}
+
+def _zero_out_fperr(values):
+    """浮動小数点の誤差程度の値を0とみなす（pandas の nanops と同じ閾値）"""
+    return np.where(np.abs(values) < 1e-14, 0.0, values)
+
+def moment_statistics(moments):
+    """モーメントの累積量から平均・標準偏差（不偏）・歪度・尖度を計算する。
+
+    pandas の Series.std / skew / kurtosis と同じ定義（歪度は3件未満、尖度は4件未満で NaN、
+    分散が0の場合は0）で計算する。
+    """
+    n, m2 = moments['count'], _zero_out_fperr(moments['m2'])
+    m3 = _zero_out_fperr(moments['m3'])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std = np.where(n > 1, np.sqrt(m2 / (n - 1)), np.nan)
+        skew = (n * (n - 1) ** 0.5 / (n - 2)) * (m3 / m2 ** 1.5)
+        numerator = _zero_out_fperr(n * (n + 1) * (n - 1) * moments['m4'])
+        denominator = _zero_out_fperr((n - 2) * (n - 3) * m2 ** 2)
+        kurtosis = numerator / denominator - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+    skew = np.where(n < 3, np.nan, np.where(m2 == 0, 0.0, skew))
+    kurtosis = np.where(n < 4, np.nan, np.where(denominator == 0, 0.0, kurtosis))
+    return {'mean': moments['mean'], 'std': std, 'skew': skew, 'kurtosis': kurtosis}
+
+class QuantileSketch:
+    """結合できる分位点スケッチ（KLL スケッチ）。
+
+    値は重み 2^h の値を持つレベル h の配列に保持する。レベルの容量（上のレベルほど大きく、
+    最上位が k）を超えたら、そのレベルを並べ替えて1つおきに重みを2倍にして上のレベルに送る（圧縮）。
+    どの値を送るか（偶数番目か奇数番目か）はレベルごとに交互に選ぶので、結果は決定的になる。
+
+    保持する値は 3k 件以下に収まり、分位点の順位の誤差は件数の約1%（k=200）。
+    値が k 件以下のうちは圧縮しないので、分位点は np.quantile と同じ正確な値になる。
+    """
+
+    def __init__(self, k=None):
+        self.k = k or STATISTICS_CONFIG['sketch_k']
+        self.levels = [np.zeros(0)]
+        self.compactions = [0]
+        self.count = 0
+
+    @property
+    def exact(self):
+        """まだ一度も圧縮しておらず、分位点が正確な値かどうか"""
+        return len(self.levels) == 1
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.zeros(0))
+                    self.compactions.append(0)
+                items = np.sort(self.levels[level])
+                # 件数が奇数なら最小の値を残し、残りを2つずつ組にする
+                kept = len(items) % 2
+                promoted = items[kept + self.compactions[level] % 2::2]
+                self.compactions[level] += 1
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = items[:kept]
+            level += 1
+
+    def update(self, values):
+        """値の配列を加える（NaN は除く）"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.count += len(values)
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """別のスケッチの値を加える"""
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.zeros(0))
+                self.compactions.append(other.compactions[level])
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantile(self, quantiles):
+        """分位（0〜1）の配列に対応する分位点（値がなければ NaN）"""
+        quantiles = np.asarray(quantiles, dtype=np.float64)
+        if self.count == 0:
+            return np.full(quantiles.shape, np.nan)
+        if self.exact:
+            return np.quantile(self.levels[0], quantiles)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, cumulative = values[order], np.cumsum(weights[order])
+        # 累積の重みが q × 件数に達する最初の値
+        positions = np.searchsorted(cumulative, quantiles * cumulative[-1], side='left')
+        return values[np.minimum(positions, len(values) - 1)]
+
+class GridAccumulator:
+    """keys の値の組み合わせ（セル）ごとの統計量を、データを分割して順に加えながら計算する。
+
+    各キーの値はデータ全体での出現順に整数コード化し、セルごとにモーメントの累積量・最大値・最小値を
+    merge_moments などで結合しながら保持する。中央値・パーセンタイルはセルごと・列ごとの
+    QuantileSketch に値を加えて求めるので、値そのものは保持しない（値が sketch_k 件以下のセルは正確な値）。
+    sketch=False の場合はスケッチを作らず、result() に正確な分位点を渡す（compute_grid_statistics）。
+    """
+
+    def __init__(self, keys, columns, sketch=True):
+        self.keys = list(keys)
+        self.sketch = sketch
+        self.columns = list(columns)
+        self.levels = [pd.Index([]) for _ in self.keys]
+        self.cells = pd.MultiIndex.from_arrays([[] for _ in self.keys]) if len(self.keys) > 1 else pd.Index([])
+        self.moments = {col: moment_accumulators(np.zeros(0, dtype=np.int64), np.zeros(0), 0)
+                        for col in self.columns}
+        self.maximum = {col: np.zeros(0) for col in self.columns}
+        self.minimum = {col: np.zeros(0) for col in self.columns}
+        self.sketches = {col: [] for col in self.columns}
+
+    def _global_codes(self, i, column):
+        """キーの値をデータ全体での出現順のコードに変換する（欠損値は -1）"""
+        codes, uniques = pd.factorize(column, sort=False)
+        new = uniques[self.levels[i].get_indexer(uniques) < 0]
+        if len(new):
+            self.levels[i] = self.levels[i].append(pd.Index(new)) if len(self.levels[i]) else pd.Index(new)
+        mapping = self.levels[i].get_indexer(uniques)
+        return np.where(codes >= 0, mapping[np.maximum(codes, 0)] if len(mapping) else -1, -1)
+
+    def add(self, df):
+        """データの一部（DataFrame）を加える"""
+        key_codes = [self._global_codes(i, df[key]) for i, key in enumerate(self.keys)]
+        valid = np.logical_and.reduce([codes >= 0 for codes in key_codes])
+        key_codes = [codes[valid] for codes in key_codes]
+        if len(self.keys) > 1:
+            chunk_cells = pd.MultiIndex.from_arrays(key_codes)
+        else:
+            chunk_cells = pd.Index(key_codes[0])
+
+        # このチャンクで初めて現れたセルを追加する
+        unique_cells = chunk_cells.unique()
+        new = unique_cells[self.cells.get_indexer(unique_cells) < 0]
+        n_new = len(new)
+        if n_new:
+            self.cells = self.cells.append(new)
+            for col in self.columns:
+                self.moments[col] = {name: np.r_[values, np.zeros(n_new) if name != 'mean' else np.full(n_new, np.nan)]
+                                     for name, values in self.moments[col].items()}
+                self.maximum[col] = np.r_[self.maximum[col], np.full(n_new, np.nan)]
+                self.minimum[col] = np.r_[self.minimum[col], np.full(n_new, np.nan)]
+                self.sketches[col].extend(QuantileSketch() for _ in range(n_new))
+        n_cells = len(self.cells)
+        inverse = self.cells.get_indexer(chunk_cells)
+
+        order = np.argsort(inverse, kind='stable')
+        used = np.unique(inverse)
+        starts = _segment_starts(inverse[order]) if len(inverse) else np.zeros(0, dtype=np.int64)
+        for col in self.columns:
+            values = df[col].to_numpy(dtype=np.float64)[valid]
+            self.moments[col] = merge_moments(self.moments[col], moment_accumulators(inverse, values, n_cells))
+            if len(inverse):
+                self.maximum[col][used] = np.fmax(self.maximum[col][used], np.fmax.reduceat(values[order], starts))
+                self.minimum[col][used] = np.fmin(self.minimum[col][used], np.fmin.reduceat(values[order], starts))
+                if self.sketch:
+                    for cell, segment in zip(used, np.split(values[order], starts[1:])):
+                        self.sketches[col][cell].update(segment)
+        return self
+
+    def result(self, cell_quantiles=None):
+        """keys の列と `{列名}_{統計量}`（CELL_STATISTIC_NAMES の順）の列を持つ DataFrame を返す。
+
+        cell_quantiles（_grid_quantiles の戻り値）を渡すと、中央値・パーセンタイルにスケッチの代わりに使う。
+        """
+        if len(self.keys) > 1:
+            key_codes = [self.cells.get_level_values(i).to_numpy(dtype=np.int64) for i in range(len(self.keys))]
+        else:
+            key_codes = [self.cells.to_numpy(dtype=np.int64)]
+        # セルを最初のキーの出現順 × 次のキーの出現順 … の順に並べる
+        order = np.lexsort(key_codes[::-1]) if len(self.cells) else np.zeros(0, dtype=np.int64)
+        result = {key: levels.take(codes[order]) for key, levels, codes in zip(self.keys, self.levels, key_codes)}
+
+        quantiles = [0.5] + PERCENTILE_QUANTILES
+        for col in self.columns:
+            moments = {name: values[order] for name, values in self.moments[col].items()}
+            statistics = moment_statistics(moments)
+            if cell_quantiles is not None:
+                column_quantiles = cell_quantiles[:, :, self.columns.index(col)].T
+            else:
+                column_quantiles = np.array([self.sketches[col][cell].quantile(quantiles) for cell in order])
+                column_quantiles = column_quantiles.reshape(len(order), len(quantiles))
+            statistics['median'] = column_quantiles[:, 0]
+            statistics.update(zip(PERCENTILE_NAMES, column_quantiles[:, 1:].T))
+            statistics['max'] = self.maximum[col][order]
+            statistics['min'] = self.minimum[col][order]
+            for name in CELL_STATISTIC_NAMES:
+                result[f"{col}_{name}"] = statistics[name]
+        return pd.DataFrame(result)
+
+def _grid_quantiles(df, keys, columns):
+    """セルごと・列ごとの中央値とパーセンタイルの正確な値（NaN を除く）。
+
+    セルは GridAccumulator.result() と同じく、最初のキーの出現順 × 次のキーの出現順 … の順に並べる。
+    戻り値の形は (分位の数, セル数, 列数)。
+    """
+    quantiles = [0.5] + PERCENTILE_QUANTILES
+    factorized = [pd.factorize(df[key], sort=False) for key in keys]
+    valid = np.logical_and.reduce([codes >= 0 for codes, _ in factorized])
+    if not valid.any():
+        return np.zeros((len(quantiles), 0, len(columns)))
+    cells = np.ravel_multi_index([codes[valid] for codes, _ in factorized],
+                                 [len(uniques) for _, uniques in factorized])
+    order = np.argsort(cells, kind='stable')
+    codes = cells[order]
+    values = df[columns].to_numpy(dtype=np.float64)[valid][order]
+    starts = _segment_starts(codes)
+    sizes = np.diff(np.r_[starts, len(codes)])
+    return _grouped_quantiles(values, codes, starts, sizes, quantiles, skipna=True)
+
+def compute_grid_statistics(df, keys, columns):
+    """keys の値の組み合わせ（セル）ごとに columns の統計量を計算する。
+
+    各キーを出現順に整数コード化し、セルコードごとに1回の走査でまとめて集計する。
+    データに存在する組み合わせだけを、最初のキーの出現順 × 次のキーの出現順 … の順に並べ、
+    いずれかのキーが欠損している行は除く。値は pandas の mean / std / median / quantile / max / min /
+    skew / kurtosis（欠損値を除く）と同じ定義で計算する。データがすべてメモリにあるので、
+    中央値・パーセンタイルはスケッチを使わず正確な値を求める。
+    データを分割して加える場合は GridAccumulator を使う（中央値・パーセンタイルは近似値になる）。
+
+    戻り値は keys の列と `{列名}_{統計量}`（CELL_STATISTIC_NAMES の順）の列を持つ DataFrame。
+    """
+    accumulator = GridAccumulator(keys, columns, sketch=False).add(df)
+    return accumulator.result(_grid_quantiles(df, keys, columns))
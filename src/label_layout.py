@@ -0,0 +1,229 @@
+"""散布図の点のラベルの配置（adjustText の代わり）。
+
+adjustText はラベルどうし・点との重なりを反発させて少しずつ動かし、そのたびに図を描画して
+位置を測り直すため、ラベルの数が増えると急に遅くなり、結果も実行ごとに変わる。ここでは
+図を描画せずにピクセル座標でまとめて配置を決める。
+
+1. ラベルの大きさを Figure のレンダラーで1回だけ測る（図全体の描画はしない）。
+2. 各ラベルの候補位置を、点の周り8方向（右上・右・右下・上・下・左上・左・左下の順に優先）と
+   点からの距離の段（VISUALIZATION_CONFIG['label_layout']['rings']）の組み合わせで作る。
+3. 周りの点が多いラベルから順に、配置済みのラベル・点（マーカー）との重なりの面積、軸の外に
+   はみ出す面積、点からの距離が最も小さい候補を選ぶ（貪欲法）。重なりは格子状の空間インデックスで
+   近くのラベル・点だけを調べる。
+4. 決まった回数（iterations）まで、各ラベルを他のラベルを固定して選び直す（重なりうるラベルの組は
+   最初に1回だけ求めておく）。
+点から離れた位置に置いたラベルには、点までの引き出し線を描く。乱数を使わないので結果は毎回同じ。
+"""
+
+from collections import defaultdict
+import numpy as np
+from config import VISUALIZATION_CONFIG
+
+# 候補位置の方向（優先順）。ラベルの矩形の角または辺の中央を点から離して置く
+DIRECTIONS = np.array([(1, 1), (1, 0), (1, -1), (0, 1), (0, -1), (-1, 1), (-1, 0), (-1, -1)], dtype=np.float64)
+
+# 重なりの面積に掛ける重み（点から1段離すコストはラベルの面積の 0.1 倍）
+LABEL_OVERLAP_WEIGHT = 4
+MARKER_OVERLAP_WEIGHT = 2
+OUTSIDE_WEIGHT = 4
+
+class _SpatialGrid:
+    """矩形 (x0, y0, x1, y1) を一定の大きさのセルに登録し、ある範囲に重なりうる矩形を探す空間インデックス"""
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = defaultdict(set)
+
+    def _keys(self, box):
+        x0, y0, x1, y1 = (np.floor(np.asarray(box) / self.cell_size)).astype(np.int64)
+        return [(i, j) for i in range(x0, x1 + 1) for j in range(y0, y1 + 1)]
+
+    def insert(self, item, box):
+        for key in self._keys(box):
+            self.cells[key].add(item)
+
+    def query(self, box):
+        found = set()
+        for key in self._keys(box):
+            found |= self.cells.get(key, set())
+        return found
+
+def _overlap_areas(candidates, boxes):
+    """候補の矩形（C×4）と矩形（K×4）の各組の重なりの面積（C×K）"""
+    width = (np.minimum(candidates[:, None, 2], boxes[None, :, 2])
+             - np.maximum(candidates[:, None, 0], boxes[None, :, 0]))
+    height = (np.minimum(candidates[:, None, 3], boxes[None, :, 3])
+              - np.maximum(candidates[:, None, 1], boxes[None, :, 1]))
+    return np.maximum(width, 0) * np.maximum(height, 0)
+
+def _candidate_boxes(anchors, sizes, distances):
+    """点 anchors（n×2）の周りに置いた大きさ sizes（n×2）のラベルの候補の矩形。
+
+    戻り値は n×(段の数 × 8)×4 の配列（候補は段 × 方向の順）。
+    """
+    half = sizes[:, None, None, :] / 2
+    offsets = DIRECTIONS[None, None, :, :] * (half + distances[None, :, None, None])
+    centers = (anchors[:, None, None, :] + offsets).reshape(len(anchors), -1, 2)
+    half = half.reshape(len(anchors), 1, 2)
+    return np.concatenate([centers - half, centers + half], axis=2)
+
+def layout_labels(anchors, sizes, bounds, obstacles, obstacle_radii, marker_radius, rings=None, iterations=None):
+    """ピクセル座標でラベルの中心の位置を決める。
+
+    anchors はラベルを付ける点（n×2）、sizes はラベルの幅と高さ（n×2）、bounds は軸の範囲
+    (x0, y0, x1, y1)、obstacles はラベルと重ねたくない点（m×2、anchors を含む）、obstacle_radii は
+    その各点のマーカーの半径、marker_radius は anchors の点のマーカーの半径。
+    戻り値は (ラベルの中心（n×2）, 各ラベルを置いた段（0 が点に最も近い）)。
+    """
+    layout_config = VISUALIZATION_CONFIG['label_layout']
+    rings = rings or layout_config['rings']
+    iterations = layout_config['iterations'] if iterations is None else iterations
+    anchors = np.asarray(anchors, dtype=np.float64).reshape(-1, 2)
+    sizes = np.asarray(sizes, dtype=np.float64).reshape(-1, 2)
+    n = len(anchors)
+    if n == 0:
+        return np.zeros((0, 2)), np.zeros(0, dtype=np.int64)
+
+    # 段の間隔はラベルの高さの中央値。1段目は点のマーカーのすぐ外側
+    step = float(np.median(sizes[:, 1]))
+    distances = marker_radius + 2 + step * np.arange(rings)
+    candidates = _candidate_boxes(anchors, sizes, distances)
+    areas = sizes[:, 0] * sizes[:, 1]
+    # 点から遠い段・優先順の低い方向ほど少しずつ不利にする（ラベルの面積に対する割合）
+    preference = (0.1 * np.repeat(np.arange(rings), len(DIRECTIONS))
+                  + 0.01 * np.tile(np.arange(len(DIRECTIONS)), rings))
+    bounds = np.asarray(bounds, dtype=np.float64)
+
+    obstacles = np.asarray(obstacles, dtype=np.float64).reshape(-1, 2)
+    radii = np.broadcast_to(np.asarray(obstacle_radii, dtype=np.float64), len(obstacles))[:, None]
+    obstacle_boxes = np.hstack([obstacles - radii, obstacles + radii])
+    cell_size = max(float(np.median(sizes[:, 0])), step, 1.0)
+    obstacle_grid = _SpatialGrid(cell_size)
+    for index, box in enumerate(obstacle_boxes):
+        obstacle_grid.insert(index, box)
+
+    # 各ラベルの全ての候補を囲む矩形と、軸の外にはみ出す面積・点からの距離によるコスト
+    envelopes = np.concatenate([candidates[:, :, :2].min(axis=1), candidates[:, :, 2:].max(axis=1)], axis=1)
+    inside = (np.maximum(np.minimum(candidates[:, :, 2], bounds[2]) - np.maximum(candidates[:, :, 0], bounds[0]), 0)
+              * np.maximum(np.minimum(candidates[:, :, 3], bounds[3]) - np.maximum(candidates[:, :, 1], bounds[1]), 0))
+    static_costs = OUTSIDE_WEIGHT * (areas[:, None] - inside) + areas[:, None] * preference[None, :]
+    crowding = np.zeros(n, dtype=np.int64)
+    for i in range(n):
+        nearby = sorted(obstacle_grid.query(envelopes[i]))
+        crowding[i] = len(nearby)
+        if nearby:
+            static_costs[i] += MARKER_OVERLAP_WEIGHT * _overlap_areas(candidates[i], obstacle_boxes[nearby]).sum(axis=1)
+
+    # 候補の範囲が重なりうるラベルの組を空間インデックスで1回だけ求める
+    envelope_grid = _SpatialGrid(cell_size)
+    for i in range(n):
+        envelope_grid.insert(i, envelopes[i])
+    neighbors = [np.array(sorted(envelope_grid.query(envelopes[i]) - {i}), dtype=np.int64) for i in range(n)]
+
+    # 周りの点が多い（候補の範囲に他の点が多く入る）ラベルから順に置く
+    order = np.lexsort((np.arange(n), -crowding))
+
+    chosen = np.full(n, -1, dtype=np.int64)
+    placed = np.zeros((n, 4))
+    # 選び直すのは、前の回に自分か近くのラベルが動いたラベルだけ
+    dirty = np.ones(n, dtype=bool)
+    for iteration in range(iterations + 1):
+        moved = np.zeros(n, dtype=bool)
+        for i in order:
+            if not dirty[i]:
+                continue
+            cost = static_costs[i]
+            others = neighbors[i][chosen[neighbors[i]] >= 0]
+            if len(others):
+                cost = cost + LABEL_OVERLAP_WEIGHT * _overlap_areas(candidates[i], placed[others]).sum(axis=1)
+            best = int(np.argmin(cost))
+            if best != chosen[i]:
+                moved[i] = True
+                chosen[i] = best
+                placed[i] = candidates[i][best]
+        if iteration == 0:
+            # 1回目は後から置いたラベルとの重なりを見ていないので、全てのラベルを選び直す
+            dirty[:] = True
+            continue
+        if not moved.any():
+            break
+        dirty[:] = moved
+        for i in np.flatnonzero(moved):
+            dirty[neighbors[i]] = True
+
+    centers = (placed[:, :2] + placed[:, 2:]) / 2
+    return centers, chosen // len(DIRECTIONS)
+
+def _label_sizes(fig, labels, fontsize, pad):
+    """ラベルの幅と高さ（ピクセル、周りの余白 pad を含む）を測る。
+
+    幅は各行の文字の送り幅の和（文字ごとにフォントから1回だけ読む）の最大値、高さは行の数ごとに
+    1回だけ Text の配置から測る。ラベルごとにレンダラーで文字列を描いて測るより大幅に速い。
+    """
+    from matplotlib.font_manager import FontProperties, findfont, get_font
+    from matplotlib.ft2font import LOAD_NO_HINTING
+    from matplotlib.text import Text
+    font_properties = FontProperties(size=fontsize)
+    font = get_font(findfont(font_properties))
+    font.set_size(fontsize, fig.dpi)
+    advances = {}
+
+    def line_width(line):
+        for char in line:
+            if char not in advances:
+                advances[char] = font.load_char(ord(char), flags=LOAD_NO_HINTING).linearHoriAdvance / 65536
+        return sum(advances[char] for char in line)
+
+    renderer = fig.canvas.get_renderer()
+    heights = {}
+    sizes = []
+    for label in labels:
+        lines = label.split('\n')
+        if len(lines) not in heights:
+            text = Text(text=label, fontproperties=font_properties)
+            text.set_figure(fig)
+            heights[len(lines)] = text.get_window_extent(renderer).height
+        sizes.append((max(line_width(line) for line in lines) + 2 * pad, heights[len(lines)] + 2 * pad))
+    return np.array(sizes)
+
+def place_labels(ax, points, labels, fontsize, bbox=None, arrowprops=None, marker_size=100,
+                 obstacles=None, obstacle_size=None):
+    """ax の点 points（データ座標、n×2）に、重ならないように labels を配置して描画する。
+
+    fontsize・bbox は各ラベルの文字の大きさと枠（ax.text と同じ）。marker_size は点のマーカーの
+    大きさ（scatter の s）で、ラベルはマーカーと重ならない位置に置く。obstacles はラベルを
+    重ねたくない他の点（クラスター中心など、データ座標）で、obstacle_size はそのマーカーの大きさ
+    （省略時は marker_size）。点から離れた位置に置いたラベルには arrowprops の引き出し線を描く。
+    軸の範囲は変えない。戻り値は作成した Annotation のリスト。
+    """
+    fig = ax.figure
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    # 軸の範囲を確定してからピクセル座標に変換する
+    ax.set_xlim(ax.get_xlim())
+    ax.set_ylim(ax.get_ylim())
+    to_pixels = ax.transData.transform
+    anchors = to_pixels(points)
+    pixels_per_point = fig.dpi / 72
+    marker_radius = np.sqrt(marker_size) / 2 * pixels_per_point
+    others, radii = anchors, np.full(len(anchors), marker_radius)
+    if obstacles is not None:
+        extra = to_pixels(np.asarray(obstacles, dtype=np.float64).reshape(-1, 2))
+        extra_radius = np.sqrt(obstacle_size or marker_size) / 2 * pixels_per_point
+        others = np.vstack([anchors, extra])
+        radii = np.append(radii, np.full(len(extra), extra_radius))
+
+    # ax.text の bbox の既定の余白は文字の大きさの 0.3 倍
+    pad = 0.3 * fontsize * pixels_per_point if bbox is not None else pixels_per_point
+    sizes = _label_sizes(fig, labels, fontsize, pad)
+    bounds = ax.get_window_extent().extents
+    centers, rings = layout_labels(anchors, sizes, bounds, others, radii, marker_radius)
+
+    positions = ax.transData.inverted().transform(centers)
+    annotations = []
+    for label, point, position, ring in zip(labels, points, positions, rings):
+        annotations.append(ax.annotate(
+            label, xy=point, xytext=position, textcoords='data',
+            ha='center', va='center', multialignment='left', fontsize=fontsize, bbox=bbox,
+            arrowprops=arrowprops if ring > 0 else None,
+        ))
+    return annotations
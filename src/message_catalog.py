@@ -0,0 +1,128 @@
+"""messages.json を1回だけ読み込んで平坦化したメッセージカタログ。
+
+messages.json のセクションには、言語ごとの辞書を持つもの（{'ja': {...}, 'en': {...}}）と、
+言語を値に持つ対応表をまとめた common（{'t1': {'ja': ..., 'en': ...}} など）がある。
+MessageCatalog はこれを次の索引に変換し、どの参照も辞書を1回引くだけで済むようにする。
+
+- paths: 'model_emotion.ja.title' のようなキーパス -> 値（途中の辞書も含むすべての節点）
+- texts: (セクション, 言語, キー) -> 文字列（言語によらない値は言語を None とする）
+- ids:   (対応表のキーパス, 言語, 表示名) -> ID（'大学1年生' -> 'p1' のような逆引き）
+
+変換結果は pickle として保存でき、messages.json の mtime とサイズが変わらない限りそのまま読み込む。
+"""
+
+import json
+import os
+import pickle
+
+# 保存形式を変更したら上げる
+CATALOG_VERSION = 1
+
+def _is_language_dict(node, languages):
+    """言語をキーとする辞書（{'ja': ..., 'en': ...}）かどうか"""
+    return isinstance(node, dict) and bool(node) and set(node) <= set(languages)
+
+def _leaves(node, prefix=''):
+    """入れ子の辞書の (ドット区切りのキー, 値) を列挙する"""
+    if not isinstance(node, dict):
+        yield prefix, node
+        return
+    for key, value in node.items():
+        yield from _leaves(value, f"{prefix}.{key}" if prefix else key)
+
+class MessageCatalog:
+    """平坦化したメッセージの索引"""
+
+    def __init__(self, messages, languages):
+        self.messages = messages
+        self.languages = list(languages)
+        self.paths = {}
+        self.texts = {}
+        self.ids = {}
+        self._index_paths(messages, '')
+        for section, node in messages.items():
+            if _is_language_dict(node, self.languages):
+                for lang, entries in node.items():
+                    for key, value in _leaves(entries):
+                        self.texts[(section, lang, key)] = value
+            else:
+                self._index_common(section, node, '')
+
+    def _index_paths(self, node, prefix):
+        if prefix:
+            self.paths[prefix] = node
+        if isinstance(node, dict):
+            for key, value in node.items():
+                self._index_paths(value, f"{prefix}.{key}" if prefix else key)
+
+    def _index_common(self, section, node, prefix):
+        """common のような言語を値に持つセクションを索引に加える"""
+        if _is_language_dict(node, self.languages):
+            for lang, value in node.items():
+                self.texts[(section, lang, prefix)] = value
+            return
+        if not isinstance(node, dict):
+            self.texts[(section, None, prefix)] = node
+            return
+        mapping = f"{section}.{prefix}" if prefix else section
+        for key, value in node.items():
+            if _is_language_dict(value, self.languages):
+                for lang, name in value.items():
+                    self.ids[(mapping, lang, name)] = key
+            self._index_common(section, value, f"{prefix}.{key}" if prefix else key)
+
+    def get(self, key_path):
+        """キーパスの値を返す（途中の辞書も取得できる）"""
+        try:
+            return self.paths[key_path]
+        except KeyError:
+            raise KeyError(f"Key path '{key_path}' not found in messages.json.") from None
+
+    def text(self, section, key, lang='ja'):
+        """(セクション, 言語, キー) の文字列を返す（言語によらない値にも対応）"""
+        try:
+            return self.texts[(section, lang, key)]
+        except KeyError:
+            pass
+        try:
+            return self.texts[(section, None, key)]
+        except KeyError:
+            raise KeyError(f"Message '{section}.{key}' not found in messages.json for language '{lang}'.") from None
+
+    def lookup_id(self, mapping, display_name, lang=None):
+        """表示名から ID を逆引きする（lang を省略した場合はすべての言語から探す）"""
+        for candidate in ([lang] if lang else self.languages):
+            key = self.ids.get((mapping, candidate, display_name))
+            if key is not None:
+                return key
+        raise KeyError(f"'{display_name}' not found in '{mapping}'.")
+
+    @classmethod
+    def load(cls, json_path, languages, cache_path=None):
+        """messages.json からカタログを作成する（cache_path があれば変換結果を保存・再利用する）"""
+        stat = os.stat(json_path)
+        stamp = {'version': CATALOG_VERSION, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                 'languages': list(languages)}
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'rb') as f:
+                    saved_stamp, catalog = pickle.load(f)
+                if saved_stamp == stamp:
+                    return catalog
+            except Exception:
+                # 壊れた・古い形式のキャッシュは作り直す
+                pass
+
+        with open(json_path, 'r', encoding='utf-8') as f:
+            catalog = cls(json.load(f), languages)
+        if cache_path:
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump((stamp, catalog), f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                # 保存できなくても変換結果はそのまま使える
+                pass
+        return catalog
@@ -1,12 +1,36 @@
 """Unified script for analyzing missing values in model responses."""
 
+import argparse
 import pandas as pd
 from config import (
     OUTPUT_DIR, ANALYSIS_COLUMNS, DATA_PATHS,
-    ensure_output_directories, safe_read_csv
+    ensure_output_directories, safe_read_csv, load_input_data, iter_input_chunks
 )
 
-def generate_missing_values_report(input_csv, output_csv):
+def count_missing_by_model(input_csv, chunksize):
+    """
+    Read the input in chunks and count rows and missing values per model.
+
+    Args:
+        input_csv (str): Path to the input CSV file.
+        chunksize (int): Number of rows read at a time.
+
+    Returns:
+        tuple: (rows per model in order of first appearance, missing values per model and column)
+    """
+    rows = pd.Series(dtype='int64')
+    missing = None
+    for chunk in iter_input_chunks(input_csv, chunksize=chunksize):
+        model = chunk['model'].astype(object)
+        chunk_rows = model.value_counts(sort=False)
+        chunk_missing = chunk.drop(columns='model').isnull().groupby(model).sum()
+        # Keep the models in order of first appearance (value_counts breaks ties in that order)
+        order = rows.index.append(chunk_rows.index.difference(rows.index, sort=False))
+        rows = rows.reindex(order, fill_value=0) + chunk_rows.reindex(order, fill_value=0)
+        missing = chunk_missing if missing is None else missing.add(chunk_missing, fill_value=0)
+    return rows, missing
+
+def generate_missing_values_report(input_csv, output_csv, chunksize=None):
     """
     Read a CSV file, count results per model, identify models with fewer than 120 results,
     and save a report as CSV.
@@ -14,14 +38,21 @@ def generate_missing_values_report(input_csv, output_csv):
     Args:
         input_csv (str): Path to the input CSV file.
         output_csv (str): Path where the output CSV report will be saved.
+        chunksize (int, optional): Read the input in chunks of this many rows.
     """
-    df, error = safe_read_csv(input_csv)
-    if error:
-        print(error)
-        return False
-
-    # Count results per model
-    model_counts = df['model'].value_counts().sort_values()
+    if chunksize:
+        rows, _ = count_missing_by_model(input_csv, chunksize)
+        # Same ordering as value_counts(): by count, ties in order of first appearance
+        model_counts = rows.rename('count').rename_axis('model').sort_values(ascending=False).sort_values()
+    else:
+        df, error = load_input_data(input_csv, columns=['model'])
+        if error:
+            print(error)
+            return False
+
+        # Count results per model
+        # (categorical dtype orders ties by category, so count on plain strings to keep file order)
+        model_counts = df['model'].astype(object).value_counts().sort_values()
 
     # Identify models with fewer than 120 results
     missing_value_models = model_counts[model_counts < 120]
@@ -31,21 +62,28 @@ def generate_missing_values_report(input_csv, output_csv):
     print(f"結果が120に満たないモデルのレポートを '{output_csv}' に保存しました。")
     return True
 
-def calculate_missing_values_by_model(input_csv, output_csv):
+def calculate_missing_values_by_model(input_csv, output_csv, chunksize=None):
     """
     Calculate the proportion of missing values per model and save to CSV.
 
     Args:
         input_csv (str): Path to the input CSV file.
         output_csv (str): Path where the output CSV will be saved.
+        chunksize (int, optional): Read the input in chunks of this many rows.
     """
-    df, error = safe_read_csv(input_csv)
-    if error:
-        print(error)
-        return None
-
-    # Calculate missing value proportions per model
-    missing_values = df.groupby('model').apply(lambda x: x.isnull().mean(), include_groups=False)
+    if chunksize:
+        # Missing value counts are summed over the chunks and divided by the row counts at the end
+        rows, missing = count_missing_by_model(input_csv, chunksize)
+        missing_values = missing.div(rows.reindex(missing.index), axis=0).sort_index()
+        missing_values.index.name = 'model'
+    else:
+        df, error = load_input_data(input_csv)
+        if error:
+            print(error)
+            return None
+
+        # Calculate missing value proportions per model
+        missing_values = df.groupby('model', observed=True).apply(lambda x: x.isnull().mean(), include_groups=False)
     missing_values.to_csv(output_csv)
     print(f"欠損値分析が完了しました。結果は '{output_csv}' に保存されています。")
     return missing_values
@@ -85,15 +123,23 @@ def generate_detailed_missing_summary(input_csv, output_csv):
     print(f"詳細な欠損値サマリーを '{output_csv}' に保存しました。")
     return True
 
-if __name__ == "__main__":
+def main(chunksize=None):
+    """Run all missing value analysis steps (reading the input in chunks if chunksize is given)."""
     # Ensure necessary directories exist
     ensure_output_directories()
 
     # Step 1: Generate report of models with fewer than 120 results
-    generate_missing_values_report(DATA_PATHS['input'], DATA_PATHS['missing_report'])
+    generate_missing_values_report(DATA_PATHS['input'], DATA_PATHS['missing_report'], chunksize)
 
     # Step 2: Calculate missing value proportions per model
-    calculate_missing_values_by_model(DATA_PATHS['input'], DATA_PATHS['missing_by_model'])
+    calculate_missing_values_by_model(DATA_PATHS['input'], DATA_PATHS['missing_by_model'], chunksize)
 
     # Step 3: Generate detailed summary with percentages
     generate_detailed_missing_summary(DATA_PATHS['missing_by_model'], DATA_PATHS['missing_summary'])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Analyze missing values in model responses.')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='Read the input data in chunks of this many rows (bounded memory)')
+    args = parser.parse_args()
+    main(args.chunksize)
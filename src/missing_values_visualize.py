@@ -1,20 +1,13 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import argparse
-import json
 import os
 from config import (
-    OUTPUT_DIR, VENDOR_PATTERNS, VENDOR_COLORS, MODEL_ORDER,
+    OUTPUT_DIR, VENDOR_COLORS,
     ANALYSIS_COLUMNS, DATA_PATHS, ensure_output_directories, safe_read_csv,
-    save_figure
+    save_figure, get_message, parse_languages, run_languages
 )
-
-def get_vendor_color(model_name):
-    """モデル名から対応する開発元の色を取得"""
-    for vendor, patterns in VENDOR_PATTERNS.items():
-        if any(model_name.startswith(pattern) for pattern in patterns):
-            return VENDOR_COLORS[vendor]
-    return '#808080'  # デフォルトの色（グレー）
+from figure_jobs import submit_figure, wait_for_figures
+from model_registry import get_model_registry
 
 def format_column_name(col, lang='ja'):
     """列名を表示用にフォーマット"""
@@ -32,18 +25,13 @@ def plot_missing_values(df, col, messages, lang):
         print(messages['no_data_message'].format(col=display_col))
         return
     
-    # モデルの順序を設定
-    filtered_df['model'] = pd.Categorical(filtered_df['model'], categories=MODEL_ORDER, ordered=True)
-    filtered_df = filtered_df.sort_values('model')
+    # モデルの表示順に並べ、開発元の色を付ける
+    filtered_df = get_model_registry().annotate(filtered_df).sort_values('model_order', kind='stable')
+    colors = filtered_df['vendor_color'].to_numpy()
     
-    # プロットの設定
+    # プロットの設定（各バーを開発元の色で塗る）
     plt.figure(figsize=(12, 6))
-    bars = plt.barh(range(len(filtered_df)), filtered_df[col])
-    
-    # 各バーの色を設定
-    for bar, model in zip(bars, filtered_df['model']):
-        bar.set_color(get_vendor_color(model))
-        bar.set_alpha(0.8)
+    plt.barh(range(len(filtered_df)), filtered_df[col], color=colors, edgecolor=colors, alpha=0.8)
     
     # 表示用の列名を取得
     display_col = format_column_name(col, lang)
@@ -66,21 +54,19 @@ def plot_missing_values(df, col, messages, lang):
     
     print(messages['saved_message'].format(col=display_col))
 
-def main():
-    # コマンドライン引数の解析
-    parser = argparse.ArgumentParser(description="Visualize missing values data.")
-    parser.add_argument('--lang', type=str, default='ja', help='Language for plots (ja or en)')
-    args = parser.parse_args()
-    lang = args.lang
+def main(lang='ja'):
+    langs = parse_languages(lang)
+    if len(langs) > 1:
+        # 複数の言語を指定した場合は、言語ごとの子プロセスで並行して描画する
+        return run_languages(main, langs)
+    lang = langs[0]
 
     # 日本語フォントのインポート（日本語の場合のみ）
     if lang == 'ja':
         import japanize_matplotlib
 
     # メッセージの読み込み
-    with open('src/messages.json', 'r', encoding='utf-8') as f:
-        messages_data = json.load(f)
-    messages = messages_data['missing_values'][lang]
+    messages = get_message(f'missing_values.{lang}')
 
     # 出力ディレクトリの作成
     ensure_output_directories()
@@ -91,13 +77,18 @@ def main():
         print(error)
         return
     
-    # 個別項目のグラフ生成
-    for col in ANALYSIS_COLUMNS['all']:
-        plot_missing_values(df, col, messages, lang)
-    
     # 総合欠損値の計算
     df['TotalMissing'] = df[ANALYSIS_COLUMNS['all']].mean(axis=1)
-    plot_missing_values(df, 'TotalMissing', messages, lang)
+
+    # 個別項目と総合欠損値のグラフ生成（グラフごとに別のジョブとして登録する）
+    for col in ANALYSIS_COLUMNS['all'] + ['TotalMissing']:
+        submit_figure(plot_missing_values, df, col, messages, lang)
+    wait_for_figures()
 
 if __name__ == "__main__":
-    main()
+    # コマンドライン引数の解析
+    parser = argparse.ArgumentParser(description="Visualize missing values data.")
+    parser.add_argument('--lang', type=parse_languages, default='ja',
+                        help='Language(s) for visualization (ja, en, ja,en or all)')
+    args = parser.parse_args()
+    main(args.lang)
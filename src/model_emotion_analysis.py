@@ -1,35 +1,19 @@
-import pandas as pd
-import os
 import argparse
-from config import (
-    OUTPUT_DIR, EMOTION_DIMENSIONS, DATA_PATHS,
-    ensure_output_directories, safe_read_csv
-)
+from config import EMOTION_DIMENSIONS
+from aggregation import write_group_outputs
 
-def analyze_emotion_trends():
+def analyze_emotion_trends(lang='ja'):
     """モデルごとの感情次元傾向を分析"""
-    parser = argparse.ArgumentParser(description='Model emotion analysis')
-    parser.add_argument('--lang', choices=['ja', 'en'], default='ja', help='Language for output (ja or en)')
-    args = parser.parse_args()
-
     # 感情次元の定義を取得
-    emotion_dimensions = {k: v[args.lang] for k, v in EMOTION_DIMENSIONS.items()}
+    emotion_dimensions = {k: v[lang] for k, v in EMOTION_DIMENSIONS.items()}
 
-    # 出力ディレクトリを作成
-    ensure_output_directories()
-    
-    # CSVファイルを読み込む
-    df, error = safe_read_csv(DATA_PATHS['input'])
-    if error:
-        print(error)
+    # 感情次元の傾向をモデルごとに計算して保存
+    results = write_group_outputs(['model_emotion'])
+    if results is None:
         return
+    emotion_trends = results['model_emotion']
     
-    # 感情次元の傾向をモデルごとに計算
-    emotion_trends = df.groupby('model')[list(EMOTION_DIMENSIONS.keys())].mean()
-    output_file = os.path.join(OUTPUT_DIR, "model_emotion.csv")
-    emotion_trends.to_csv(output_file)
-    
-    print(f"感情次元傾向分析が完了しました。結果は '{output_file}' に保存されています。")
+    print("感情次元傾向分析が完了しました。")
     
     # 結果を表示（ローカライズされた列名で）
     print("\n分析結果:")
@@ -38,4 +22,7 @@ def analyze_emotion_trends():
     print(emotion_trends_display)
 
 if __name__ == "__main__":
-    analyze_emotion_trends()
+    parser = argparse.ArgumentParser(description='Model emotion analysis')
+    parser.add_argument('--lang', choices=['ja', 'en'], default='ja', help='Language for output (ja or en)')
+    args = parser.parse_args()
+    analyze_emotion_trends(args.lang)
@@ -1,36 +1,43 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
-import japanize_matplotlib
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-from fcmeans import FCM
-from sklearn.metrics import silhouette_score
 import os
 import json
 import argparse
 from config import (
-    OUTPUT_DIR, VISUALIZATION_CONFIG, CLUSTERING_CONFIG, EMOTION_DIMENSIONS,
-    ensure_output_directories, save_figure, load_emotion_data
+    OUTPUT_DIR, VISUALIZATION_CONFIG, EMOTION_DIMENSIONS,
+    ensure_output_directories, save_figure, get_message, parse_languages, run_languages
 )
-from adjustText import adjust_text
+from clustering import Projection, silhouette_sweep, load_projection, cluster_colors
+from figure_jobs import submit_figure, wait_for_figures
+from label_layout import place_labels
+
+INPUT_FILE = os.path.join(OUTPUT_DIR, 'model_emotion.csv')
 
 def load_messages(lang='ja'):
     """言語に応じたメッセージを読み込む"""
-    with open('src/messages.json', 'r', encoding='utf-8') as f:
-        messages = json.load(f)
-    return messages['model_emotion_similarity'][lang]
+    return get_message(f'model_emotion_similarity.{lang}')
 
 # 出力ディレクトリの作成
 ensure_output_directories()
 
-def create_correlation_heatmap(emotion_trends, lang='ja'):
-    """モデル間の相関分析とヒートマップの作成"""
-    messages = load_messages(lang)
-    
-    # モデル間の相関係数を計算
+def load_emotion_trends(file_path=INPUT_FILE):
+    """モデル別の感情値（model を行ラベルとする）を読み込む"""
+    try:
+        return pd.read_csv(file_path).set_index('model')
+    except FileNotFoundError:
+        raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
+
+def compute_correlation(emotion_trends):
+    """モデル間の相関係数を計算し、CSVとして保存"""
     corr = emotion_trends.T.corr()
+    corr.to_csv(os.path.join(OUTPUT_DIR, 'model_emotion_correlation.csv'))
+    return corr
+
+def create_correlation_heatmap(corr, lang='ja'):
+    """モデル間の相関係数のヒートマップの作成"""
+    import seaborn as sns
+    messages = load_messages(lang)
     
     # ヒートマップの作成
     plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
@@ -40,26 +47,22 @@ def create_correlation_heatmap(emotion_trends, lang='ja'):
     
     # 保存
     save_figure(plt, 'model_emotion_correlation', lang=lang)
-    
-    # 相関行列をCSVとして保存
-    corr.to_csv(os.path.join(OUTPUT_DIR, 'model_emotion_correlation.csv'))
     return corr
 
-def find_optimal_clusters(emotion_trends, lang='ja'):
-    """最適なクラスター数の決定"""
-    scaled_data = StandardScaler().fit_transform(emotion_trends)
-    silhouette_scores = []
-    
-    for n in range(2, CLUSTERING_CONFIG['max_clusters'] + 1):
-        fcm = FCM(n_clusters=n, random_state=42)
-        fcm.fit(scaled_data)
-        labels = fcm.u.argmax(axis=1)
-        score = silhouette_score(scaled_data, labels)
-        silhouette_scores.append(score)
-    
-    # シルエットスコアの可視化
+def find_optimal_clusters(scaled_data):
+    """最適なクラスター数の決定（scaled_data は標準化済みのデータ）。
+
+    戻り値は (最適なクラスター数, そのクラスター数で学習済みの FuzzyCMeans,
+    クラスター数のリスト, シルエットスコアのリスト)。
+    """
+    cluster_counts, silhouette_scores, models = silhouette_sweep(scaled_data)
+    optimal_clusters = cluster_counts[int(np.argmax(silhouette_scores))]
+    return optimal_clusters, models[optimal_clusters], cluster_counts, silhouette_scores
+
+def plot_silhouette_scores(cluster_counts, silhouette_scores, lang='ja'):
+    """シルエットスコアの可視化"""
     plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
-    plt.plot(range(2, CLUSTERING_CONFIG['max_clusters'] + 1), silhouette_scores, 'bo-')
+    plt.plot(cluster_counts, silhouette_scores, 'bo-')
     messages = load_messages(lang)
     plt.xlabel(messages['silhouette_xlabel'])
     plt.ylabel(messages['silhouette_ylabel'])
@@ -69,38 +72,26 @@ def find_optimal_clusters(emotion_trends, lang='ja'):
     # 保存
     save_figure(plt, 'model_emotion_silhouette', lang=lang)
     plt.close()
-    
-    optimal_clusters = np.argmax(silhouette_scores) + 2
-    return optimal_clusters
 
-def perform_fcm_analysis(emotion_trends, n_clusters):
-    """Fuzzy C-Means クラスタリングの実行"""
-    # データの正規化
-    scaler = StandardScaler()
-    scaled_data = scaler.fit_transform(emotion_trends)
-    
-    # FCMの実行
-    fcm = FCM(n_clusters=n_clusters, random_state=42)
-    fcm.fit(scaled_data)
-    
+def perform_fcm_analysis(fcm, projection):
+    """Fuzzy C-Means クラスタリングの結果の取得（探索時に学習済みのモデルと projection の標準化を使う）"""
     # 所属度とクラスター中心を元のスケールに戻す
-    centers = scaler.inverse_transform(fcm.centers)
+    centers = projection.inverse_transform(fcm.centers)
     
     return fcm.u, centers, fcm
 
-def visualize_fcm_gradients(emotion_trends, membership, centers, lang='ja'):
+def visualize_fcm_gradients(emotion_trends, membership, centers, lang='ja', projection=None):
     """FCM結果をグラデーションで可視化"""
-    pca = PCA(n_components=2)
-    data_2d = pca.fit_transform(StandardScaler().fit_transform(emotion_trends))
-    centers_2d = pca.transform(StandardScaler().fit_transform(centers))
+    if projection is None:
+        projection = Projection.fit(emotion_trends).set_centers(centers)
+    data_2d, centers_2d = projection.data_2d, projection.centers_2d
     
     plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
     
-    # クラスターごとの色を定義
-    colors = CLUSTERING_CONFIG['colors']['cluster']
+    # クラスターごとの色を定義（クラスター数が設定の色より多い場合も全クラスターに色を割り当てる）
+    colors = cluster_colors(membership.shape[1])
     
     # 各点をプロット
-    texts = [] # 追加
     for i in range(len(data_2d)):
         # 所属度に基づいて色をブレンド
         color = np.zeros(3)
@@ -110,19 +101,15 @@ def visualize_fcm_gradients(emotion_trends, membership, centers, lang='ja'):
             
         plt.scatter(data_2d[i, 0], data_2d[i, 1], 
                    color=color, s=100)
-        # plt.annotate(emotion_trends.index[i], 
-        #             (data_2d[i, 0], data_2d[i, 1]),
-        #             xytext=(5, 5), textcoords='offset points',
-        #             fontsize=8) # 変更前
-        texts.append(plt.text(data_2d[i, 0], data_2d[i, 1], emotion_trends.index[i], fontsize=8)) # 変更後
     
     # クラスター中心のプロット
     messages = load_messages(lang)
     plt.scatter(centers_2d[:, 0], centers_2d[:, 1], 
                c='black', marker='x', s=200, label=messages['cluster_center_label'])
     
-    # テキストの重なりを調整
-    adjust_text(texts, arrowprops=dict(arrowstyle='-', color='gray', lw=0.5)) # 追加
+    # モデル名を点・クラスター中心と重ならないように配置
+    place_labels(plt.gca(), data_2d, list(emotion_trends.index), fontsize=8, marker_size=100,
+                 obstacles=centers_2d, obstacle_size=200, arrowprops=dict(arrowstyle='-', color='gray', lw=0.5))
     plt.title(messages['fcm_gradient_title'])
     
     # 説明テキストの追加
@@ -140,21 +127,22 @@ def visualize_fcm_gradients(emotion_trends, membership, centers, lang='ja'):
     save_figure(plt, 'model_emotion_fcm_gradient', lang=lang)
     plt.close()
 
-def visualize_fcm_with_memberships(emotion_trends, membership, centers, lang='ja'):
+def visualize_fcm_with_memberships(emotion_trends, membership, centers, lang='ja', projection=None):
     """FCM結果を所属度付きで可視化"""
-    pca = PCA(n_components=2)
-    data_2d = pca.fit_transform(StandardScaler().fit_transform(emotion_trends))
-    centers_2d = pca.transform(StandardScaler().fit_transform(centers))
+    if projection is None:
+        projection = Projection.fit(emotion_trends).set_centers(centers)
+    data_2d, centers_2d = projection.data_2d, projection.centers_2d
     
     plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
     
     # 各点をプロット
-    texts = [] # 追加
+    colors = cluster_colors(membership.shape[1])
+    texts = []
     for i in range(len(data_2d)):
         dominant_cluster = np.argmax(membership[i])
         alpha = max(membership[i])
         plt.scatter(data_2d[i, 0], data_2d[i, 1], 
-                   c=CLUSTERING_CONFIG['colors']['cluster'][dominant_cluster], 
+                   c=colors[dominant_cluster], 
                    alpha=VISUALIZATION_CONFIG['plot']['text_box_alpha'],
                    label=f'Cluster {dominant_cluster+1}' if i == 0 else "")
         
@@ -162,10 +150,7 @@ def visualize_fcm_with_memberships(emotion_trends, membership, centers, lang='ja
         memberships_text = [f'C{j+1}:{membership[i,j]:.2f}' # Cluster を C に短縮
                           for j in range(membership.shape[1])]
         text_content = f'{emotion_trends.index[i]}\n({", ".join(memberships_text)})'
-        # plt.annotate(text_content, (data_2d[i, 0], data_2d[i, 1]),
-        #             xytext=(5, 5), textcoords='offset points',
-        #             fontsize=7, bbox=dict(facecolor='white', alpha=0.7)) # 変更前
-        texts.append(plt.text(data_2d[i, 0], data_2d[i, 1], text_content, fontsize=7, bbox=dict(facecolor='white', alpha=0.7))) # 変更後
+        texts.append(text_content)
     
     # クラスター中心のプロット
     # クラスター中心のプロット（黒でクラスター中心を表示）
@@ -173,11 +158,10 @@ def visualize_fcm_with_memberships(emotion_trends, membership, centers, lang='ja
     plt.scatter(centers_2d[:, 0], centers_2d[:, 1], 
                c='black', marker='x', s=200, label=messages['cluster_center_label'])
     
-    # テキストの重なりを調整
-    adjust_text(texts, 
-                # expand_points=(1.2, 1.2), # 必要に応じて調整
-                # expand_text=(1.2, 1.2),   # 必要に応じて調整
-                arrowprops=dict(arrowstyle='-', color='gray', lw=0.5)) # 追加 (arrowpropsはお好みで調整)
+    # モデル名と所属度を点・クラスター中心と重ならないように配置
+    place_labels(plt.gca(), data_2d, texts, fontsize=7, bbox=dict(facecolor='white', alpha=0.7),
+                 marker_size=plt.rcParams['lines.markersize'] ** 2, obstacles=centers_2d, obstacle_size=200,
+                 arrowprops=dict(arrowstyle='-', color='gray', lw=0.5))
 
     messages = load_messages(lang)
     plt.title(messages['fcm_membership_title'])
@@ -241,35 +225,61 @@ def print_generated_files(lang='ja'):
     print(f"- {os.path.join(figures_dir, 'model_emotion_fcm_membership.png')}")
     print(f"- {os.path.join(figures_dir, 'model_emotion_fcm_membership.pdf')}")
 
-def main(lang='ja'):
-    # 感情次元の定義を取得
-    emotion_dimensions = {k: v[lang] for k, v in EMOTION_DIMENSIONS.items()}
-    
+def prepare():
+    """言語に依存しない処理（データの読み込み・相関分析・クラスタリング・PCA）をまとめて行う"""
     # データの読み込み
     print("感情評価データを読み込んでいます...")
-    emotion_trends = load_emotion_data().set_index('model')
+    emotion_trends = load_emotion_trends()
+    # 標準化と PCA（入力ファイルが変わらない限り results/cache に保存したものを使う）
+    projection, error = load_projection(INPUT_FILE, load_emotion_trends)
+    if error:
+        print(error)
+        projection = Projection.fit(emotion_trends)
     
     print("相関分析を実行中...")
-    corr = create_correlation_heatmap(emotion_trends, lang)
+    corr = compute_correlation(emotion_trends)
     
     print("最適なクラスター数を計算中...")
-    n_clusters = find_optimal_clusters(emotion_trends, lang)
+    n_clusters, fcm, cluster_counts, silhouette_scores = find_optimal_clusters(projection.scaled)
     print(f"最適なクラスター数: {n_clusters}")
     
     print("Fuzzy C-Means クラスタリングを実行中...")
-    membership, centers, fcm = perform_fcm_analysis(emotion_trends, n_clusters)
+    membership, centers, fcm = perform_fcm_analysis(fcm, projection)
+    
+    print("クラスター特性を分析中...")
+    characteristics = analyze_cluster_characteristics(emotion_trends, membership, centers, n_clusters)
+    
+    return {
+        'emotion_trends': emotion_trends,
+        'corr': corr,
+        'cluster_counts': cluster_counts,
+        'silhouette_scores': silhouette_scores,
+        'membership': membership,
+        'centers': centers,
+        'projection': projection.set_centers(centers),
+        'characteristics': characteristics,
+    }
+
+def render(results, lang='ja'):
+    """prepare の結果から、指定した言語の図と表示を作成"""
+    # 感情次元の定義を取得
+    emotion_dimensions = {k: v[lang] for k, v in EMOTION_DIMENSIONS.items()}
+    emotion_trends = results['emotion_trends']
+    
+    submit_figure(create_correlation_heatmap, results['corr'], lang)
+    submit_figure(plot_silhouette_scores, results['cluster_counts'], results['silhouette_scores'], lang)
     
     print("結果を可視化中...")
     print("- グラデーション表現の生成...")
-    visualize_fcm_gradients(emotion_trends, membership, centers, lang)
+    submit_figure(visualize_fcm_gradients, emotion_trends, results['membership'], results['centers'], lang,
+                  projection=results['projection'])
     print("- 所属度表示の生成...")
-    visualize_fcm_with_memberships(emotion_trends, membership, centers, lang)
-    
-    print("クラスター特性を分析中...")
-    characteristics = analyze_cluster_characteristics(emotion_trends, membership, centers, n_clusters)
+    submit_figure(visualize_fcm_with_memberships, emotion_trends, results['membership'], results['centers'], lang,
+                  projection=results['projection'])
+    wait_for_figures()
     
     print("\nクラスター特性:")
-    for cluster, info in characteristics.items():
+    for cluster, info in results['characteristics'].items():
         print(f"\n{cluster}:")
         print(f"サイズ: {info['size']}モデル")
         print("平均値:")
@@ -282,9 +292,14 @@ def main(lang='ja'):
     print(f"結果は '{OUTPUT_DIR}' ディレクトリに保存されました。")
     print_generated_files(lang)
 
+def main(lang='ja'):
+    # 計算は1回だけ行い、言語ごとの描画は複数の言語を指定した場合に並行して行う
+    results = prepare()
+    run_languages(lambda lang_: render(results, lang_), lang)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate similarity analysis visualizations.')
-    parser.add_argument('--lang', choices=['ja', 'en'], default='ja',
-                       help='Language for visualization (ja/en)')
+    parser.add_argument('--lang', type=parse_languages, default='ja',
+                        help='Language(s) for visualization (ja, en, ja,en or all)')
     args = parser.parse_args()
     main(args.lang)
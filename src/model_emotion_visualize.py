@@ -1,37 +1,23 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
-import japanize_matplotlib
 import numpy as np
-import seaborn as sns
-import json
 import argparse
 from config import (
-    OUTPUT_DIR, VENDOR_PATTERNS, VENDOR_COLORS, MODEL_ORDER,
+    OUTPUT_DIR, VENDOR_COLORS, MODEL_ORDER,
     EMOTION_DIMENSIONS, VISUALIZATION_CONFIG, ensure_output_directories,
-    save_figure, load_emotion_data, create_melted_data, setup_figure, add_header_text, get_message
+    save_figure, create_melted_data, setup_figure, add_header_text, get_message,
+    parse_languages, run_languages, ANALYSIS_COLUMNS
 )
+from figure_jobs import submit_figure, wait_for_figures
+from model_registry import get_model_registry
+from violin_density import draw_violins, load_violin_densities
 
-def get_vendor_color(model_name):
-    """モデル名から対応する開発元の色を取得"""
-    for vendor, patterns in VENDOR_PATTERNS.items():
-        if any(model_name.startswith(pattern) for pattern in patterns):
-            return VENDOR_COLORS[vendor]
-    return '#808080'  # デフォルトの色（グレー）
-
-def get_vendor(model_name):
-    """モデル名から開発元を取得"""
-    for vendor, patterns in VENDOR_PATTERNS.items():
-        if any(model_name.startswith(pattern) for pattern in patterns):
-            return vendor
-    return 'Other'
-
+INPUT_FILE = os.path.join(OUTPUT_DIR, "model_emotion.csv")
 
 def load_messages(lang):
     """言語に応じたメッセージを読み込む"""
-    with open('src/messages.json', 'r', encoding='utf-8') as f:
-        messages = json.load(f)
-    return messages['model_emotion'][lang]
+    return get_message(f'model_emotion.{lang}')
 
 def create_bar_plot(filtered_data, emotions, lang='ja'):
     """棒グラフによる感情次元の平均値比較を作成"""
@@ -50,15 +36,11 @@ def create_bar_plot(filtered_data, emotions, lang='ja'):
     # 各モデルのデータをプロット
     bar_width = 0.2
     x = range(len(filtered_data['model']))
+    colors = filtered_data['vendor_color'].to_numpy()
     for i, (col, _) in enumerate(emotions.items()):
-        bars = ax1.bar([p + i * bar_width for p in x], filtered_data[col], 
-                       bar_width)
-        
         # 各バーを開発元の色で装飾
-        for bar, model in zip(bars, filtered_data['model']):
-            color = get_vendor_color(model)
-            bar.set_color(color)
-            bar.set_alpha(alphas[i])
+        ax1.bar([p + i * bar_width for p in x], filtered_data[col], bar_width,
+                color=colors, edgecolor=colors, alpha=alphas[i])
 
     # グラフの設定
     ax1.set_xlabel(messages['xlabel'])
@@ -86,8 +68,23 @@ def create_bar_plot(filtered_data, emotions, lang='ja'):
     save_figure(plt, "model_emotion", lang=lang)
     plt.close()
 
-def create_distribution_plot(filtered_data, emotions, lang='ja'):
-    """バイオリンプロットとスウォームプロットによる分布の可視化"""
+def load_filtered_data(file_path=INPUT_FILE):
+    """モデル別の感情値を MODEL_ORDER の順に並べ、開発元と色を追加したデータを読み込む"""
+    data = pd.read_csv(file_path)
+    filtered_data = data.set_index('model').reindex(MODEL_ORDER).reset_index()
+    return get_model_registry().annotate(filtered_data)
+
+def load_violin_density():
+    """開発元 × 感情次元ごとのバイオリンプロットの密度曲線を読み込む（キャッシュがなければ作成する）"""
+    return load_violin_densities(INPUT_FILE, load_filtered_data, ['vendor'], ANALYSIS_COLUMNS['values'],
+                                 params={'model_order': list(MODEL_ORDER)}, input_data=False)
+
+def create_distribution_plot(filtered_data, densities, emotions, lang='ja'):
+    """バイオリンプロットとスウォームプロットによる分布の可視化
+
+    バイオリンプロットは load_violin_density() で計算した密度曲線 densities から描く。
+    """
+    import seaborn as sns
     messages = load_messages(lang)
     fig, gs = setup_figure(gridspec=[2, 1, {'height_ratios': [4, 1]}])
 
@@ -100,25 +97,22 @@ def create_distribution_plot(filtered_data, emotions, lang='ja'):
                                      value_vars=list(emotions.keys()),
                                      value_mapping=emotions)
 
-    # バイオリンプロット
-    sns.violinplot(data=melted_data, x='emotion', y='value', hue='vendor',
-                   ax=ax_violin, inner=None, fill=False, linewidth=2.0, palette=VENDOR_COLORS)
+    # バイオリンプロット（事前に計算した密度曲線から描く）
+    palette = get_model_registry().palette()
+    vendors = list(filtered_data['vendor'].cat.categories)
+    draw_violins(ax_violin, densities, 'dimension', list(emotions.keys()), hue='vendor', hue_order=vendors,
+                 palette=palette, linewidth=2.0, labels=list(emotions.values()))
 
     # スウォームプロット
-    sns.swarmplot(data=melted_data, x='emotion', y='value', hue='vendor',
+    sns.swarmplot(data=melted_data, x='emotion', y='value', hue='vendor', hue_order=vendors,
                   ax=ax_violin, dodge=True, size=3, alpha=0.4,
-                  palette=VENDOR_COLORS, legend=False)
+                  palette=palette, legend=False)
 
     ax_violin.set_title(messages['distribution_plot_title'])
     ax_violin.set_xlabel(messages['emotion_xlabel'])
     ax_violin.set_ylabel(messages['emotion_ylabel'])
     ax_violin.grid(True, axis='y', alpha=VISUALIZATION_CONFIG['plot']['grid_alpha'])
 
-    # バイオリンプロットの凡例を調整
-    handles, labels = ax_violin.get_legend_handles_labels()
-    unique_labels = dict(zip(labels, handles))
-    ax_violin.legend_.remove()
-
     # 下段: 開発元の凡例
     ax2 = fig.add_subplot(gs[1])
     ax2.axis('off')
@@ -139,17 +133,25 @@ def create_distribution_plot(filtered_data, emotions, lang='ja'):
 
 def main(lang='ja'):
     """メイン処理"""
+    langs = parse_languages(lang)
+    if len(langs) > 1:
+        # 密度曲線は言語によらないので、言語ごとの子プロセスを作る前に1回だけ計算してキャッシュする
+        load_violin_density()
+        # 複数の言語を指定した場合は、言語ごとの子プロセスで並行して描画する
+        return run_languages(main, langs)
+    lang = langs[0]
+
     # 出力ディレクトリを作成
     ensure_output_directories()
 
-    # CSVファイルからデータを読み込む
-    data = load_emotion_data()
-
-    # データをモデル順序に基づいて並べ替え
-    filtered_data = data.set_index('model').reindex(MODEL_ORDER).reset_index()
+    # CSVファイルからデータを読み込み、モデル順序に基づいて並べ替えて開発元と色を追加
+    filtered_data = load_filtered_data()
 
-    # 開発元情報を追加
-    filtered_data['vendor'] = filtered_data['model'].apply(get_vendor)
+    # バイオリンプロットの密度曲線（キャッシュ）を読み込む
+    densities, error = load_violin_density()
+    if error:
+        print(error)
+        return
 
     # 言語に応じた感情次元の定義を使用
     # messages = load_messages(lang) # messagesは他の場所で使用されているため残す
@@ -157,12 +159,13 @@ def main(lang='ja'):
     emotions = {k: v[lang] for k, v in emotion_dimensions_raw.items()}
 
     # 2つのグラフを生成
-    create_bar_plot(filtered_data, emotions, lang)
-    create_distribution_plot(filtered_data, emotions, lang)
+    submit_figure(create_bar_plot, filtered_data, emotions, lang)
+    submit_figure(create_distribution_plot, filtered_data, densities, emotions, lang)
+    wait_for_figures()
 
     # 開発元ごとの平均値を計算して表示
     print("\n開発元ごとの感情次元平均値:")
-    vendor_means = filtered_data.groupby('vendor')[list(emotions.keys())].mean()
+    vendor_means = filtered_data.groupby('vendor', observed=True)[list(emotions.keys())].mean()
     for vendor in vendor_means.index:
         print(f"\n{vendor}:")
         for col, label in emotions.items():
@@ -177,6 +180,7 @@ def main(lang='ja'):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate visualization for model emotion data.')
-    parser.add_argument('--lang', choices=['ja', 'en'], default='ja', help='Language for visualization (ja/en)')
+    parser.add_argument('--lang', type=parse_languages, default='ja',
+                        help='Language(s) for visualization (ja, en, ja,en or all)')
     args = parser.parse_args()
     main(args.lang)
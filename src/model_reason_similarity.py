@@ -1,27 +1,21 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-from fcmeans import FCM
-from sklearn.metrics import silhouette_score
 import os
 import json
 import argparse
 from config import (
-    OUTPUT_DIR, VISUALIZATION_CONFIG, CLUSTERING_CONFIG,
-    ensure_output_directories, save_figure, get_message
+    OUTPUT_DIR, VISUALIZATION_CONFIG,
+    ensure_output_directories, save_figure, get_message, parse_languages, run_languages
 )
-from adjustText import adjust_text
+from clustering import Projection, silhouette_sweep, load_projection, cluster_colors
+from figure_jobs import submit_figure, wait_for_figures
+from label_layout import place_labels
 
 def load_messages(lang='ja'):
     """言語に応じたメッセージと理由文の定義を読み込む"""
-    with open('src/messages.json', 'r', encoding='utf-8') as f:
-        messages_data = json.load(f)
-    
     # model_reason_similarity のメッセージ
-    similarity_messages = messages_data['model_reason_similarity'][lang]
+    similarity_messages = get_message(f'model_reason_similarity.{lang}')
     
     # model_reason の reason_dimensions も読み込む
     reason_dimensions = get_message('common.reason_dimensions', lang)
@@ -32,19 +26,24 @@ def load_messages(lang='ja'):
 # 出力ディレクトリの作成
 ensure_output_directories()
 
-def load_reason_data():
-    """理由文長データの読み込み"""
-    filepath = os.path.join(OUTPUT_DIR, 'model_reason.csv')
+INPUT_FILE = os.path.join(OUTPUT_DIR, 'model_reason.csv')
+
+def load_reason_data(file_path=INPUT_FILE):
+    """理由文長データ（model を行ラベルとする）の読み込み"""
     try:
-        return pd.read_csv(filepath)
+        return pd.read_csv(file_path).set_index('model')
     except FileNotFoundError:
-        raise FileNotFoundError(f"ファイルが見つかりません: {filepath}")
+        raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
 
-def create_correlation_heatmap(reason_trends, lang='ja'):
-    """モデル間の相関分析とヒートマップの作成"""
-    # モデル間の相関係数を計算
+def compute_correlation(reason_trends):
+    """モデル間の相関係数を計算し、CSVとして保存"""
     corr = reason_trends.T.corr()
-    
+    corr.to_csv(os.path.join(OUTPUT_DIR, 'model_reason_correlation.csv'))
+    return corr
+
+def create_correlation_heatmap(corr, lang='ja'):
+    """モデル間の相関係数のヒートマップの作成"""
+    import seaborn as sns
     # ヒートマップの作成
     plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
     sns.heatmap(corr, annot=True, cmap='coolwarm', fmt='.2f', square=True)
@@ -54,26 +53,22 @@ def create_correlation_heatmap(reason_trends, lang='ja'):
     
     # 保存
     save_figure(plt, 'model_reason_correlation', lang=lang)
-    
-    # 相関行列をCSVとして保存
-    corr.to_csv(os.path.join(OUTPUT_DIR, 'model_reason_correlation.csv'))
     return corr
 
-def find_optimal_clusters(reason_trends, lang='ja'):
-    """最適なクラスター数の決定"""
-    scaled_data = StandardScaler().fit_transform(reason_trends)
-    silhouette_scores = []
-    
-    for n in range(2, CLUSTERING_CONFIG['max_clusters'] + 1):
-        fcm = FCM(n_clusters=n, random_state=42)
-        fcm.fit(scaled_data)
-        labels = fcm.u.argmax(axis=1)
-        score = silhouette_score(scaled_data, labels)
-        silhouette_scores.append(score)
-    
-    # シルエットスコアの可視化
+def find_optimal_clusters(scaled_data):
+    """最適なクラスター数の決定（scaled_data は標準化済みのデータ）。
+
+    戻り値は (最適なクラスター数, そのクラスター数で学習済みの FuzzyCMeans,
+    クラスター数のリスト, シルエットスコアのリスト)。
+    """
+    cluster_counts, silhouette_scores, models = silhouette_sweep(scaled_data)
+    optimal_clusters = cluster_counts[int(np.argmax(silhouette_scores))]
+    return optimal_clusters, models[optimal_clusters], cluster_counts, silhouette_scores
+
+def plot_silhouette_scores(cluster_counts, silhouette_scores, lang='ja'):
+    """シルエットスコアの可視化"""
     plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
-    plt.plot(range(2, CLUSTERING_CONFIG['max_clusters'] + 1), silhouette_scores, 'bo-')
+    plt.plot(cluster_counts, silhouette_scores, 'bo-')
     messages = load_messages(lang)
     plt.xlabel(messages['silhouette_xlabel'])
     plt.ylabel(messages['silhouette_ylabel'])
@@ -83,39 +78,27 @@ def find_optimal_clusters(reason_trends, lang='ja'):
     # 保存
     save_figure(plt, 'model_reason_silhouette', lang=lang)
     plt.close()
-    
-    optimal_clusters = np.argmax(silhouette_scores) + 2
-    return optimal_clusters
 
-def perform_fcm_analysis(reason_trends, n_clusters):
-    """Fuzzy C-Means クラスタリングの実行"""
-    # データの正規化
-    scaler = StandardScaler()
-    scaled_data = scaler.fit_transform(reason_trends)
-    
-    # FCMの実行
-    fcm = FCM(n_clusters=n_clusters, random_state=42)
-    fcm.fit(scaled_data)
-    
+def perform_fcm_analysis(fcm, projection):
+    """Fuzzy C-Means クラスタリングの結果の取得（探索時に学習済みのモデルと projection の標準化を使う）"""
     # 所属度とクラスター中心を元のスケールに戻す
-    centers = scaler.inverse_transform(fcm.centers)
+    centers = projection.inverse_transform(fcm.centers)
     
     return fcm.u, centers, fcm
 
-def visualize_fcm_gradients(reason_trends, membership, centers, lang='ja', messages=None):
+def visualize_fcm_gradients(reason_trends, membership, centers, lang='ja', messages=None, projection=None):
     """FCM結果をグラデーションで可視化"""
     # messages = load_messages(lang) # この行を削除
-    pca = PCA(n_components=2)
-    data_2d = pca.fit_transform(StandardScaler().fit_transform(reason_trends))
-    centers_2d = pca.transform(StandardScaler().fit_transform(centers))
+    if projection is None:
+        projection = Projection.fit(reason_trends).set_centers(centers)
+    data_2d, centers_2d = projection.data_2d, projection.centers_2d
     
     plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
     
-    # クラスターごとの色を定義
-    colors = CLUSTERING_CONFIG['colors']['cluster']
+    # クラスターごとの色を定義（クラスター数が設定の色より多い場合も全クラスターに色を割り当てる）
+    colors = cluster_colors(membership.shape[1])
     
     # 各点をプロット
-    texts = []
     for i in range(len(data_2d)):
         # 所属度に基づいて色をブレンド
         color = np.zeros(3)
@@ -125,15 +108,14 @@ def visualize_fcm_gradients(reason_trends, membership, centers, lang='ja', messa
             
         plt.scatter(data_2d[i, 0], data_2d[i, 1], 
                    color=color, s=100)
-        texts.append(plt.text(data_2d[i, 0], data_2d[i, 1], 
-                            reason_trends.index[i], fontsize=8))
     
     # クラスター中心のプロット
     plt.scatter(centers_2d[:, 0], centers_2d[:, 1], 
                c='black', marker='x', s=200, label=messages['cluster_center_label_gradient'])
     
-    # テキストの重なりを調整
-    adjust_text(texts, arrowprops=dict(arrowstyle='-', color='gray', lw=0.5))
+    # モデル名を点・クラスター中心と重ならないように配置
+    place_labels(plt.gca(), data_2d, list(reason_trends.index), fontsize=8, marker_size=100,
+                 obstacles=centers_2d, obstacle_size=200, arrowprops=dict(arrowstyle='-', color='gray', lw=0.5))
 
     plt.title(messages['fcm_gradient_title'])
     
@@ -152,22 +134,23 @@ def visualize_fcm_gradients(reason_trends, membership, centers, lang='ja', messa
     save_figure(plt, 'model_reason_fcm_gradient', lang=lang)
     plt.close()
 
-def visualize_fcm_with_memberships(reason_trends, membership, centers, lang='ja', messages=None):
+def visualize_fcm_with_memberships(reason_trends, membership, centers, lang='ja', messages=None, projection=None):
     """FCM結果を所属度付きで可視化"""
     # messages = load_messages(lang) # この行は削除済み
-    pca = PCA(n_components=2)
-    data_2d = pca.fit_transform(StandardScaler().fit_transform(reason_trends))
-    centers_2d = pca.transform(StandardScaler().fit_transform(centers))
+    if projection is None:
+        projection = Projection.fit(reason_trends).set_centers(centers)
+    data_2d, centers_2d = projection.data_2d, projection.centers_2d
     
     plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
     
     # 各点をプロット
+    colors = cluster_colors(membership.shape[1])
     texts = []
     for i in range(len(data_2d)):
         dominant_cluster = np.argmax(membership[i])
         alpha = max(membership[i])
         plt.scatter(data_2d[i, 0], data_2d[i, 1], 
-                   c=CLUSTERING_CONFIG['colors']['cluster'][dominant_cluster], 
+                   c=colors[dominant_cluster], 
                    alpha=VISUALIZATION_CONFIG['plot']['text_box_alpha'],
                    label=f'Cluster {dominant_cluster+1}' if i == 0 else "")
         
@@ -175,15 +158,16 @@ def visualize_fcm_with_memberships(reason_trends, membership, centers, lang='ja'
         memberships_text = [f'C{j+1}:{membership[i,j]:.2f}'
                           for j in range(membership.shape[1])]
         text_content = f'{reason_trends.index[i]}\n({", ".join(memberships_text)})'
-        texts.append(plt.text(data_2d[i, 0], data_2d[i, 1], text_content,
-                            fontsize=7, bbox=dict(facecolor='white', alpha=0.7)))
+        texts.append(text_content)
     
     # クラスター中心のプロット
     plt.scatter(centers_2d[:, 0], centers_2d[:, 1], 
                c='black', marker='x', s=200, label=messages['cluster_center_label_membership'])
     
-    # テキストの重なりを調整
-    adjust_text(texts, arrowprops=dict(arrowstyle='-', color='gray', lw=0.5))
+    # モデル名と所属度を点・クラスター中心と重ならないように配置
+    place_labels(plt.gca(), data_2d, texts, fontsize=7, bbox=dict(facecolor='white', alpha=0.7),
+                 marker_size=plt.rcParams['lines.markersize'] ** 2, obstacles=centers_2d, obstacle_size=200,
+                 arrowprops=dict(arrowstyle='-', color='gray', lw=0.5))
 
     messages = load_messages(lang)
     plt.title(messages['fcm_membership_title'])
@@ -248,37 +232,64 @@ def print_generated_files(lang='ja'):
     print(f"- {os.path.join(figures_dir, 'model_reason_fcm_membership.png')}")
     print(f"- {os.path.join(figures_dir, 'model_reason_fcm_membership.pdf')}")
 
-def main(lang='ja'):
-    # 日本語フォントのインポート（日本語の場合のみ）
-    if lang == 'ja':
-        import japanize_matplotlib
+def prepare(lang='ja'):
+    """言語に依存しない処理（データの読み込み・相関分析・クラスタリング・PCA）をまとめて行う
 
+    lang は進捗表示に使う言語。
+    """
     # データの読み込み
     messages = load_messages(lang)
     print(messages['loading_data'])
-    reason_trends = load_reason_data().set_index('model')
+    reason_trends = load_reason_data()
+    # 標準化と PCA（入力ファイルが変わらない限り results/cache に保存したものを使う）
+    projection, error = load_projection(INPUT_FILE, load_reason_data)
+    if error:
+        print(error)
+        projection = Projection.fit(reason_trends)
     
     print(messages['running_correlation'])
-    corr = create_correlation_heatmap(reason_trends, lang)
+    corr = compute_correlation(reason_trends)
     
     print(messages['calculating_clusters'])
-    n_clusters = find_optimal_clusters(reason_trends, lang)
+    n_clusters, fcm, cluster_counts, silhouette_scores = find_optimal_clusters(projection.scaled)
     print(messages['optimal_clusters'].format(n_clusters=n_clusters))
     
     print(messages['running_fcm'])
-    membership, centers, fcm = perform_fcm_analysis(reason_trends, n_clusters)
+    membership, centers, fcm = perform_fcm_analysis(fcm, projection)
+    
+    print(messages['analyzing_characteristics'])
+    characteristics = analyze_cluster_characteristics(reason_trends, membership, centers, n_clusters, messages)
+    
+    return {
+        'reason_trends': reason_trends,
+        'corr': corr,
+        'cluster_counts': cluster_counts,
+        'silhouette_scores': silhouette_scores,
+        'membership': membership,
+        'centers': centers,
+        'projection': projection.set_centers(centers),
+        'characteristics': characteristics,
+    }
+
+def render(results, lang='ja'):
+    """prepare の結果から、指定した言語の図と表示を作成"""
+    messages = load_messages(lang)
+    reason_trends = results['reason_trends']
+    
+    submit_figure(create_correlation_heatmap, results['corr'], lang)
+    submit_figure(plot_silhouette_scores, results['cluster_counts'], results['silhouette_scores'], lang)
     
     print(messages['visualizing_results'])
     print(messages['generating_gradient'])
-    visualize_fcm_gradients(reason_trends, membership, centers, lang, messages)
+    submit_figure(visualize_fcm_gradients, reason_trends, results['membership'], results['centers'], lang, messages,
+                  projection=results['projection'])
     print(messages['generating_membership'])
-    visualize_fcm_with_memberships(reason_trends, membership, centers, lang, messages)
-    
-    print(messages['analyzing_characteristics'])
-    characteristics = analyze_cluster_characteristics(reason_trends, membership, centers, n_clusters, messages)
+    submit_figure(visualize_fcm_with_memberships, reason_trends, results['membership'], results['centers'], lang, messages,
+                  projection=results['projection'])
+    wait_for_figures()
     
     print(messages['cluster_characteristics_header'])
-    for cluster, info in characteristics.items():
+    for cluster, info in results['characteristics'].items():
         print(f"\n{cluster}:")
         print(messages['cluster_size'].format(size=info['size']))
         print(messages['mean_char_count'])
@@ -292,9 +303,16 @@ def main(lang='ja'):
     print(messages['results_saved_to'].format(OUTPUT_DIR))
     print_generated_files(lang)
 
+def main(lang='ja'):
+    # 計算は1回だけ行い、言語ごとの描画は複数の言語を指定した場合に並行して行う
+    # （日本語フォントは run_languages が日本語の描画の場合のみ有効にする）
+    langs = parse_languages(lang)
+    results = prepare(langs[0])
+    run_languages(lambda lang_: render(results, lang_), langs)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate similarity analysis visualizations.')
-    parser.add_argument('--lang', choices=['ja', 'en'], default='ja',
-                       help='Language for visualization (ja/en)')
+    parser.add_argument('--lang', type=parse_languages, default='ja',
+                        help='Language(s) for visualization (ja, en, ja,en or all)')
     args = parser.parse_args()
     main(args.lang)
@@ -0,0 +1,108 @@
+"""モデル名から開発元・表示順・色を求めるモデルレジストリ。
+
+MODEL_ORDER と VENDOR_PATTERNS から1回だけ作成し、各モデルの (開発元, 表示順, 色) を配列として持つ。
+開発元の判定は VENDOR_PATTERNS の正規表現（モデル名の先頭に一致）を1つにまとめた正規表現で、
+モデル名の配列に対してまとめて行う。MODEL_ORDER にないモデルは、最初に現れたときに末尾に追加する。
+
+図を描くコードは、モデル名ごとにパターンを照合する代わりに、codes() で得た位置で配列を参照する。
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from config import MODEL_ORDER, VENDOR_COLORS, VENDOR_PATTERNS
+
+# どのパターンにも一致しないモデルの開発元と色
+OTHER_VENDOR = 'Other'
+OTHER_COLOR = '#808080'
+
+def vendor_regex():
+    """開発元ごとに名前付きグループを持つ正規表現（VENDOR_PATTERNS の順に優先）"""
+    groups = [f"(?P<v{i}>{'|'.join(f'(?:{pattern})' for pattern in patterns)})"
+              for i, patterns in enumerate(VENDOR_PATTERNS.values())]
+    return re.compile('^(?:' + '|'.join(groups) + ')')
+
+def classify_vendors(models):
+    """モデル名の配列を開発元の配列に変換する（どのパターンにも一致しなければ OTHER_VENDOR）"""
+    names = pd.Series(np.asarray(models, dtype=object)).astype(str)
+    matched = names.str.extract(vendor_regex()).notna().to_numpy()
+    vendors = np.array(list(VENDOR_PATTERNS) + [OTHER_VENDOR], dtype=object)
+    return vendors[np.where(matched.any(axis=1), matched.argmax(axis=1), len(VENDOR_PATTERNS))]
+
+class ModelRegistry:
+    """モデルごとの (開発元, 表示順, 色)。
+
+    models の位置がそのまま表示順（MODEL_ORDER の順、その後に追加されたモデル）で、
+    vendors / colors は同じ位置のモデルの開発元と色。
+    """
+
+    def __init__(self, models=None):
+        self.models = pd.Index([], dtype=object)
+        self.vendors = np.array([], dtype=object)
+        self.colors = np.array([], dtype=object)
+        self.add(MODEL_ORDER if models is None else models)
+
+    def add(self, models):
+        """未登録のモデルを末尾に追加する"""
+        models = pd.Index(pd.unique(pd.Series(np.asarray(models, dtype=object)).dropna()))
+        new = models[self.models.get_indexer(models) < 0]
+        if len(new) == 0:
+            return
+        vendors = classify_vendors(new)
+        self.models = self.models.append(new)
+        self.vendors = np.concatenate([self.vendors, vendors])
+        self.colors = np.concatenate([
+            self.colors, pd.Series(vendors).map(VENDOR_COLORS).fillna(OTHER_COLOR).to_numpy(dtype=object)])
+
+    def codes(self, models):
+        """モデル名の配列をレジストリ内の位置（表示順）に変換する（欠損値は -1）"""
+        models = np.asarray(models, dtype=object)
+        codes = self.models.get_indexer(models)
+        if (codes < 0).any():
+            self.add(models[codes < 0])
+            codes = self.models.get_indexer(models)
+        return codes
+
+    def vendor_of(self, models):
+        """モデル名の配列に対応する開発元の配列"""
+        codes = self.codes(models)
+        return np.append(self.vendors, OTHER_VENDOR)[codes]
+
+    def color_of(self, models):
+        """モデル名の配列に対応する開発元の色の配列"""
+        codes = self.codes(models)
+        return np.append(self.colors, OTHER_COLOR)[codes]
+
+    def vendor_categories(self):
+        """開発元の並び（レジストリ内で最初に現れた順、OTHER_VENDOR は最後）"""
+        vendors = list(pd.unique(self.vendors))
+        if OTHER_VENDOR in vendors:
+            vendors.remove(OTHER_VENDOR)
+        return vendors + [OTHER_VENDOR]
+
+    def palette(self):
+        """開発元 -> 色の辞書（seaborn の palette に渡す）"""
+        return {**VENDOR_COLORS, OTHER_VENDOR: OTHER_COLOR}
+
+    def annotate(self, df, column='model'):
+        """DataFrame に model_order（表示順）と、カテゴリ型の vendor・vendor_color 列を追加したコピーを返す。
+
+        vendor のカテゴリは df に現れる開発元だけを、レジストリ内で最初に現れた順に並べる。
+        """
+        codes = self.codes(df[column])
+        annotated = df.copy()
+        annotated['model_order'] = codes
+        annotated['vendor'] = pd.Categorical(
+            np.append(self.vendors, OTHER_VENDOR)[codes], categories=self.vendor_categories()
+        ).remove_unused_categories()
+        annotated['vendor_color'] = pd.Categorical(np.append(self.colors, OTHER_COLOR)[codes])
+        return annotated
+
+_registry = None
+
+def get_model_registry():
+    """MODEL_ORDER と VENDOR_PATTERNS から作成したモデルレジストリを返す（プロセスごとに1回だけ作成）"""
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
@@ -1,20 +1,19 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.preprocessing import StandardScaler
 import os
-import json
 import argparse
 from config import (
-    OUTPUT_DIR, VISUALIZATION_CONFIG, CLUSTERING_CONFIG,
+    OUTPUT_DIR, VISUALIZATION_CONFIG,
     ensure_output_directories, save_figure, get_message,
-    PERSONA_COLORS
+    PERSONA_COLORS, parse_languages, run_languages
 )
+from figure_jobs import submit_figure, wait_for_figures
 
 
-def create_correlation_heatmap(emotion_trends, lang='ja'):
+def create_correlation_heatmap(emotion_trends, lang='ja', save_csv=True):
     """ペルソナ間の相関分析とヒートマップの作成"""
+    import seaborn as sns
     # ペルソナ間の相関係数を計算
     corr = emotion_trends.T.corr()
     
@@ -35,7 +34,8 @@ def create_correlation_heatmap(emotion_trends, lang='ja'):
     plt.close()
     
     # 相関行列をCSVとして保存
-    corr.to_csv(os.path.join(OUTPUT_DIR, 'persona_emotion_correlation.csv'))
+    if save_csv:
+        corr.to_csv(os.path.join(OUTPUT_DIR, 'persona_emotion_correlation.csv'))
     return corr
 
 def analyze_emotion_patterns(emotion_trends, lang='ja'):
@@ -129,7 +129,8 @@ def print_generated_files(lang='ja'):
     print(f"- {os.path.join(figures_dir, 'persona_emotion_patterns.png')}")
     print(f"- {os.path.join(figures_dir, 'persona_emotion_patterns.pdf')}")
 
-def main(lang='ja'):
+def analyze(lang='ja', save_csv=True):
+    """1つの言語で分析と描画を行う（save_csv=False の場合は相関行列のCSVを保存しない）"""
     # 言語に応じてmatplotlibの設定を行う
     if lang == 'ja':
         import japanize_matplotlib
@@ -154,13 +155,14 @@ def main(lang='ja'):
     emotion_trends.index = emotion_trends.index.map(lambda x: persona_mapping[x][lang])
     
     print(analysis_messages['correlation_text'])
-    corr = create_correlation_heatmap(emotion_trends, lang)
+    submit_figure(create_correlation_heatmap, emotion_trends, lang, save_csv)
     
     print(analysis_messages['pattern_text'])
     pattern_analysis = analyze_emotion_patterns(emotion_trends, lang)
     
     print(analysis_messages['visualization_text'])
-    visualize_emotion_patterns(emotion_trends, lang)
+    submit_figure(visualize_emotion_patterns, emotion_trends, lang)
+    wait_for_figures()
     
     # 結果の表示
     print_pattern_analysis(pattern_analysis, lang)
@@ -169,9 +171,15 @@ def main(lang='ja'):
     print(analysis_messages['save_text'].format(OUTPUT_DIR))
     print_generated_files(lang)
 
+def main(lang='ja'):
+    # 複数の言語を指定した場合は、言語ごとの子プロセスで並行して分析と描画を行う
+    # （相関行列のCSVはラベルの言語によって内容が変わるため、最初の言語の結果だけを保存する）
+    langs = parse_languages(lang)
+    run_languages(lambda lang_: analyze(lang_, save_csv=(lang_ == langs[0])), langs)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate similarity analysis visualizations.')
-    parser.add_argument('--lang', choices=['ja', 'en'], default='ja',
-                       help='Language for visualization (ja/en)')
+    parser.add_argument('--lang', type=parse_languages, default='ja',
+                        help='Language(s) for visualization (ja, en, ja,en or all)')
     args = parser.parse_args()
     main(args.lang)
@@ -1,20 +1,23 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
-import japanize_matplotlib
-import json
 import argparse
 import os
 from config import (
     OUTPUT_DIR, VISUALIZATION_CONFIG, PERSONA_COLORS, # EMOTION_COLORSを削除
-    ensure_output_directories, save_figure, create_melted_data, setup_figure, add_header_text, get_message,
-    get_emotion_color_from_persona_base # 新しい関数を追加
+    ensure_output_directories, save_figure, create_melted_data,
+    get_emotion_color_from_persona_base, # 新しい関数を追加
+    get_messages, parse_languages, run_languages, ANALYSIS_COLUMNS, load_input_data
 )
+from figure_jobs import submit_figure, wait_for_figures
+from swarm_layout import swarm_plot
+from violin_density import draw_violins, load_violin_densities
+
+# 分布の図で使用する入力列（実行ごとの感情値）
+INPUT_COLUMNS = ['persona'] + ANALYSIS_COLUMNS['values']
 
 def load_messages(lang):
     """言語に応じたメッセージを読み込む"""
-    with open('src/messages.json', 'r', encoding='utf-8') as f:
-        messages = json.load(f)
+    messages = get_messages()
     
     # persona_emotionセクションからメッセージを取得
     combined_messages = messages['persona_emotion'][lang].copy()
@@ -101,8 +104,24 @@ def create_bar_plot(data, personas, lang='ja'):
     save_figure(plt, "persona_emotion", lang=lang)
     plt.close()
 
-def create_distribution_plot(data, personas, lang='ja'):
-    """バイオリンプロットとスウォームプロットによる分布の可視化 (ファセットグリッド使用)"""
+def load_violin_density():
+    """ペルソナ × 感情次元ごとの、実行ごとの感情値の密度曲線を読み込む（キャッシュがなければ作成する）"""
+    def prepare(path):
+        data, error = load_input_data(path, columns=INPUT_COLUMNS)
+        if error:
+            raise RuntimeError(error)
+        return data
+
+    return load_violin_densities(None, prepare, ['persona'], ANALYSIS_COLUMNS['values'])
+
+def create_distribution_plot(data, densities, lang='ja'):
+    """バイオリンプロットとスウォームプロットによる分布の可視化 (ファセットグリッド使用)
+
+    data は実行ごとの感情値（persona と感情次元の列）。バイオリンプロットは load_violin_density() で
+    計算した密度曲線 densities から描く。スウォームプロットの点は swarm_layout.py で
+    まとめて配置し、点の数が多い感情次元はドット密度で描画する。
+    """
+    import seaborn as sns
     messages = load_messages(lang)
     
     # 言語に応じた感情次元の定義を確実に使用
@@ -127,8 +146,9 @@ def create_distribution_plot(data, personas, lang='ja'):
     )
 
     # ペルソナ識別子を言語に応じた名前に変換
-    persona_mapping = messages['persona_mapping']
-    melted_data['persona_display'] = melted_data['persona'].map(persona_mapping)
+    persona_mapping = {k: v[lang] if isinstance(v, dict) else v for k, v in messages['persona_mapping'].items()}
+    personas = list(persona_mapping.values())
+    melted_data['persona_display'] = melted_data['persona'].astype(str).map(persona_mapping)
 
     # FacetGridを作成
     g = sns.FacetGrid(melted_data, col='persona_display', col_order=personas, col_wrap=2, height=6, aspect=1.2)
@@ -143,15 +163,11 @@ def create_distribution_plot(data, personas, lang='ja'):
         
         ax = plt.gca()
         
-        sns.violinplot(data=data, x='emotion', y='value', hue='emotion',
-                      ax=ax, inner=None, fill=False, linewidth=2.0,
-                      palette=emotion_palette,
-                      order=emotion_order, legend=False, dodge=False)
-
-        sns.swarmplot(data=data, x='emotion', y='value', hue='emotion',
-                     ax=ax, dodge=False, size=3, alpha=0.4,
-                     palette=emotion_palette,
-                     order=emotion_order, legend=False)
+        draw_violins(ax, densities[densities['persona'] == persona_id], 'dimension', value_vars,
+                     palette=emotion_palette, linewidth=2.0, labels=emotion_order)
+
+        swarm_plot(ax, data, 'emotion', 'value', emotion_order, emotion_palette, lang=lang,
+                   size=3, alpha=0.4)
         
         ax.set_xlabel(messages['emotion_xlabel'], fontsize=14)
         ax.set_ylabel(messages['emotion_ylabel'], fontsize=14)
@@ -173,6 +189,14 @@ def create_distribution_plot(data, personas, lang='ja'):
 
 def main(lang='ja'):
     """メイン処理"""
+    langs = parse_languages(lang)
+    if len(langs) > 1:
+        # 密度曲線は言語によらないので、言語ごとの子プロセスを作る前に1回だけ計算してキャッシュする
+        load_violin_density()
+        # 複数の言語を指定した場合は、言語ごとの子プロセスで並行して描画する
+        return run_languages(main, langs)
+    lang = langs[0]
+
     # 出力ディレクトリを作成
     ensure_output_directories()
 
@@ -185,9 +209,19 @@ def main(lang='ja'):
     # ペルソナの順序を定義（言語に応じて）
     personas = list(messages['persona_mapping'].values())
 
-    # バープロットのみ生成
-    create_bar_plot(df, personas, lang)
-    # create_distribution_plot(df, personas, lang)  # 一時的にコメントアウト
+    # 分布の図は実行ごとの感情値から作成する
+    runs, error = load_input_data(columns=INPUT_COLUMNS)
+    if error:
+        print(error)
+        return
+    densities, error = load_violin_density()
+    if error:
+        print(error)
+        return
+
+    submit_figure(create_bar_plot, df, personas, lang)
+    submit_figure(create_distribution_plot, runs, densities, lang)
+    wait_for_figures()
 
     # ペルソナごとの平均値を表示
     print("\nペルソナごとの感情次元平均値:")
@@ -209,6 +243,7 @@ def main(lang='ja'):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate visualization for persona emotion data.')
-    parser.add_argument('--lang', choices=['ja', 'en'], default='ja', help='Language for visualization (ja/en)')
+    parser.add_argument('--lang', type=parse_languages, default='ja',
+                        help='Language(s) for visualization (ja, en, ja,en or all)')
     args = parser.parse_args()
     main(args.lang)
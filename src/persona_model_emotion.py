@@ -9,7 +9,6 @@ import sys
 import argparse
 import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
 # import japanize_matplotlib # langに応じてmain関数内でインポート
 from config import (
     MODEL_ORDER,
@@ -17,9 +16,13 @@ from config import (
     VISUALIZATION_CONFIG,
     get_message,
     save_figure,
-    safe_read_csv
+    ANALYSIS_COLUMNS,
+    load_input_data, parse_languages, run_languages
 )
 
+# このスクリプトが使用する入力列（理由文は読み込まない）
+INPUT_COLUMNS = ANALYSIS_COLUMNS['keys'] + ANALYSIS_COLUMNS['values']
+
 # ペルソナの表示順
 PERSONA_ORDER = ['p1', 'p2', 'p3', 'p4']
 # 感情次元のカラム名
@@ -27,7 +30,7 @@ EMOTION_COLS = [f"Q{i}value" for i in range(1, 5)]
 
 def load_data(lang='ja'):
     """データの読み込みと前処理"""
-    df, error = safe_read_csv("./data_all.csv")
+    df, error = load_input_data(columns=INPUT_COLUMNS)
     if error:
         print(error)
         sys.exit(1)
@@ -138,6 +141,12 @@ def create_combined_emotion_plot(data, lang='ja'):
 
 def main(lang='ja'):
     """メイン関数"""
+    langs = parse_languages(lang)
+    if len(langs) > 1:
+        # 複数の言語を指定した場合は、言語ごとの子プロセスで並行して描画する
+        return run_languages(main, langs)
+    lang = langs[0]
+
     # データの読み込み
     df = load_data(lang)
     
@@ -154,6 +163,7 @@ def main(lang='ja'):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="ペルソナと感情次元の関係を可視化（結合グラフ）")
-    parser.add_argument('--lang', choices=['ja', 'en'], default='ja', help='言語設定（ja/en）')
+    parser.add_argument('--lang', type=parse_languages, default='ja',
+                        help='Language(s) for visualization (ja, en, ja,en or all)')
     args = parser.parse_args()
     main(args.lang)
@@ -1,21 +1,17 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
-import japanize_matplotlib
-from sklearn.preprocessing import StandardScaler
 import os
-import json
 import argparse
 from config import (
     OUTPUT_DIR, VISUALIZATION_CONFIG,
-    ensure_output_directories, save_figure
+    ensure_output_directories, save_figure, get_messages, parse_languages, run_languages
 )
+from figure_jobs import submit_figure, wait_for_figures
 
 def load_messages(lang='ja'):
     """言語に応じたメッセージと共通メッセージを読み込む"""
-    with open('src/messages.json', 'r', encoding='utf-8') as f:
-        messages = json.load(f)
+    messages = get_messages()
     
     # persona_reason_similarityメッセージと共通辞書を言語固有に変換
     combined_messages = messages['persona_reason_similarity'][lang].copy()
@@ -30,8 +26,9 @@ def load_messages(lang='ja'):
     
     return combined_messages
 
-def create_correlation_heatmap(reason_trends, lang='ja'):
+def create_correlation_heatmap(reason_trends, lang='ja', save_csv=True):
     """ペルソナ間の相関分析とヒートマップの作成"""
+    import seaborn as sns
     # ペルソナ間の相関係数を計算
     corr = reason_trends.T.corr()
     
@@ -47,7 +44,8 @@ def create_correlation_heatmap(reason_trends, lang='ja'):
     plt.close()
     
     # 相関行列をCSVとして保存
-    corr.to_csv(os.path.join(OUTPUT_DIR, 'persona_reason_correlation.csv'))
+    if save_csv:
+        corr.to_csv(os.path.join(OUTPUT_DIR, 'persona_reason_correlation.csv'))
     return corr
 
 def analyze_reason_patterns(reason_trends, lang='ja'):
@@ -144,7 +142,8 @@ def print_generated_files(lang='ja'):
     print(f"- {os.path.join(figures_dir, 'persona_reason_patterns.png')}")
     print(f"- {os.path.join(figures_dir, 'persona_reason_patterns.pdf')}")
 
-def main(lang='ja'):
+def analyze(lang='ja', save_csv=True):
+    """1つの言語で分析と描画を行う（save_csv=False の場合は相関行列のCSVを保存しない）"""
     # 出力ディレクトリの作成
     ensure_output_directories()
     
@@ -159,13 +158,14 @@ def main(lang='ja'):
     reason_trends.index = reason_trends.index.map(messages['persona_mapping'])
     
     print(messages['correlation_text'])
-    corr = create_correlation_heatmap(reason_trends, lang)
+    submit_figure(create_correlation_heatmap, reason_trends, lang, save_csv)
     
     print(messages['pattern_text'])
     pattern_analysis = analyze_reason_patterns(reason_trends, lang)
     
     print(messages['visualization_text'])
-    visualize_reason_patterns(reason_trends, lang)
+    submit_figure(visualize_reason_patterns, reason_trends, lang)
+    wait_for_figures()
     
     # 結果の表示
     print_pattern_analysis(pattern_analysis, lang)
@@ -174,9 +174,15 @@ def main(lang='ja'):
     print(messages['save_text'].format(OUTPUT_DIR))
     print_generated_files(lang)
 
+def main(lang='ja'):
+    # 複数の言語を指定した場合は、言語ごとの子プロセスで並行して分析と描画を行う
+    # （相関行列のCSVはラベルの言語によって内容が変わるため、最初の言語の結果だけを保存する）
+    langs = parse_languages(lang)
+    run_languages(lambda lang_: analyze(lang_, save_csv=(lang_ == langs[0])), langs)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate similarity analysis visualizations.')
-    parser.add_argument('--lang', choices=['ja', 'en'], default='ja',
-                       help='Language for visualization (ja/en)')
+    parser.add_argument('--lang', type=parse_languages, default='ja',
+                        help='Language(s) for visualization (ja, en, ja,en or all)')
     args = parser.parse_args()
     main(args.lang)
@@ -1,59 +1,24 @@
 import pandas as pd
-import numpy as np
 import argparse
-from scipy.stats import skew, kurtosis
 from config import (
     OUTPUT_DIR, get_message
 )
+from group_statistics import compute_group_statistics
 
-def calculate_statistics(data):
-    """各メトリクスの統計量を計算"""
-    stats = {
-        'maximum': np.max(data),
-        'minimum': np.min(data),
-        'mean': np.mean(data),
-        'std_dev': np.std(data),
-        'median': np.median(data),
-        'skewness': skew(data),
-        'kurtosis': kurtosis(data)
-    }
-    return pd.Series(stats)
-
-def main():
-    # コマンドライン引数の設定
-    parser = argparse.ArgumentParser(description='ペルソナ理由統計の分析スクリプト')
-    parser.add_argument('--lang', choices=['ja', 'en'], default='ja',
-                       help='言語設定 (ja: 日本語, en: 英語)')
-    args = parser.parse_args()
-    
+def main(lang='ja'):
     # 理由次元の取得
     reason_dimensions_raw = get_message('common.reason_dimensions')
-    reason_dimensions = {k: v[args.lang] for k, v in reason_dimensions_raw.items()}
+    reason_dimensions = {k: v[lang] for k, v in reason_dimensions_raw.items()}
     
     # 入力データを読み込む
     input_path = f"{OUTPUT_DIR}/persona_reason_average.csv"
     df = pd.read_csv(input_path)
     
     # ペルソナと理由文のカラムを取得
-    personas = df['persona'].unique()
     metric_cols = list(reason_dimensions.keys())
     
     # ペルソナごとに統計量を計算
-    all_stats = []
-    for persona in personas:
-        persona_data = df[df['persona'] == persona]
-        stats_dict = {}
-        for col in metric_cols:
-            stats = calculate_statistics(persona_data[col])
-            stats_dict[col] = stats
-        
-        # ペルソナごとの統計情報をDataFrameに変換
-        stats_df = pd.DataFrame(stats_dict)
-        stats_df.index = [f"{persona}_{idx}" for idx in stats_df.index]
-        all_stats.append(stats_df)
-    
-    # 全ペルソナの統計情報を結合
-    combined_stats = pd.concat(all_stats)
+    combined_stats = compute_group_statistics(df, 'persona', metric_cols)
     
     # 読みやすさのために小数点以下3桁に丸める
     combined_stats = combined_stats.round(3)
@@ -69,8 +34,12 @@ def main():
     
     # 理由文の選択された言語での結果も表示
     stats_df_localized = combined_stats.rename(columns=reason_dimensions)
-    print(f"\n理由文の統計情報（{args.lang}）:")
+    print(f"\n理由文の統計情報（{lang}）:")
     print(stats_df_localized)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='ペルソナ理由統計の分析スクリプト')
+    parser.add_argument('--lang', choices=['ja', 'en'], default='ja',
+                       help='言語設定 (ja: 日本語, en: 英語)')
+    args = parser.parse_args()
+    main(args.lang)
@@ -1,21 +1,18 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
-import japanize_matplotlib
-import json
 import argparse
 import os
 from config import (
     OUTPUT_DIR, VISUALIZATION_CONFIG,
-    ensure_output_directories, save_figure, create_melted_data, setup_figure, add_header_text
+    ensure_output_directories, save_figure,
+    get_messages, lookup_id, parse_languages, run_languages
 )
+from figure_jobs import submit_figure, wait_for_figures
 
 
 def load_messages(lang):
     """言語に応じたメッセージと共通メッセージを読み込む"""
-    with open('src/messages.json', 'r', encoding='utf-8') as f:
-        messages = json.load(f)
-    return messages
+    return get_messages()
 
 def create_bar_plot(data, personas, lang='ja'):
     """棒グラフによる理由文長の比較を作成"""
@@ -48,9 +45,8 @@ def create_bar_plot(data, personas, lang='ja'):
     for i, (col, label) in enumerate(reason_dimensions.items()):
         values = []
         for persona_name in personas:
-            # persona_mapping逆引きのため、言語別の値を使用
-            persona_mapping = {v[lang]: k for k, v in messages_full['common']['persona_mapping'].items()}
-            persona_id = persona_mapping[persona_name]
+            # 表示名から persona の ID を逆引き
+            persona_id = lookup_id('common.persona_mapping', persona_name, lang)
             value = data[data['persona'] == persona_id][col].mean()
             values.append(value)
         
@@ -79,6 +75,7 @@ def create_bar_plot(data, personas, lang='ja'):
 
 def create_distribution_plot(data, personas, lang='ja'):
     """バイオリンプロットとスウォームプロットによる分布の可視化"""
+    import seaborn as sns
     messages_full = load_messages(lang)
     messages = messages_full['persona_reason'][lang]
     fig = plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
@@ -124,6 +121,12 @@ def create_distribution_plot(data, personas, lang='ja'):
 
 def main(lang='ja'):
     """メイン処理"""
+    langs = parse_languages(lang)
+    if len(langs) > 1:
+        # 複数の言語を指定した場合は、言語ごとの子プロセスで並行して描画する
+        return run_languages(main, langs)
+    lang = langs[0]
+
     # 出力ディレクトリを作成
     ensure_output_directories()
 
@@ -136,8 +139,9 @@ def main(lang='ja'):
     personas = list(persona_mapping.values())
 
     # 2つのグラフを生成
-    create_bar_plot(df, personas, lang)
-    create_distribution_plot(df, personas, lang)
+    submit_figure(create_bar_plot, df, personas, lang)
+    submit_figure(create_distribution_plot, df, personas, lang)
+    wait_for_figures()
 
     # ペルソナごとの平均値を表示
     print("\nペルソナごとの理由文長平均値:")
@@ -164,6 +168,7 @@ def main(lang='ja'):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate visualization for persona reason data.')
-    parser.add_argument('--lang', choices=['ja', 'en'], default='ja', help='Language for visualization (ja/en)')
+    parser.add_argument('--lang', type=parse_languages, default='ja',
+                        help='Language(s) for visualization (ja, en, ja,en or all)')
     args = parser.parse_args()
     main(args.lang)
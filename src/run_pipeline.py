@@ -0,0 +1,211 @@
+"""分析パイプライン全体を1つのプロセスで実行するランナー。
+
+make_result_ja.sh / make_result_en.sh と同じ順序で各スクリプトのエントリポイントを
+インポートして呼び出す。pandas・matplotlib などのインポートや messages.json の
+読み込みは1回だけで済み、ステージごとの実行時間と図ごとの描画・エンコード時間を
+最後にまとめて表示する。
+
+ステージの入力ファイル・コード・設定と出力ファイルをビルドマニフェスト（build_manifest.py）に
+記録し、前回の実行から何も変わっていないステージは実行しない（--force ですべて実行する）。
+"""
+
+import argparse
+import importlib
+import inspect
+import sys
+import time
+import traceback
+
+import matplotlib
+import matplotlib.pyplot as plt
+
+import figure_writer
+from build_manifest import (
+    BuildManifest, build_params, changed_outputs, code_version, input_hashes, snapshot_outputs
+)
+from config import DATA_PATHS, OUTPUT_DIR, parse_languages
+
+# パイプラインのステージ定義（実行順）
+# (モジュール名, エントリポイント関数名, --lang を渡すかどうか)
+PIPELINE_STAGES = [
+    ('missing_values_analysis', 'main', False),
+    ('missing_values_visualize', 'main', True),
+    # model/text/persona/temperature 別の *_emotion.csv / *_reason.csv を1回の走査でまとめて作成
+    # （各 *_analysis.py の集計結果と同じファイル）
+    ('aggregation', 'main', False),
+    ('model_emotion_statistics', 'main', False),
+    ('model_emotion_visualize', 'main', True),
+    ('model_emotion_similarity', 'main', True),
+    ('model_reason_statistics', 'main', False),
+    ('model_reason_visualize', 'main', True),
+    ('model_reason_similarity', 'main', True),
+    ('text_emotion_statistics', 'main', False),
+    ('text_emotion_visualize', 'main', True),
+    ('text_emotion_similarity', 'main', True),
+    ('text_reason_statistics', 'main', False),
+    ('text_reason_visualize', 'main', True),
+    ('text_reason_similarity', 'main', True),
+    ('persona_emotion_statistics', 'main', False),
+    ('persona_emotion_visualize', 'main', True),
+    ('persona_emotion_similarity', 'main', True),
+    ('persona_reason_statistics', 'main', False),
+    ('persona_reason_visualize', 'main', True),
+    ('persona_reason_similarity', 'main', True),
+    ('temperature_emotion_statistics', 'main', False),
+    ('temperature_emotion_visualize', 'main', True),
+    ('temperature_reason_visualize', 'main', True),
+]
+
+# 各ステージが読み込む入力ファイル（ビルドマニフェストで変更を検出する）
+STAGE_INPUTS = {
+    'missing_values_analysis': [DATA_PATHS['input']],
+    'missing_values_visualize': [DATA_PATHS['missing_by_model']],
+    'aggregation': [DATA_PATHS['input']],
+    'model_emotion_statistics': [f"{OUTPUT_DIR}/model_emotion.csv"],
+    'model_emotion_visualize': [f"{OUTPUT_DIR}/model_emotion.csv"],
+    'model_emotion_similarity': [f"{OUTPUT_DIR}/model_emotion.csv"],
+    'model_reason_statistics': [f"{OUTPUT_DIR}/model_reason.csv"],
+    'model_reason_visualize': [f"{OUTPUT_DIR}/model_reason.csv"],
+    'model_reason_similarity': [f"{OUTPUT_DIR}/model_reason.csv"],
+    'text_emotion_statistics': [f"{OUTPUT_DIR}/text_emotion_average.csv"],
+    'text_emotion_visualize': [f"{OUTPUT_DIR}/text_emotion.csv"],
+    'text_emotion_similarity': [f"{OUTPUT_DIR}/text_emotion.csv"],
+    'text_reason_statistics': [f"{OUTPUT_DIR}/text_reason_average.csv"],
+    'text_reason_visualize': [f"{OUTPUT_DIR}/text_reason.csv"],
+    'text_reason_similarity': [f"{OUTPUT_DIR}/text_reason.csv"],
+    'persona_emotion_statistics': [f"{OUTPUT_DIR}/persona_emotion.csv"],
+    'persona_emotion_visualize': [f"{OUTPUT_DIR}/persona_emotion.csv", DATA_PATHS['input']],
+    'persona_emotion_similarity': [f"{OUTPUT_DIR}/persona_emotion.csv"],
+    'persona_reason_statistics': [f"{OUTPUT_DIR}/persona_reason_average.csv"],
+    'persona_reason_visualize': [f"{OUTPUT_DIR}/persona_reason.csv"],
+    'persona_reason_similarity': [f"{OUTPUT_DIR}/persona_reason.csv"],
+    'temperature_emotion_statistics': [DATA_PATHS['input']],
+    'temperature_emotion_visualize': [f"{OUTPUT_DIR}/temperature_emotion.csv",
+                                      f"{OUTPUT_DIR}/temperature_emotion_statistics.csv"],
+    'temperature_reason_visualize': [DATA_PATHS['input']],
+}
+
+def stage_keys(module_name, langs):
+    """ステージの言語ごとのマニフェストのキー（言語を渡さないステージは langs=[None]）"""
+    code = code_version(module_name)
+    inputs = input_hashes(STAGE_INPUTS[module_name])
+    return [BuildManifest.make_key(code, inputs, build_params(lang)) for lang in langs]
+
+def run_stage(module_name, func_name, lang=None, chunksize=None):
+    """1つのステージを実行し、(インポート時間, 実行時間) を返す
+
+    chunksize を指定すると、入力データを分割して読み込めるステージ（エントリポイントが
+    chunksize 引数を持つもの）にそれを渡す。
+    """
+    # インポート時の japanize_matplotlib などによるフォント設定が後続ステージへ
+    # 漏れないよう、rcParams はステージごとに元に戻す
+    with matplotlib.rc_context():
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        import_time = time.perf_counter() - start
+
+        func = getattr(module, func_name)
+        kwargs = {}
+        if chunksize and 'chunksize' in inspect.signature(func).parameters:
+            kwargs['chunksize'] = chunksize
+        start = time.perf_counter()
+        if lang is None:
+            func(**kwargs)
+        else:
+            func(lang, **kwargs)
+        plt.close('all')
+        run_time = time.perf_counter() - start
+    return import_time, run_time
+
+def print_timings(timings):
+    """ステージごとの実行時間を表示"""
+    name_width = max(len(name) for name, _, _, _ in timings)
+    print("\nステージ別実行時間:")
+    print(f"  {'stage':<{name_width}}  {'import[s]':>9}  {'run[s]':>8}  status")
+    for name, import_time, run_time, status in timings:
+        print(f"  {name:<{name_width}}  {import_time:>9.2f}  {run_time:>8.2f}  {status}")
+    total = sum(import_time + run_time for _, import_time, run_time, _ in timings)
+    print(f"  {'total':<{name_width}}  {total:>20.2f}")
+
+def run_pipeline(lang='ja', stages=None, force=False, chunksize=None):
+    """パイプラインを実行する。失敗したステージがあっても残りのステージは続行する
+
+    lang に複数の言語（'ja,en' や 'all'）を指定すると、各ステージの計算は1回だけ行い、
+    言語ごとの描画を並行して行う。
+    入力・コード・設定が前回の実行と同じで出力ファイルも変わっていないステージは実行しない
+    （force=True の場合はすべて実行する）。いずれかの言語が最新でなければ、指定したすべての言語で実行する。
+    chunksize を指定すると、入力データを読み込む集計・統計のステージは chunksize 行ずつ読み込む。
+    """
+    langs = parse_languages(lang)
+    if langs == ['ja']:
+        # 日本語のグラフだけを生成する場合は日本語フォントを有効にする
+        # （複数の言語の場合は run_languages が日本語の描画でのみ有効にする）
+        import japanize_matplotlib
+
+    manifest = BuildManifest()
+    timings = []
+    failed = []
+    for module_name, func_name, takes_lang in PIPELINE_STAGES:
+        if stages and module_name not in stages:
+            continue
+        print(f"\n=== {module_name} ===")
+        stage_langs = langs if takes_lang else [None]
+        start = time.perf_counter()
+        keys = stage_keys(module_name, stage_langs)
+        reasons = [manifest.stale_reason(module_name, stage_lang, key)
+                   for stage_lang, key in zip(stage_langs, keys)]
+        if not force and not any(reasons):
+            print("入力・コード・設定に変更がないため、実行をスキップします")
+            timings.append((module_name, 0.0, time.perf_counter() - start, 'skipped'))
+            continue
+        if not force:
+            print(f"実行理由: {next(reason for reason in reasons if reason)}")
+
+        before = snapshot_outputs()
+        try:
+            import_time, run_time = run_stage(module_name, func_name, langs if takes_lang else None, chunksize)
+            # ワーカープロセスでの書き出しを待ってから出力ファイルを記録する
+            if figure_writer.wait_for_figure_writes():
+                raise RuntimeError(f"{module_name} の図の書き出しに失敗しました")
+            manifest.record(module_name, stage_langs, keys, changed_outputs(before, snapshot_outputs()))
+            timings.append((module_name, import_time, run_time, 'ok'))
+        except Exception:
+            traceback.print_exc()
+            plt.close('all')
+            manifest.forget(module_name, stage_langs)
+            timings.append((module_name, 0.0, time.perf_counter() - start, 'failed'))
+            failed.append(module_name)
+        manifest.save()
+
+    # ワーカープロセスでの図の書き出しを待ってから、図ごとの書き出し時間を表示
+    if figure_writer.wait_for_figure_writes():
+        failed.append('figure_writer')
+    print_timings(timings)
+    figure_writer.print_figure_timings()
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the whole analysis pipeline in a single process.')
+    parser.add_argument('--lang', type=parse_languages, default='ja',
+                        help='Language(s) for visualization (ja, en, ja,en or all)')
+    parser.add_argument('--stages', nargs='+', metavar='STAGE',
+                        help='Run only the given stages (module names, e.g. model_emotion_visualize)')
+    parser.add_argument('--force', action='store_true',
+                        help='Run every stage even if its inputs, code and settings are unchanged')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='Read the input data in chunks of this many rows in the analysis and statistics stages')
+    args = parser.parse_args()
+
+    if args.stages:
+        known = {name for name, _, _ in PIPELINE_STAGES}
+        unknown = [name for name in args.stages if name not in known]
+        if unknown:
+            parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    failed = run_pipeline(args.lang, args.stages, args.force, args.chunksize)
+    if failed:
+        print(f"\n失敗したステージ: {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
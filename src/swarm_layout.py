@@ -0,0 +1,93 @@
+"""スウォームプロット（beeswarm）の点の配置と描画。
+
+seaborn の swarmplot は点を1つずつ置いて既存の点との重なりを調べるため、カテゴリごとに点の数の
+2乗程度の時間がかかり、置ききれない点は捨てて警告を出す。ここでは点の配置を配列でまとめて計算する。
+
+1. 値を点の直径の高さの行に分け、行の中で値の順に 0, +1, -1, +2, -2, ... 番目の位置に並べる。
+2. 行の幅が width を超える場合は、その行の点の間隔を縮めて width に収める（点は捨てない）。
+
+カテゴリの点の数が VISUALIZATION_CONFIG['swarm']['max_points'] を超える場合は、値を
+density_bins 個の区間に分け、1つの点が複数件を表すドット密度の表示に切り替える。
+"""
+
+import numpy as np
+from config import VISUALIZATION_CONFIG, get_text
+
+def _row_offsets(rows, values, spacing, max_offset):
+    """行番号ごとに、行の中で値の順に中央から左右交互に並べたときの横方向のずれ"""
+    offsets = np.zeros(len(values))
+    if len(values) == 0:
+        return offsets
+    order = np.lexsort((values, rows))
+    sorted_rows = rows[order]
+    starts = np.flatnonzero(np.r_[True, sorted_rows[1:] != sorted_rows[:-1]])
+    sizes = np.diff(np.r_[starts, len(values)])
+    # 行の中での順位 0, 1, 2, 3, 4, ... を位置 0, +1, -1, +2, -2, ... に変換
+    rank = np.arange(len(values)) - np.repeat(starts, sizes)
+    slots = (rank + 1) // 2 * np.where(rank % 2 == 1, 1, -1)
+    # 最も外側の点（位置 ±(行の点の数 // 2)）が max_offset を超える行は間隔を縮める
+    row_spacing = np.minimum(spacing, max_offset / np.maximum(sizes // 2, 1))
+    offsets[order] = slots * np.repeat(row_spacing, sizes)
+    return offsets
+
+def beeswarm_offsets(values, row_height, spacing, max_offset):
+    """各値の横方向のずれ（values と同じ順）。
+
+    row_height は点の直径（値の単位）、spacing は点の横方向の間隔（カテゴリ軸の単位）、
+    max_offset はカテゴリの中心からのずれの上限。
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return np.zeros(0)
+    rows = np.floor((values - values.min()) / row_height).astype(np.int64)
+    return _row_offsets(rows, values, spacing, max_offset)
+
+def dot_density(values, bins, weight):
+    """値を bins 個の等幅の区間に分け、1つの点が weight 件を表す点の (値, 行番号) を返す。
+
+    点は区間の中央の値に置き、区間の件数 / weight（端数は切り上げ）個並べる。
+    """
+    counts, edges = np.histogram(values, bins=bins)
+    dots = -(-counts // weight)
+    rows = np.repeat(np.arange(len(counts)), dots)
+    return ((edges[:-1] + edges[1:]) / 2)[rows], rows
+
+def swarm_plot(ax, data, x, y, order, palette, lang='ja', size=3, alpha=0.4, width=0.8, max_points=None):
+    """ax のカテゴリ位置 0, 1, ...（seaborn のカテゴリ軸と同じ）に、order の順に data[y] の点を描画する。
+
+    palette は order と同じ順の色のリスト、またはカテゴリ -> 色 の辞書。size は点の直径（ポイント）。
+    点の数が max_points（省略時は VISUALIZATION_CONFIG['swarm']['max_points']）を超えるカテゴリは
+    ドット密度で描画し、1つの点が表す件数を軸の右下に表示する。
+    戻り値はカテゴリ -> 1つの点が表す件数（スウォームで描画したカテゴリは1）の辞書。
+    """
+    swarm_config = VISUALIZATION_CONFIG['swarm']
+    max_points = max_points or swarm_config['max_points']
+    colors = [palette[category] for category in order] if isinstance(palette, dict) else list(palette)
+
+    # 点の直径（ポイント）を、現在の軸の範囲での x・y の値の単位に換算する
+    bbox = ax.get_window_extent()
+    diameter = size * ax.figure.dpi / 72
+    (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+    spacing = diameter * abs(x1 - x0) / bbox.width
+    row_height = diameter * abs(y1 - y0) / bbox.height
+
+    categories = data[x].to_numpy()
+    values = data[y].to_numpy(dtype=np.float64)
+    weights = {}
+    for position, (category, color) in enumerate(zip(order, colors)):
+        category_values = values[(categories == category) & ~np.isnan(values)]
+        weight = -(-len(category_values) // max_points) if len(category_values) > max_points else 1
+        if weight > 1:
+            points, rows = dot_density(category_values, swarm_config['density_bins'], weight)
+            offsets = _row_offsets(rows, points, spacing, width / 2)
+        else:
+            points = category_values
+            offsets = beeswarm_offsets(points, row_height, spacing, width / 2)
+        ax.scatter(position + offsets, points, s=size ** 2, color=color, alpha=alpha, linewidths=0)
+        weights[category] = weight
+
+    largest = max(weights.values(), default=1)
+    if largest > 1:
+        ax.text(0.99, 0.01, get_text('common', 'dot_density_note', lang).format(count=largest),
+                transform=ax.transAxes, ha='right', va='bottom', fontsize=10)
+    return weights
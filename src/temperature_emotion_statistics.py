@@ -1,41 +1,40 @@
-import pandas as pd
 import os
 import argparse
-from config import OUTPUT_DIR, EMOTION_DIMENSIONS, ensure_output_directories
-
-def main():
-    parser = argparse.ArgumentParser(description='Temperature emotion statistics analysis')
-    parser.add_argument('--lang', choices=['ja', 'en'], default='ja', help='Language for output (ja or en)')
-    args = parser.parse_args()
-
+from config import (
+    OUTPUT_DIR, EMOTION_DIMENSIONS, ensure_output_directories, ANALYSIS_COLUMNS, iter_input_chunks, load_input_data
+)
+from group_statistics import CELL_STATISTIC_NAMES, GridAccumulator, compute_grid_statistics
+
+# このスクリプトが使用する入力列（理由文は読み込まない）
+INPUT_COLUMNS = ANALYSIS_COLUMNS['keys'] + ANALYSIS_COLUMNS['values']
+
+def stream_grid_statistics(chunksize):
+    """入力データを chunksize 行ずつ読み込み、model × temperature ごとの統計量を計算する"""
+    accumulator = GridAccumulator(['model', 'temperature'], list(EMOTION_DIMENSIONS.keys()))
+    for chunk in iter_input_chunks(columns=INPUT_COLUMNS, chunksize=chunksize):
+        accumulator.add(chunk)
+    return accumulator.result()
+
+def main(lang='ja', chunksize=None):
     # 感情次元の定義を取得
-    emotion_dimensions = {k: v[args.lang] for k, v in EMOTION_DIMENSIONS.items()}
+    emotion_dimensions = {k: v[lang] for k, v in EMOTION_DIMENSIONS.items()}
 
     # 出力ディレクトリを作成
     ensure_output_directories()
 
-    # CSVファイルを読み込む
-    df = pd.read_csv("data_all.csv")
-
     # temperature設定による感情次元の統計的指標を計算
-    stats_data = []
-    for model in df['model'].unique():
-        for temp in df['temperature'].unique():
-            subset = df[(df['model'] == model) & (df['temperature'] == temp)]
-            if not subset.empty:
-                record = {'model': model, 'temperature': temp}
-                for col in EMOTION_DIMENSIONS.keys():
-                    record[f"{col}_mean"] = subset[col].mean()
-                    record[f"{col}_std"] = subset[col].std()
-                    record[f"{col}_median"] = subset[col].median()
-                    record[f"{col}_max"] = subset[col].max()
-                    record[f"{col}_min"] = subset[col].min()
-                    record[f"{col}_skew"] = subset[col].skew()
-                    record[f"{col}_kurtosis"] = subset[col].kurtosis()
-                stats_data.append(record)
-
-    # データフレームに変換して保存
-    stats_df = pd.DataFrame(stats_data)
+    # （model × temperature の組み合わせごとに1回の走査でまとめて集計し、存在しない組み合わせは含めない）
+    if chunksize:
+        # 入力データを分割して読み込み、セルごとの累積量に順に加える
+        stats_df = stream_grid_statistics(chunksize)
+    else:
+        df, error = load_input_data(columns=INPUT_COLUMNS)
+        if error:
+            print(error)
+            return
+        stats_df = compute_grid_statistics(df, ['model', 'temperature'], list(EMOTION_DIMENSIONS.keys()))
+
+    # 保存
     output_path = os.path.join(OUTPUT_DIR, "temperature_emotion_statistics.csv")
     stats_df.to_csv(output_path, index=False)
     
@@ -46,18 +45,19 @@ def main():
     print(stats_df)
 
     # 感情次元の選択された言語での結果も表示
-    display_columns = ['model', 'temperature']
-    for col_key in EMOTION_DIMENSIONS.keys():
-        display_columns.extend([f"{col_key}_mean", f"{col_key}_std", f"{col_key}_median", f"{col_key}_max", f"{col_key}_min", f"{col_key}_skew", f"{col_key}_kurtosis"])
-    
     localized_columns = ['model', 'temperature']
     for col_key, localized_name in emotion_dimensions.items():
-        localized_columns.extend([f"{localized_name}_mean", f"{localized_name}_std", f"{localized_name}_median", f"{localized_name}_max", f"{localized_name}_min", f"{localized_name}_skew", f"{localized_name}_kurtosis"])
+        localized_columns.extend([f"{localized_name}_{name}" for name in CELL_STATISTIC_NAMES])
     
     stats_df_localized = stats_df.copy()
     stats_df_localized.columns = localized_columns
-    print(f"\n感情次元の統計情報（{args.lang}）:")
+    print(f"\n感情次元の統計情報（{lang}）:")
     print(stats_df_localized)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Temperature emotion statistics analysis')
+    parser.add_argument('--lang', choices=['ja', 'en'], default='ja', help='Language for output (ja or en)')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='Read the input data in chunks of this many rows (bounded memory)')
+    args = parser.parse_args()
+    main(args.lang, args.chunksize)
@@ -1,20 +1,16 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-import japanize_matplotlib
-import seaborn as sns
 import os
-import json
 import argparse
 from config import (
     OUTPUT_DIR, VISUALIZATION_CONFIG,
-    ensure_output_directories, save_figure
+    ensure_output_directories, save_figure, get_messages, parse_languages, run_languages
 )
+from figure_jobs import submit_figure, wait_for_figures
 
 def load_messages(lang='ja'):
     """メッセージファイルを読み込む"""
-    with open('src/messages.json', 'r', encoding='utf-8') as f:
-        messages = json.load(f)
-    return messages
+    return get_messages()
 
 def create_overall_plot(emotion_df, emotions, messages_lang, lang='ja'):
     """感情次元のデータをtemperatureごとに視覚化（全体平均）"""
@@ -35,26 +31,53 @@ def create_overall_plot(emotion_df, emotions, messages_lang, lang='ja'):
     save_figure(plt, "temperature_emotion_overall", lang=lang)
     plt.close()
 
+def create_model_plot(model_df, col, label, messages, lang='ja'):
+    """1つの感情次元について、モデルごとの変化をtemperatureで視覚化"""
+    plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
+    for model in model_df['model'].unique():
+        model_data = model_df[model_df['model'] == model]
+        if not model_data.empty:
+            plt.plot(model_data['temperature'], model_data[col], marker='o', label=model)
+    plt.xlabel(messages['xlabel'], fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
+    plt.ylabel(messages['ylabel'], fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
+    plt.title(messages['model_plot_title'].format(emotion=label), fontsize=VISUALIZATION_CONFIG['figure']['title_fontsize'])
+    plt.tick_params(axis='x', labelsize=VISUALIZATION_CONFIG['figure']['tick_labelsize'])
+    plt.tick_params(axis='y', labelsize=VISUALIZATION_CONFIG['figure']['tick_labelsize'])
+    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left', borderaxespad=0.,
+               fontsize=VISUALIZATION_CONFIG['figure']['legend_fontsize'])
+    plt.grid(True, alpha=VISUALIZATION_CONFIG['plot']['grid_alpha'])
+    plt.tight_layout()
+    save_figure(plt, f"temperature_emotion_{col}_all", lang=lang)
+    plt.close()
+
 def create_model_plots(emotion_df, emotions, messages_lang, lang='ja'):
-    """モデルごとの感情次元の変化をtemperatureで視覚化（全感情次元）"""
+    """モデルごとの感情次元の変化をtemperatureで視覚化（全感情次元、感情次元ごとに別のジョブとして描画）"""
     messages = messages_lang[lang]
     for col, label in emotions.items():
-        plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
-        for model in emotion_df['model'].unique():
-            model_data = emotion_df[emotion_df['model'] == model]
-            if not model_data.empty:
-                plt.plot(model_data['temperature'], model_data[col], marker='o', label=model)
-        plt.xlabel(messages['xlabel'], fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
-        plt.ylabel(messages['ylabel'], fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
-        plt.title(messages['model_plot_title'].format(emotion=label), fontsize=VISUALIZATION_CONFIG['figure']['title_fontsize'])
-        plt.tick_params(axis='x', labelsize=VISUALIZATION_CONFIG['figure']['tick_labelsize'])
-        plt.tick_params(axis='y', labelsize=VISUALIZATION_CONFIG['figure']['tick_labelsize'])
-        plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left', borderaxespad=0.,
-                   fontsize=VISUALIZATION_CONFIG['figure']['legend_fontsize'])
-        plt.grid(True, alpha=VISUALIZATION_CONFIG['plot']['grid_alpha'])
-        plt.tight_layout()
-        save_figure(plt, f"temperature_emotion_{col}_all", lang=lang)
-        plt.close()
+        submit_figure(create_model_plot, emotion_df[['model', 'temperature', col]], col, label, messages, lang)
+
+def create_selected_model_plot(selected_df, selected_models, col, label, messages, lang='ja'):
+    """1つの感情次元について、選択したモデルの平均と標準偏差をエラーバー付きで視覚化"""
+    plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
+    jitter = 0.02  # X軸のジッター量
+    for i, model in enumerate(selected_models):
+        model_data = selected_df[selected_df['model'] == model].sort_values('temperature')
+        if not model_data.empty:
+            # X軸にジッターを適用
+            jittered_temp = model_data['temperature'] + (i - 2.5) * jitter
+            plt.errorbar(jittered_temp, model_data[f"{col}_mean"], 
+                       yerr=model_data[f"{col}_std"], marker='o', label=model, capsize=5)
+    plt.xlabel(messages['xlabel'], fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
+    plt.ylabel(messages['std_ylabel'].format(emotion=label), fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
+    plt.title(messages['selected_plot_title'].format(emotion=label), fontsize=VISUALIZATION_CONFIG['figure']['title_fontsize'])
+    plt.tick_params(axis='x', labelsize=VISUALIZATION_CONFIG['figure']['tick_labelsize'])
+    plt.tick_params(axis='y', labelsize=VISUALIZATION_CONFIG['figure']['tick_labelsize'])
+    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left', borderaxespad=0.,
+               fontsize=VISUALIZATION_CONFIG['figure']['legend_fontsize'])
+    plt.grid(True, alpha=VISUALIZATION_CONFIG['plot']['grid_alpha'])
+    plt.tight_layout()
+    save_figure(plt, f"temperature_emotion_{col}_std_selected", lang=lang)
+    plt.close()
 
 def create_selected_model_plots(emotion_df, stats_df, emotions, messages_lang, lang='ja'):
     """統計データを用いた可視化（エラーバー付きプロット、上位3モデルと下位3モデルに絞る）"""
@@ -63,30 +86,19 @@ def create_selected_model_plots(emotion_df, stats_df, emotions, messages_lang, l
         # モデルごとの平均値を計算し、上位3モデルと下位3モデルを選択
         model_means = stats_df.groupby('model')[f"{col}_mean"].mean().sort_values()
         selected_models = list(model_means.head(3).index) + list(model_means.tail(3).index)
-        
-        plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
-        jitter = 0.02  # X軸のジッター量
-        for i, model in enumerate(selected_models):
-            model_data = stats_df[stats_df['model'] == model].sort_values('temperature')
-            if not model_data.empty:
-                # X軸にジッターを適用
-                jittered_temp = model_data['temperature'] + (i - 2.5) * jitter
-                plt.errorbar(jittered_temp, model_data[f"{col}_mean"], 
-                           yerr=model_data[f"{col}_std"], marker='o', label=model, capsize=5)
-        plt.xlabel(messages['xlabel'], fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
-        plt.ylabel(messages['std_ylabel'].format(emotion=label), fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
-        plt.title(messages['selected_plot_title'].format(emotion=label), fontsize=VISUALIZATION_CONFIG['figure']['title_fontsize'])
-        plt.tick_params(axis='x', labelsize=VISUALIZATION_CONFIG['figure']['tick_labelsize'])
-        plt.tick_params(axis='y', labelsize=VISUALIZATION_CONFIG['figure']['tick_labelsize'])
-        plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left', borderaxespad=0.,
-                   fontsize=VISUALIZATION_CONFIG['figure']['legend_fontsize'])
-        plt.grid(True, alpha=VISUALIZATION_CONFIG['plot']['grid_alpha'])
-        plt.tight_layout()
-        save_figure(plt, f"temperature_emotion_{col}_std_selected", lang=lang)
-        plt.close()
+        # 選択したモデルの行と必要な列だけを渡して、感情次元ごとに別のジョブとして描画する
+        selected_df = stats_df.loc[stats_df['model'].isin(selected_models),
+                                   ['model', 'temperature', f"{col}_mean", f"{col}_std"]]
+        submit_figure(create_selected_model_plot, selected_df, selected_models, col, label, messages, lang)
 
 def main(lang='ja'):
     """メイン処理"""
+    langs = parse_languages(lang)
+    if len(langs) > 1:
+        # 複数の言語を指定した場合は、言語ごとの子プロセスで並行して描画する
+        return run_languages(main, langs)
+    lang = langs[0]
+
     # 出力ディレクトリを作成
     ensure_output_directories()
 
@@ -128,15 +140,17 @@ def main(lang='ja'):
         }
 
     # 各種グラフを生成
-    create_overall_plot(emotion_df, emotions, messages_lang, lang)
+    submit_figure(create_overall_plot, emotion_df, emotions, messages_lang, lang)
     create_model_plots(emotion_df, emotions, messages_lang, lang)
     create_selected_model_plots(emotion_df, stats_df, emotions, messages_lang, lang)
+    wait_for_figures()
 
     lang_dir = 'ja' if lang == 'ja' else 'en'
     print(f"\nTemperatureによる感情値の可視化が完了しました。グラフは {os.path.join(OUTPUT_DIR, 'figures', lang_dir)} に保存されています。")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate visualization for temperature emotion data.')
-    parser.add_argument('--lang', choices=['ja', 'en'], default='ja', help='Language for visualization (ja/en)')
+    parser.add_argument('--lang', type=parse_languages, default='ja',
+                        help='Language(s) for visualization (ja, en, ja,en or all)')
     args = parser.parse_args()
     main(args.lang)
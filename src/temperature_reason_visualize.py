@@ -1,23 +1,24 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-import japanize_matplotlib
-import seaborn as sns
 import os
-import json
 import argparse
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from config import (
-    OUTPUT_DIR, VENDOR_PATTERNS, VENDOR_COLORS,
-    VISUALIZATION_CONFIG, ensure_output_directories, save_figure
+    OUTPUT_DIR,
+    VISUALIZATION_CONFIG, ensure_output_directories, ANALYSIS_COLUMNS, load_input_data, save_figure,
+    get_message, parse_languages, run_languages
 )
+from figure_jobs import submit_figure, wait_for_figures
+from model_registry import get_model_registry
+from text_diversity import count_terms, similarity_statistics
+from text_tokenizers import TOKENIZERS, combine_reason_tokens, load_reason_tokens
+
+# このスクリプトが使用する入力列（理由文はトークン化結果のキャッシュから読み込む）
+INPUT_COLUMNS = ANALYSIS_COLUMNS['keys']
 
 def load_messages(lang):
     """言語に応じたメッセージを読み込む"""
-    with open('src/messages.json', 'r', encoding='utf-8') as f:
-        messages = json.load(f)
-    return messages['temperature_reason'][lang]
+    return get_message(f'temperature_reason.{lang}')
 
 def create_similarity_plot(diversity_df, lang='ja'):
     """平均類似度の変化をプロット（選抜モデル）"""
@@ -28,24 +29,20 @@ def create_similarity_plot(diversity_df, lang='ja'):
     high_diversity_models = model_diversity_means.head(3).index.tolist()
     low_diversity_models = model_diversity_means.tail(3).index.tolist()
     selected_models = high_diversity_models + low_diversity_models
+    # 開発元の色
+    colors = get_model_registry().color_of(selected_models)
 
     plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
-    for model in selected_models:
+    for model, color in zip(selected_models, colors):
         model_data = diversity_df[diversity_df['model'] == model].sort_values('temperature')
         if not model_data.empty:
-            # 開発元を判定して色を適用
-            vendor = None
-            for v, patterns in VENDOR_PATTERNS.items():
-                if any(p in model for p in patterns):
-                    vendor = v
-                    break
-            color = VENDOR_COLORS.get(vendor, 'gray') if vendor else 'gray'
-            label = f"{model} ({'高多様性' if model in high_diversity_models else '低多様性'})"
+            diversity_label = messages['high_diversity_label' if model in high_diversity_models else 'low_diversity_label']
+            label = f"{model} ({diversity_label})"
             plt.plot(model_data['temperature'], model_data['mean_similarity'], marker='o', label=label, color=color)
 
     # 全体平均を計算してプロット
     overall_mean_similarity = diversity_df.groupby('temperature')['mean_similarity'].mean().sort_index()
-    plt.plot(overall_mean_similarity.index, overall_mean_similarity.values, marker='s', linestyle='--', color='black', label='全体平均')
+    plt.plot(overall_mean_similarity.index, overall_mean_similarity.values, marker='s', linestyle='--', color='black', label=messages['overall_mean_label'])
 
     plt.xlabel(messages['xlabel'], fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
     plt.ylabel(messages['ylabel_similarity'], fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
@@ -68,24 +65,20 @@ def create_diversity_plot(diversity_df, lang='ja'):
     high_diversity_models = model_diversity_means.head(3).index.tolist()
     low_diversity_models = model_diversity_means.tail(3).index.tolist()
     selected_models = high_diversity_models + low_diversity_models
+    # 開発元の色
+    colors = get_model_registry().color_of(selected_models)
 
     plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
-    for model in selected_models:
+    for model, color in zip(selected_models, colors):
         model_data = diversity_df[diversity_df['model'] == model].sort_values('temperature')
         if not model_data.empty:
-            # 開発元を判定して色を適用
-            vendor = None
-            for v, patterns in VENDOR_PATTERNS.items():
-                if any(p in model for p in patterns):
-                    vendor = v
-                    break
-            color = VENDOR_COLORS.get(vendor, 'gray') if vendor else 'gray'
-            label = f"{model} ({'高多様性' if model in high_diversity_models else '低多様性'})"
+            diversity_label = messages['high_diversity_label' if model in high_diversity_models else 'low_diversity_label']
+            label = f"{model} ({diversity_label})"
             plt.plot(model_data['temperature'], model_data['diversity_score'], marker='o', label=label, color=color)
 
     # 全体平均を計算してプロット
     overall_mean_diversity = diversity_df.groupby('temperature')['diversity_score'].mean().sort_index()
-    plt.plot(overall_mean_diversity.index, overall_mean_diversity.values, marker='s', linestyle='--', color='black', label='全体平均')
+    plt.plot(overall_mean_diversity.index, overall_mean_diversity.values, marker='s', linestyle='--', color='black', label=messages['overall_mean_label'])
 
     plt.xlabel(messages['xlabel'], fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
     plt.ylabel(messages['ylabel_diversity'], fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
@@ -99,28 +92,19 @@ def create_diversity_plot(diversity_df, lang='ja'):
     save_figure(plt, "temperature_reason_diversity_selected", lang=lang)
     plt.close()
 
-def create_correlation_plots(correlation_df, lang='ja'):
-    """相関係数の棒グラフを作成"""
+def create_correlation_plot(correlation_df, column, ylabel_key, title_key, filename, lang='ja'):
+    """1つの指標について、temperatureとの相関係数の棒グラフを作成（相関係数の降順）"""
     messages = load_messages(lang)
 
-    # 平均類似度の相関係数プロット
-    sorted_df_similarity = correlation_df.sort_values(by='corr_similarity', ascending=False)
+    sorted_df = correlation_df.sort_values(by=column, ascending=False)
     plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
-    bars = []
-    for model in sorted_df_similarity['model']:
-        # 開発元を判定して色を適用
-        vendor = None
-        for v, patterns in VENDOR_PATTERNS.items():
-            if any(p in model for p in patterns):
-                vendor = v
-                break
-        color = VENDOR_COLORS.get(vendor, 'gray') if vendor else 'gray'
-        bar = plt.bar(model, sorted_df_similarity[sorted_df_similarity['model'] == model]['corr_similarity'], color=color)
-        bars.extend(bar)
+    # 各棒を開発元の色で塗る
+    bars = plt.bar(sorted_df['model'], sorted_df[column],
+                   color=get_model_registry().color_of(sorted_df['model']))
 
     plt.xlabel(messages['correlation_xlabel'], fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
-    plt.ylabel(messages['correlation_similarity_ylabel'], fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
-    plt.title(messages['correlation_similarity_title'], fontsize=VISUALIZATION_CONFIG['figure']['title_fontsize'])
+    plt.ylabel(messages[ylabel_key], fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
+    plt.title(messages[title_key], fontsize=VISUALIZATION_CONFIG['figure']['title_fontsize'])
     plt.xticks(rotation=90, fontsize=VISUALIZATION_CONFIG['figure']['tick_labelsize'])
     plt.yticks(fontsize=VISUALIZATION_CONFIG['figure']['tick_labelsize'])
     plt.grid(True, axis='y', alpha=VISUALIZATION_CONFIG['plot']['grid_alpha'])
@@ -132,85 +116,63 @@ def create_correlation_plots(correlation_df, lang='ja'):
         plt.text(bar.get_x() + bar.get_width()/2, yval, f'{yval:.2f}', ha='center', va='bottom' if yval >= 0 else 'top',
                 fontsize=VISUALIZATION_CONFIG['figure']['tick_labelsize'])
     
-    save_figure(plt, "temperature_reason_correlation_similarity_sorted", lang=lang)
+    save_figure(plt, filename, lang=lang)
     plt.close()
 
-    # 多様性スコアの相関係数プロット
-    sorted_df_diversity = correlation_df.sort_values(by='corr_diversity', ascending=False)
-    plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
-    bars = []
-    for model in sorted_df_diversity['model']:
-        # 開発元を判定して色を適用
-        vendor = None
-        for v, patterns in VENDOR_PATTERNS.items():
-            if any(p in model for p in patterns):
-                vendor = v
-                break
-        color = VENDOR_COLORS.get(vendor, 'gray') if vendor else 'gray'
-        bar = plt.bar(model, sorted_df_diversity[sorted_df_diversity['model'] == model]['corr_diversity'], color=color)
-        bars.extend(bar)
-
-    plt.xlabel(messages['correlation_xlabel'], fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
-    plt.ylabel(messages['correlation_diversity_ylabel'], fontsize=VISUALIZATION_CONFIG['figure']['label_fontsize'])
-    plt.title(messages['correlation_diversity_title'], fontsize=VISUALIZATION_CONFIG['figure']['title_fontsize'])
-    plt.xticks(rotation=90, fontsize=VISUALIZATION_CONFIG['figure']['tick_labelsize'])
-    plt.yticks(fontsize=VISUALIZATION_CONFIG['figure']['tick_labelsize'])
-    plt.grid(True, axis='y', alpha=VISUALIZATION_CONFIG['plot']['grid_alpha'])
-    plt.tight_layout()
-    
-    # 各棒の上に値を表示
-    for bar in bars:
-        yval = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2, yval, f'{yval:.2f}', ha='center', va='bottom' if yval >= 0 else 'top',
-                fontsize=VISUALIZATION_CONFIG['figure']['tick_labelsize'])
-    
-    save_figure(plt, "temperature_reason_correlation_diversity_sorted", lang=lang)
-    plt.close()
-
-def main(lang='ja'):
-    """メイン処理"""
+def create_correlation_plots(correlation_df, lang='ja'):
+    """相関係数の棒グラフ（平均類似度・多様性スコア）を、それぞれ別のジョブとして作成"""
+    submit_figure(create_correlation_plot, correlation_df, 'corr_similarity',
+                  'correlation_similarity_ylabel', 'correlation_similarity_title',
+                  "temperature_reason_correlation_similarity_sorted", lang)
+    submit_figure(create_correlation_plot, correlation_df, 'corr_diversity',
+                  'correlation_diversity_ylabel', 'correlation_diversity_title',
+                  "temperature_reason_correlation_diversity_sorted", lang)
+
+def prepare(tokenizer=None):
+    """言語に依存しない処理（テキストの類似度・多様性と相関係数の計算、CSVの保存）を行う。
+
+    戻り値は (diversity_df, correlation_df)。データを読み込めなかった場合は None。
+    """
     # 出力ディレクトリを作成
     ensure_output_directories()
 
     # データの読み込み
-    df = pd.read_csv("data_all.csv")
+    df, error = load_input_data(columns=INPUT_COLUMNS)
+    if error:
+        print(error)
+        return None
 
-    # テキストデータの列名を特定
-    reason_columns = ['Q1reason', 'Q2reason', 'Q3reason', 'Q4reason']
+    # トークン化済みの理由文を読み込む（初回のみトークン化し、結果はキャッシュされる）
+    tokens, error = load_reason_tokens(tokenizer)
+    if error:
+        print(error)
+        return None
 
     # 各感情の理由を結合して1つのテキストデータとして扱う
-    df['combined_reason'] = df[reason_columns].astype(str).agg(' '.join, axis=1)
-    text_column = 'combined_reason'
+    documents = combine_reason_tokens(tokens)
 
-    # テキスト多様性データを格納するリスト
-    diversity_data = []
+    # モデルとtemperatureの組み合わせを整数コードにする（それぞれ出現順、temperatureの欠損は除外）
+    model_codes, models = pd.factorize(df['model'])
+    temp_codes, temps = pd.factorize(df['temperature'])
+    cell_codes = np.where((model_codes >= 0) & (temp_codes >= 0), model_codes * len(temps) + temp_codes, -1)
 
     # モデルとtemperatureごとにテキストの類似度を計算
-    vectorizer = TfidfVectorizer()
-    for model in df['model'].unique():
-        for temp in df['temperature'].unique():
-            subset = df[(df['model'] == model) & (df['temperature'] == temp)]
-            if len(subset) >= 2:  # 類似度計算には少なくとも2つのテキストが必要
-                texts = subset[text_column].astype(str).tolist()
-                if len(texts) >= 2 and any(len(text.strip()) > 0 for text in texts):
-                    # TF-IDFベクトル化
-                    tfidf_matrix = vectorizer.fit_transform(texts)
-                    # コサイン類似度を計算
-                    similarity_matrix = cosine_similarity(tfidf_matrix)
-                    # 対角成分（自己類似度）を除外し、平均類似度を計算
-                    np.fill_diagonal(similarity_matrix, 0)
-                    mean_similarity = np.mean(similarity_matrix)
-                    std_similarity = np.std(similarity_matrix)
-                    diversity_data.append({
-                        'model': model,
-                        'temperature': temp,
-                        'mean_similarity': mean_similarity,
-                        'std_similarity': std_similarity,
-                        'diversity_score': 1 - mean_similarity  # 多様性スコア（類似度の逆）
-                    })
-
-    # データフレームに変換
-    diversity_df = pd.DataFrame(diversity_data)
+    similarity = similarity_statistics(count_terms(documents), cell_codes)
+
+    # 類似度計算には少なくとも2つのテキストが必要
+    has_text = np.bincount(cell_codes[cell_codes >= 0],
+                           weights=np.array([len(document) > 0 for document in documents])[cell_codes >= 0],
+                           minlength=len(models) * len(temps))
+    similarity = similarity[(similarity['n'] >= 2) & (has_text[similarity.index] > 0)]
+
+    # model は入力データのキャッシュではカテゴリ型なので、出現しないモデルが groupby に残らないよう文字列に戻す
+    diversity_df = pd.DataFrame({
+        'model': models.take(similarity.index // len(temps)).astype(object),
+        'temperature': temps.take(similarity.index % len(temps)),
+        'mean_similarity': similarity['mean_similarity'].to_numpy(),
+        'std_similarity': similarity['std_similarity'].to_numpy(),
+        'diversity_score': 1 - similarity['mean_similarity'].to_numpy()  # 多様性スコア（類似度の逆）
+    })
 
     # CSVとして保存
     diversity_df.to_csv(f"{OUTPUT_DIR}/temperature_reason_diversity.csv", index=False)
@@ -234,17 +196,32 @@ def main(lang='ja'):
     # CSVとして保存
     correlation_df.to_csv(f"{OUTPUT_DIR}/temperature_reason_correlation_diversity.csv", index=False)
 
-    # グラフを生成
-    create_similarity_plot(diversity_df, lang)
-    create_diversity_plot(diversity_df, lang)
+    return diversity_df, correlation_df
+
+def render(results, lang='ja'):
+    """prepare の結果から、指定した言語のグラフを生成"""
+    diversity_df, correlation_df = results
+    submit_figure(create_similarity_plot, diversity_df, lang)
+    submit_figure(create_diversity_plot, diversity_df, lang)
     create_correlation_plots(correlation_df, lang)
+    wait_for_figures()
 
     lang_dir = 'ja' if lang == 'ja' else 'en'
     print(f"\n生成テキストの多様性分析が完了しました。結果は '{OUTPUT_DIR}/temperature_reason_diversity.csv' に保存され、グラフは {os.path.join(OUTPUT_DIR, 'figures', lang_dir)} に保存されました。")
     print(f"また、temperatureと多様性指標の相関分析が完了しました。結果は '{OUTPUT_DIR}/temperature_reason_correlation_diversity.csv' に保存され、相関グラフも生成されました。")
 
+def main(lang='ja', tokenizer=None):
+    """メイン処理（類似度の計算は1回だけ行い、複数の言語のグラフは並行して生成する）"""
+    results = prepare(tokenizer)
+    if results is None:
+        return
+    run_languages(lambda lang_: render(results, lang_), lang)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate visualization for temperature reason data.')
-    parser.add_argument('--lang', choices=['ja', 'en'], default='ja', help='Language for visualization (ja/en)')
+    parser.add_argument('--lang', type=parse_languages, default='ja',
+                        help='Language(s) for visualization (ja, en, ja,en or all)')
+    parser.add_argument('--tokenizer', choices=list(TOKENIZERS), default=None,
+                        help="Tokenizer for reason texts (default: TOKENIZER_CONFIG['tokenizer'] in config.py)")
     args = parser.parse_args()
-    main(args.lang)
+    main(args.lang, args.tokenizer)
@@ -0,0 +1,101 @@
+"""理由文テキストの多様性（グループ内のTF-IDFベクトル間のコサイン類似度）を計算するエンジン。
+
+トークン化済みのコーパス（text_tokenizers.py）から単語出現回数の疎行列を1回だけ作り、
+グループ（モデル×temperatureなど）ごとのTF-IDFの重み付け・正規化は整数コード化したグループ単位で
+まとめて行う。
+
+グループ内の n 個の正規化済みベクトル v_i について、対角成分（自己類似度）を0にした
+n×n の類似度行列の平均と標準偏差は次の量から求められるため、類似度行列は作成しない。
+    類似度の総和   = ‖Σ v_i‖² − Σ ‖v_i‖²
+    類似度の二乗和 = ‖VᵀV‖_F² − Σ ‖v_i‖⁴
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+def count_terms(documents):
+    """トークン化済みの文書（トークンの並び）のリストから、文書×単語の出現回数の疎行列（CSR）を返す。
+
+    語彙が空の場合は列数0の行列を返す。
+    """
+    # sklearn はインポートに時間がかかるため、使うときにインポートする
+    from sklearn.feature_extraction.text import CountVectorizer
+    try:
+        counts = CountVectorizer(analyzer=list).fit_transform(documents)
+    except ValueError:
+        # 語彙が空（すべての文書にトークンがない）
+        return sparse.csr_matrix((len(documents), 0))
+    counts.sum_duplicates()
+    return counts
+
+def similarity_statistics(counts, group_codes):
+    """グループごとに TF-IDF ベクトル間のコサイン類似度の平均と標準偏差を計算する。
+
+    各グループで TfidfVectorizer を fit_transform した場合と同じく、IDF はグループ内の文書だけから
+    smooth_idf=True の定義 ln((1+n)/(1+df))+1 で計算し、各行をL2正規化する。
+    平均・標準偏差は、対角成分を0にした n×n の類似度行列全体（n² 個の要素）に対する値。
+
+    Args:
+        counts: count_terms が返す文書×単語の出現回数の疎行列
+        group_codes: 各文書のグループコード（0以上の整数、負の値はどのグループにも含めない）
+
+    Returns:
+        グループコードをインデックスとし、n（文書数）・mean_similarity・std_similarity を列とする
+        DataFrame（文書が1つ以上あるグループのみ）
+    """
+    counts = sparse.csr_matrix(counts, dtype=np.float64)
+    group_codes = np.asarray(group_codes, dtype=np.int64)
+    n_rows, n_terms = counts.shape
+    n_groups = int(group_codes.max()) + 1 if len(group_codes) and group_codes.max() >= 0 else 0
+    sizes = np.bincount(group_codes[group_codes >= 0], minlength=n_groups)
+
+    # 非ゼロ要素ごとの (文書, グループ, 単語)
+    entry_rows = np.repeat(np.arange(n_rows), np.diff(counts.indptr))
+    entry_groups = group_codes[entry_rows]
+    keep = entry_groups >= 0
+    entry_rows, entry_groups = entry_rows[keep], entry_groups[keep]
+    entry_terms, entry_counts = counts.indices[keep], counts.data[keep]
+
+    # グループ内の文書頻度（各文書で単語は1回しか現れないので、(グループ, 単語) の出現数と一致）
+    group_terms, entry_group_terms, document_frequency = np.unique(
+        entry_groups * max(n_terms, 1) + entry_terms, return_inverse=True, return_counts=True)
+    idf = np.log((1.0 + sizes[entry_groups]) / (1.0 + document_frequency[entry_group_terms])) + 1.0
+
+    # TF-IDF の重み付けと行ごとのL2正規化
+    weights = entry_counts * idf
+    row_norms = np.sqrt(np.bincount(entry_rows, weights=weights ** 2, minlength=n_rows))
+    values = weights / row_norms[entry_rows]
+    row_squares = np.bincount(entry_rows, weights=values ** 2, minlength=n_rows)
+
+    # 類似度の総和: ‖Σ v_i‖² から対角成分 Σ ‖v_i‖² を引く
+    column_sums = np.bincount(entry_group_terms, weights=values, minlength=len(group_terms))
+    group_of_column = group_terms // max(n_terms, 1)
+    total = np.bincount(group_of_column, weights=column_sums ** 2, minlength=n_groups)
+    valid_rows = group_codes >= 0
+    diagonal = np.bincount(group_codes[valid_rows], weights=row_squares[valid_rows], minlength=n_groups)
+    diagonal_squares = np.bincount(group_codes[valid_rows], weights=row_squares[valid_rows] ** 2,
+                                   minlength=n_groups)
+    terms_per_group = np.bincount(group_of_column, minlength=n_groups)
+
+    # 類似度の二乗和: グラム行列のフロベニウスノルムの二乗から対角成分を引く
+    # （‖VᵀV‖_F = ‖VVᵀ‖_F なので、文書数と単語数の小さい方の次元で計算する）
+    vectors = sparse.csr_matrix((values, entry_terms, np.r_[0, np.cumsum(np.bincount(entry_rows, minlength=n_rows))]),
+                                shape=(n_rows, n_terms))
+    order = np.argsort(group_codes, kind='stable')
+    starts = np.r_[0, np.cumsum(sizes)] + np.count_nonzero(group_codes < 0)
+    squares = np.zeros(n_groups)
+    for group in np.flatnonzero(sizes):
+        members = vectors[order[starts[group]:starts[group + 1]]]
+        gram = members.T @ members if terms_per_group[group] < sizes[group] else members @ members.T
+        squares[group] = np.dot(gram.data, gram.data)
+
+    present = np.flatnonzero(sizes)
+    n = sizes[present].astype(np.float64)
+    mean = (total[present] - diagonal[present]) / n ** 2
+    variance = (squares[present] - diagonal_squares[present]) / n ** 2 - mean ** 2
+    return pd.DataFrame({
+        'n': sizes[present],
+        'mean_similarity': mean,
+        'std_similarity': np.sqrt(np.maximum(variance, 0.0)),
+    }, index=present)
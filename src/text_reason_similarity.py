@@ -1,21 +1,17 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
-import japanize_matplotlib
-from sklearn.preprocessing import StandardScaler
 import os
-import json
 import argparse
 from config import (
     OUTPUT_DIR, VISUALIZATION_CONFIG,
-    ensure_output_directories, save_figure, get_message
+    ensure_output_directories, save_figure, get_message, get_messages, parse_languages, run_languages
 )
+from figure_jobs import submit_figure, wait_for_figures
 
 def load_messages(lang='ja'):
     """言語に応じたメッセージを読み込む"""
-    with open('src/messages.json', 'r', encoding='utf-8') as f:
-        messages = json.load(f)
+    messages = get_messages()
     
     combined_messages = messages['text_reason_similarity'][lang].copy()
     
@@ -29,8 +25,9 @@ def load_messages(lang='ja'):
         
     return combined_messages
 
-def create_correlation_heatmap(reason_trends, lang='ja'):
+def create_correlation_heatmap(reason_trends, lang='ja', save_csv=True):
     """文学作品間の相関分析とヒートマップの作成"""
+    import seaborn as sns
     # 文学作品間の相関係数を計算
     corr = reason_trends.T.corr()
     
@@ -46,7 +43,8 @@ def create_correlation_heatmap(reason_trends, lang='ja'):
     plt.close()
     
     # 相関行列をCSVとして保存
-    corr.to_csv(os.path.join(OUTPUT_DIR, 'text_reason_correlation.csv'))
+    if save_csv:
+        corr.to_csv(os.path.join(OUTPUT_DIR, 'text_reason_correlation.csv'))
     return corr
 
 def analyze_reason_patterns(reason_trends, lang='ja'):
@@ -143,7 +141,8 @@ def print_generated_files(lang='ja'):
     print(f"- {os.path.join(figures_dir, 'text_reason_patterns.png')}")
     print(f"- {os.path.join(figures_dir, 'text_reason_patterns.pdf')}")
 
-def main(lang='ja'):
+def analyze(lang='ja', save_csv=True):
+    """1つの言語で分析と描画を行う（save_csv=False の場合は相関行列のCSVを保存しない）"""
     # 出力ディレクトリの作成
     ensure_output_directories()
     
@@ -158,13 +157,14 @@ def main(lang='ja'):
     reason_trends.index = reason_trends.index.map(messages['text_mapping'])
     
     print("相関分析を実行中...")
-    corr = create_correlation_heatmap(reason_trends, lang)
+    submit_figure(create_correlation_heatmap, reason_trends, lang, save_csv)
     
     print("理由文長パターンを分析中...")
     pattern_analysis = analyze_reason_patterns(reason_trends, lang)
     
     print("理由文長パターンを可視化中...")
-    visualize_reason_patterns(reason_trends, lang)
+    submit_figure(visualize_reason_patterns, reason_trends, lang)
+    wait_for_figures()
     
     # 結果の表示
     print_pattern_analysis(pattern_analysis, lang)
@@ -173,9 +173,15 @@ def main(lang='ja'):
     print(f"結果は '{OUTPUT_DIR}' ディレクトリに保存されました。")
     print_generated_files(lang)
 
+def main(lang='ja'):
+    # 複数の言語を指定した場合は、言語ごとの子プロセスで並行して分析と描画を行う
+    # （相関行列のCSVはラベルの言語によって内容が変わるため、最初の言語の結果だけを保存する）
+    langs = parse_languages(lang)
+    run_languages(lambda lang_: analyze(lang_, save_csv=(lang_ == langs[0])), langs)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate similarity analysis visualizations.')
-    parser.add_argument('--lang', choices=['ja', 'en'], default='ja',
-                       help='Language for visualization (ja/en)')
+    parser.add_argument('--lang', type=parse_languages, default='ja',
+                        help='Language(s) for visualization (ja, en, ja,en or all)')
     args = parser.parse_args()
     main(args.lang)
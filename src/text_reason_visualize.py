@@ -1,21 +1,18 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
-import japanize_matplotlib
-import json
 import argparse
 import os
 from config import (
     OUTPUT_DIR, VISUALIZATION_CONFIG,
-    ensure_output_directories, save_figure, create_melted_data, setup_figure, add_header_text, get_message
+    ensure_output_directories, save_figure,
+    get_messages, parse_languages, run_languages
 )
+from figure_jobs import submit_figure, wait_for_figures
 
 
 def load_messages(lang):
     """言語に応じたメッセージと共通メッセージを読み込む"""
-    with open('src/messages.json', 'r', encoding='utf-8') as f:
-        messages = json.load(f)
-    return messages
+    return get_messages()
 
 def create_bar_plot(data, texts, lang='ja'):
     """棒グラフによる理由文長の平均値比較を作成"""
@@ -79,6 +76,7 @@ def create_bar_plot(data, texts, lang='ja'):
 
 def create_distribution_plot(data, texts, lang='ja'):
     """バイオリンプロットとスウォームプロットによる分布の可視化"""
+    import seaborn as sns
     messages_full = load_messages(lang)
     messages = messages_full['text_reason'][lang]
     fig = plt.figure(figsize=VISUALIZATION_CONFIG['figure']['default_size'])
@@ -124,6 +122,12 @@ def create_distribution_plot(data, texts, lang='ja'):
 
 def main(lang='ja'):
     """メイン処理"""
+    langs = parse_languages(lang)
+    if len(langs) > 1:
+        # 複数の言語を指定した場合は、言語ごとの子プロセスで並行して描画する
+        return run_languages(main, langs)
+    lang = langs[0]
+
     # 出力ディレクトリを作成
     ensure_output_directories()
 
@@ -136,8 +140,9 @@ def main(lang='ja'):
     texts = list(text_mapping.values())
 
     # 2つのグラフを生成
-    create_bar_plot(df, texts, lang)
-    create_distribution_plot(df, texts, lang)
+    submit_figure(create_bar_plot, df, texts, lang)
+    submit_figure(create_distribution_plot, df, texts, lang)
+    wait_for_figures()
 
     # 文学作品ごとの平均値を表示
     print("\n文学作品ごとの理由文長平均値:")
@@ -162,6 +167,7 @@ def main(lang='ja'):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate visualization for text reason data.')
-    parser.add_argument('--lang', choices=['ja', 'en'], default='ja', help='Language for visualization (ja/en)')
+    parser.add_argument('--lang', type=parse_languages, default='ja',
+                        help='Language(s) for visualization (ja, en, ja,en or all)')
     args = parser.parse_args()
     main(args.lang)
@@ -0,0 +1,104 @@
+"""理由文テキストのトークン化と、トークン化結果のキャッシュ。
+
+トークン化の方式:
+- word: TfidfVectorizer の既定と同じ（小文字化して2文字以上の \\w の並びを取り出す）。
+  日本語では句読点までの文全体が1トークンになるが、従来の結果を再現するため既定とする。
+- char_ngram: NFKC正規化・小文字化したテキストを記号や空白で区切り、各区間から文字n-gramを取り出す。
+- segment: 辞書を使わず、漢字・ひらがな・カタカナ・英数字の文字種が変わる位置で分割する。
+
+トークン化の結果は入力データの行番号（row_id）と理由文の列ごとに results/cache に保存し、
+入力データと設定が変わらない限り再利用する（--lang ja / en の2回の実行でも1回だけトークン化する）。
+入力データに行が追加された場合は、追加された行だけをトークン化して前回の結果に追加する。
+"""
+
+import re
+import unicodedata
+import pandas as pd
+from config import (
+    ANALYSIS_COLUMNS, TOKENIZER_CONFIG,
+    load_derived_table, load_input_data
+)
+
+# TfidfVectorizer の既定の token_pattern
+_WORD_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+# 文字n-gramを取り出す区間（記号・空白以外の文字の並び）
+_CHUNK_PATTERN = re.compile(r"[^\W_]+")
+
+# 文字種ごとの並び（漢字、カタカナ（長音記号を含む）、ひらがな、英数字）
+_SEGMENT_PATTERN = re.compile(
+    r"[一-鿿㐀-䶿々〆ヵヶ]+"
+    r"|[ァ-ヺー]+"
+    r"|[ぁ-ゖ]+"
+    r"|[a-z0-9]+"
+)
+
+def _normalize(text):
+    """全角英数字などを揃えて小文字化"""
+    return unicodedata.normalize('NFKC', text).lower()
+
+def tokenize_word(text):
+    """TfidfVectorizer の既定と同じ単語分割"""
+    return _WORD_PATTERN.findall(text.lower())
+
+def tokenize_char_ngram(text, ngram_range=(2, 3)):
+    """記号や空白で区切った区間ごとに文字n-gramを取り出す"""
+    min_n, max_n = ngram_range
+    tokens = []
+    for chunk in _CHUNK_PATTERN.findall(_normalize(text)):
+        for n in range(min_n, max_n + 1):
+            tokens.extend(chunk[i:i + n] for i in range(len(chunk) - n + 1))
+    return tokens
+
+def tokenize_segment(text):
+    """文字種が変わる位置で分割する（辞書を使わない分かち書き）"""
+    return _SEGMENT_PATTERN.findall(_normalize(text))
+
+TOKENIZERS = {
+    'word': tokenize_word,
+    'char_ngram': tokenize_char_ngram,
+    'segment': tokenize_segment,
+}
+
+def _tokenize_column(values, mode, ngram_range):
+    """1列分の理由文をトークン化"""
+    if mode == 'word':
+        # 従来どおり欠損値は文字列 'nan' としてトークン化する
+        return [tokenize_word(str(value)) for value in values]
+    tokenizer = TOKENIZERS[mode]
+    kwargs = {'ngram_range': tuple(ngram_range)} if mode == 'char_ngram' else {}
+    return [tokenizer(value, **kwargs) if isinstance(value, str) else [] for value in values]
+
+def load_reason_tokens(mode=None, file_path=None):
+    """理由文の各列をトークン化したテーブルを読み込む（キャッシュがなければ作成する）。
+
+    戻り値は (DataFrame, エラーメッセージ) の組。DataFrame は入力データと同じ行順で、
+    row_id 列と理由文の各列（トークンの並び）を持つ。
+    """
+    mode = mode or TOKENIZER_CONFIG['tokenizer']
+    if mode not in TOKENIZERS:
+        return None, f"エラー：不明なトークン化の方式です：{mode}"
+    ngram_range = list(TOKENIZER_CONFIG['ngram_range'])
+
+    def build(path, start=0):
+        df, error = load_input_data(path, columns=ANALYSIS_COLUMNS['reasons'])
+        if error:
+            raise RuntimeError(error)
+        df = df.iloc[start:]
+        tokens = pd.DataFrame({'row_id': range(start, start + len(df))})
+        for col in ANALYSIS_COLUMNS['reasons']:
+            tokens[col] = _tokenize_column(df[col].tolist(), mode, ngram_range)
+        return tokens
+
+    params = {'tokenizer': mode, 'ngram_range': ngram_range if mode == 'char_ngram' else None}
+    return load_derived_table(f"tokens_{mode}", build, f"理由文のトークン化結果（{mode}）", file_path, params,
+                              append=True)
+
+def combine_reason_tokens(tokens, columns=None):
+    """行ごとに理由文の各列のトークンを連結し、1つの文書として扱うトークン列のリストを返す"""
+    columns = columns or ANALYSIS_COLUMNS['reasons']
+    documents = [list(values) for values in tokens[columns[0]]]
+    for col in columns[1:]:
+        for document, values in zip(documents, tokens[col]):
+            document.extend(values)
+    return documents
@@ -0,0 +1,145 @@
+"""バイオリンプロットの密度曲線（カーネル密度推定）の計算・キャッシュと描画。
+
+seaborn の violinplot は描画のたびに（--lang ja / en の言語ごとにも）カテゴリごとに gaussian_kde を作り、
+全ての点についてカーネルを評価し直す（点の数 × 格子点の数の計算）。ここでは密度曲線をまとめて計算して
+保存し、描画ではそれを読み込んで輪郭を描くだけにする。
+
+1. 値を等間隔の格子（VISUALIZATION_CONFIG['violin']['gridsize'] 点）に線形ビニングし、
+   ガウスカーネルとの畳み込みを FFT で計算する（点の数によらず格子点の数 m に対して O(m log m)）。
+   バンド幅・格子の範囲は seaborn と同じ（Scott の規則 × bw_adjust、最小値・最大値からバンド幅の cut 倍）。
+2. (グループ, 次元) ごとの密度曲線を load_derived_table で results/cache に保存し、入力ファイルと
+   設定が変わらない限り再利用する。
+3. draw_violins() は seaborn と同じカテゴリ位置・hue ごとの横のずらし方・密度の正規化
+   （density_norm='area', common_norm=False）で輪郭を描く（fill=False と同じ表示）。
+"""
+
+import numpy as np
+from config import VISUALIZATION_CONFIG, load_derived_table
+
+def binned_kde(values, gridsize, cut, bw_adjust):
+    """値のガウスカーネル密度推定を、線形ビニングと FFT による畳み込みで計算する。
+
+    戻り値は (格子点, 密度) の組。値が1つしかない、または全て同じ値の場合は seaborn と同じく
+    密度を推定できないため、(平均値, NaN) の1点を返す。値がない場合は空の配列を返す。
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    n = len(values)
+    if n == 0:
+        return np.zeros(0), np.zeros(0)
+    if n == 1 or values.min() == values.max():
+        return np.array([values.mean()]), np.array([np.nan])
+
+    bandwidth = values.std(ddof=1) * n ** (-1 / 5) * bw_adjust
+    grid = np.linspace(values.min() - cut * bandwidth, values.max() + cut * bandwidth, gridsize)
+    delta = grid[1] - grid[0]
+
+    # 線形ビニング：各値を両隣の格子点に距離に応じて分ける
+    position = (values - grid[0]) / delta
+    index = np.minimum(np.floor(position).astype(np.int64), gridsize - 2)
+    fraction = position - index
+    counts = (np.bincount(index, 1 - fraction, minlength=gridsize)
+              + np.bincount(index + 1, fraction, minlength=gridsize))
+
+    # 格子点の間隔ごとのガウスカーネルとの畳み込み（循環しないよう 0 で埋めた長さで FFT）
+    offsets = np.arange(-(gridsize - 1), gridsize) * delta
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    size = 1 << int(np.ceil(np.log2(3 * gridsize - 2)))
+    convolved = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    density = np.maximum(convolved[gridsize - 1:2 * gridsize - 1], 0) / n
+    return grid, density
+
+def compute_violin_densities(data, group_cols, value_cols):
+    """data を group_cols でグループに分け、グループ・value_cols の列ごとの密度曲線を計算する。
+
+    戻り値は group_cols と dimension（value_cols の列名）、support（格子点）、density 列を持つ
+    縦持ちの DataFrame。値のないグループ・列は含めない。
+    """
+    import pandas as pd
+    violin_config = VISUALIZATION_CONFIG['violin']
+    frames = []
+    for keys, group in data.groupby(group_cols, observed=True, sort=False):
+        keys = keys if isinstance(keys, tuple) else (keys,)
+        for col in value_cols:
+            support, density = binned_kde(group[col].to_numpy(dtype=np.float64), violin_config['gridsize'],
+                                          violin_config['cut'], violin_config['bw_adjust'])
+            if len(support) == 0:
+                continue
+            frame = pd.DataFrame({'support': support, 'density': density})
+            frame.insert(0, 'dimension', col)
+            for name, key in reversed(list(zip(group_cols, keys))):
+                frame.insert(0, name, key)
+            frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=list(group_cols) + ['dimension', 'support', 'density'])
+    return pd.concat(frames, ignore_index=True)
+
+def load_violin_densities(file_path, prepare, group_cols, value_cols, params=None, input_data=True):
+    """file_path から作るバイオリンプロットの密度曲線を読み込む（キャッシュがなければ作成する）。
+
+    prepare(file_path) は group_cols と value_cols の列を持つ DataFrame を返す関数。
+    密度曲線は入力ファイルの SHA-256 と設定（VISUALIZATION_CONFIG['violin'] と params）ごとに
+    results/cache に保存する。file_path が入力データ（data_all.csv）ではない場合は input_data=False とする
+    （load_derived_table を参照）。戻り値は (DataFrame, エラーメッセージ) の組。
+    """
+    def build(path):
+        return compute_violin_densities(prepare(path), group_cols, value_cols)
+
+    name = "violin_" + "_".join(group_cols)
+    params = {**VISUALIZATION_CONFIG['violin'], 'groups': list(group_cols), 'values': list(value_cols),
+              **(params or {})}
+    return load_derived_table(name, build, f"バイオリンプロットの密度曲線（{', '.join(group_cols)}）",
+                              file_path, params, input_data=input_data)
+
+def draw_violins(ax, curves, x, order, hue=None, hue_order=None, palette=None, dodge=True,
+                 width=0.8, linewidth=2.0, labels=None):
+    """密度曲線 curves（compute_violin_densities の戻り値）からバイオリンプロットの輪郭を描く。
+
+    curves の x 列の値を order の順にカテゴリ位置 0, 1, ...（seaborn のカテゴリ軸と同じ）に置く。
+    hue を指定すると hue 列の値ごとに色を分け、dodge=True なら hue_order の順に横にずらして並べる。
+    palette は hue（hue がなければ x）の値 -> 色の辞書、または order / hue_order と同じ順の色のリスト。
+    密度は hue の値ごとに最大の密度で正規化する。labels を指定すると x 軸の目盛りのラベルにする。
+    """
+    same_hue = hue is None or hue == x
+    keys = [x] if same_hue else [x, hue]
+    levels = list(order) if same_hue else list(hue_order)
+    dodge_count = len(levels) if dodge and not same_hue else 1
+    if isinstance(palette, dict):
+        colors = palette
+    else:
+        colors = dict(zip(levels, palette))
+
+    curves = curves[curves[x].isin(order)]
+    if not same_hue:
+        curves = curves[curves[hue].isin(levels)]
+    groups = {key if isinstance(key, tuple) else (key,): group
+              for key, group in curves.groupby(keys, observed=True, sort=False)}
+    hue_column = x if same_hue else hue
+    max_density = curves.groupby(hue_column, observed=True)['density'].max().to_dict()
+
+    half_width = width / dodge_count / 2
+    for position, x_value in enumerate(order):
+        for level_index, level in enumerate(levels):
+            if same_hue and level != x_value:
+                continue
+            group = groups.get((x_value,) if same_hue else (x_value, level))
+            if group is None:
+                continue
+            center = position
+            if dodge_count > 1:
+                center += (level_index + 0.5) * width / dodge_count - width / 2
+            support = group['support'].to_numpy()
+            density = group['density'].to_numpy()
+            color = colors[level]
+            if np.isnan(density).all():
+                # 密度を推定できない（値が1種類の）場合は、その値に横線を引く
+                ax.plot([center - half_width, center + half_width], [support.mean()] * 2,
+                        color=color, linewidth=linewidth)
+                continue
+            span = density / max_density[level] * half_width
+            ax.fill_betweenx(support, center - span, center + span,
+                             facecolor='none', edgecolor=color, linewidth=linewidth)
+
+    ax.set_xticks(range(len(order)), labels if labels is not None else order)
+    ax.set_xlim(-0.5, len(order) - 0.5)
+    ax.xaxis.grid(False)